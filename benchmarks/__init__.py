@@ -0,0 +1 @@
+"""Benchmarks für die Verarbeitungsschritte (python -m benchmarks.<name>)."""
@@ -0,0 +1,116 @@
+"""Benchmark: Einlesen eines großen Apollo-Exports mit pandas- und Arrow-Parser.
+
+Erzeugt (falls nötig) eine synthetische Apollo-CSV mit 60+ Spalten und misst
+pro Engine Parse-Zeit und Peak-RSS — jede Messung in einem eigenen Prozess.
+Gemessen werden das Gesamt-Einlesen und das blockweise Einlesen mit
+`chunk_size` aus der Konfiguration, dazu der konfigurierte Standardpfad
+(`main.iter_leads` mit config.yaml).
+
+Aufruf:
+    python -m benchmarks.bench_csv_ingest [--size-mb 1024] [--path export.csv]
+        [--config-path config.yaml]
+"""
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from generator.csv_reader import OPTIONAL_COLUMNS, REQUIRED_COLUMNS
+
+EXTRA_COLUMNS = [f"apollo_field_{i}" for i in range(45)]
+INDUSTRIES = ["Real Estate", "Construction", "Government", "Education", "Hospitality"]
+CITIES = ["Hamburg", "Kiel", "Lübeck", "Bremen", "Hannover"]
+
+_MEASURE = """
+import json, resource, sys, time
+import yaml
+from generator.csv_reader import read_and_validate, read_in_chunks
+from main import iter_leads
+path, mode, engine, config_path = sys.argv[1:5]
+with open(config_path, encoding="utf-8") as f:
+    config = yaml.safe_load(f)
+start = time.perf_counter()
+if mode == "default":
+    rows = sum(len(df) for df in iter_leads(path, config, drop_duplicates=False))
+elif mode == "chunked":
+    rows = sum(len(df) for df in read_in_chunks(
+        path, config.get("chunk_size") or 50000, drop_duplicates=False, engine=engine
+    ))
+else:
+    rows = len(read_and_validate(path, engine=engine))
+elapsed = time.perf_counter() - start
+peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"rows": rows, "seconds": elapsed, "peak_mb": peak_kb / 1024}))
+"""
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def write_export(path: Path, size_mb: int, seed: int = 42) -> None:
+    """Schreibt eine synthetische Apollo-CSV der gewünschten Größe."""
+    rng = random.Random(seed)
+    columns = EXTRA_COLUMNS[:20] + REQUIRED_COLUMNS + OPTIONAL_COLUMNS + EXTRA_COLUMNS[20:]
+    target = size_mb * 1024 * 1024
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(",".join(columns) + "\n")
+        i = 0
+        while f.tell() < target:
+            row = {
+                "first_name": f"Vorname{i}",
+                "last_name": f"Nachname{i}",
+                "email": f"lead.{i}@firma{i % 5000}.de",
+                "title": rng.choice(["Facility Manager", "Bauleiter", "CEO"]),
+                "company_name": f"Firma {i % 5000} GmbH",
+                "industry": rng.choice(INDUSTRIES),
+                "company_size": rng.choice(["1-10", "11-50", "51-200", "201-500"]),
+                "city": rng.choice(CITIES),
+                "country": "Germany",
+            }
+            f.write(",".join(row.get(col, f"wert{i % 97}") for col in columns) + "\n")
+            i += 1
+
+
+def measure(path: Path, mode: str, engine: str, config_path: Path) -> dict:
+    """Misst einen Einlesepfad in einem frischen Prozess."""
+    result = subprocess.run(
+        [sys.executable, "-c", _MEASURE, str(path), mode, engine, str(config_path)],
+        capture_output=True, text=True, check=True, cwd=PROJECT_ROOT,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--path", type=Path, default=None)
+    parser.add_argument("--config-path", type=Path, default=PROJECT_ROOT / "config.yaml")
+    args = parser.parse_args()
+    config_path = args.config_path.resolve()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.path or Path(tmp) / "apollo_export.csv"
+        if not path.exists():
+            print(f"Erzeuge {args.size_mb} MB Testdatei: {path}")
+            write_export(path, args.size_mb)
+
+        path = path.resolve()
+        runs = [
+            ("ganz", "pandas"), ("ganz", "pyarrow"),
+            ("chunked", "pandas"), ("chunked", "pyarrow"),
+            ("default", "config"),
+        ]
+        for mode, engine in runs:
+            stats = measure(path, mode, engine, config_path)
+            print(
+                f"{mode:>8} {engine:>8}: {stats['rows']} Leads in {stats['seconds']:6.2f}s, "
+                f"Peak-RSS {stats['peak_mb']:7.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
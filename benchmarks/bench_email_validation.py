@@ -0,0 +1,64 @@
+"""Benchmark: E-Mail-Validierung pro Zeile vs. Validierungs-Engine.
+
+Aufruf:
+    python -m benchmarks.bench_email_validation [--sizes 100000 1000000]
+"""
+
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from generator.email_check import is_valid_email, valid_email_mask
+
+DOMAINS = [
+    "abc-hausverwaltung.de", "immo-partner.de", "bau-gmbh.de", "hamburg.de",
+    "example.com", "münchen.de", "gmail.com", "web.de", "t-online.de",
+]
+
+
+def make_emails(count: int, seed: int = 42) -> pd.Series:
+    """Erzeugt eine realistische Mischung aus gültigen und ungültigen Adressen."""
+    rng = random.Random(seed)
+    domains = DOMAINS + [f"firma{i}.de" for i in range(count // 50)]
+    emails = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.02:
+            emails.append(f"kaputt-{i}")
+        elif roll < 0.03:
+            emails.append("")
+        elif roll < 0.05:
+            emails.append(f"jürgen.{i}@{rng.choice(domains)}")
+        else:
+            emails.append(f"lead.{i}@{rng.choice(domains)}")
+    return pd.Series(emails)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        emails = make_emails(size)
+
+        start = time.perf_counter()
+        reference = emails.apply(is_valid_email)
+        per_row = time.perf_counter() - start
+
+        start = time.perf_counter()
+        mask = valid_email_mask(emails, args.workers)
+        engine = time.perf_counter() - start
+
+        assert mask.equals(reference.astype(bool)), "Masken weichen ab"
+        print(
+            f"{size:>9} Adressen: pro Zeile {per_row:7.2f}s | "
+            f"Engine {engine:7.2f}s | Faktor {per_row / engine:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark: Template-Rendering pro Zeile vs. render_many (Jinja2 / statisch).
+
+Aufruf:
+    python -m benchmarks.bench_render [--sizes 100000]
+"""
+
+import argparse
+import random
+import time
+from pathlib import Path
+
+from generator.template_engine import RenderJob, create_environment, render, render_many
+
+TEMPLATES_DIR = Path(__file__).parent.parent / "templates"
+
+FIRST_NAMES = ["Max", "Anna", "Jürgen", "Ève", "", "Sabine", "Thomas"]
+
+
+def make_jobs(count: int, seed: int = 42) -> list[RenderJob]:
+    """Erzeugt Render-Jobs gleichmäßig verteilt über alle Templates."""
+    rng = random.Random(seed)
+    templates = [
+        (path.parent.name, path.stem) for path in sorted(TEMPLATES_DIR.glob("*/*.txt"))
+    ]
+    jobs = []
+    for i in range(count):
+        company_id, segment_id = rng.choice(templates)
+        jobs.append(RenderJob(
+            company_id=company_id,
+            segment_id=segment_id,
+            lead={
+                "first_name": rng.choice(FIRST_NAMES),
+                "last_name": f"Nachname{i}",
+                "company_name": f"Firma {i} GmbH",
+                "email": f"lead.{i}@firma{i % 500}.de",
+            },
+            icebreaker="als Verwalter vieler Objekte kennen Sie das Thema sicher.",
+            pdf_link=f"https://link.gruppenwerk.de/{company_id}-{segment_id}",
+        ))
+    return jobs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000])
+    args = parser.parse_args()
+
+    env = create_environment(TEMPLATES_DIR)
+
+    for size in args.sizes:
+        jobs = make_jobs(size)
+
+        start = time.perf_counter()
+        reference = [
+            render(j.company_id, j.segment_id, j.lead, j.icebreaker, j.pdf_link, "Axel Seehafer", env)
+            for j in jobs
+        ]
+        per_row = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = list(render_many(jobs, "Axel Seehafer", env, static=False))
+        many = time.perf_counter() - start
+
+        start = time.perf_counter()
+        compiled = list(render_many(jobs, "Axel Seehafer", env))
+        static = time.perf_counter() - start
+
+        assert batched == reference, "Ergebnisse weichen ab (Jinja2)"
+        assert compiled == reference, "Ergebnisse weichen ab (statisch)"
+        print(
+            f"{size:>9} E-Mails: pro Zeile {per_row:7.2f}s ({size / per_row:>9,.0f}/s) | "
+            f"render_many Jinja2 {many:7.2f}s ({size / many:>9,.0f}/s) | "
+            f"statisch {static:7.2f}s ({size / static:>9,.0f}/s) | "
+            f"Faktor {per_row / static:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
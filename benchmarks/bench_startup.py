@@ -0,0 +1,99 @@
+"""Benchmark: Startzeit der CLI-Befehle (Importzeit pro Befehl).
+
+Startet jeden Befehl mehrfach in einem frischen Prozess mit
+`python -X importtime` und misst Wall-Time und summierte Importzeit. Liegt
+ein Befehl über seinem Budget, endet der Benchmark mit Exit-Code 1.
+
+Aufruf:
+    python -m benchmarks.bench_startup [--runs 5] [--budget-factor 1.0]
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Befehl → Budget für die Importzeit in ms
+COMMANDS: dict[str, float] = {
+    "--help": 150,
+    "stats --output {tmp}": 150,
+    "segment --help": 150,
+    "preview --help": 150,
+    "generate --help": 150,
+}
+
+
+def import_times(stderr: str) -> dict[str, int]:
+    """Kumulierte Importzeit (µs) pro Modul aus der -X importtime Ausgabe."""
+    result: dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        result[module.strip()] = int(cumulative)
+    return result
+
+
+def top_level_import_ms(stderr: str) -> float:
+    """Summe der Importzeit aller Top-Level-Importe in ms."""
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        # Top-Level-Importe sind mit genau einem Leerzeichen eingerückt
+        if module.startswith(" ") and not module.startswith("  "):
+            total += int(cumulative)
+    return total / 1000
+
+
+def measure(command: str, runs: int) -> tuple[float, float, dict[str, int]]:
+    """Misst einen Befehl; liefert (beste Wall-Time ms, beste Importzeit ms, Module)."""
+    best_wall = best_import = float("inf")
+    modules: dict[str, int] = {}
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "main.py", *command.split()],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        )
+        best_wall = min(best_wall, (time.perf_counter() - start) * 1000)
+        import_ms = top_level_import_ms(result.stderr)
+        if import_ms < best_import:
+            best_import = import_ms
+            modules = import_times(result.stderr)
+    return best_wall, best_import, modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-factor", type=float, default=1.0)
+    args = parser.parse_args()
+
+    failed = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for template, budget in COMMANDS.items():
+            command = template.format(tmp=tmp)
+            wall, import_ms, modules = measure(command, args.runs)
+            budget *= args.budget_factor
+            status = "ok" if import_ms <= budget else "ZU LANGSAM"
+            heavy = [m for m in ("pandas", "anthropic", "httpx", "jinja2") if m in modules]
+            print(
+                f"{template.split()[0]:>10}: Wall {wall:7.1f} ms, Importe {import_ms:7.1f} ms "
+                f"(Budget {budget:.0f} ms) {status}"
+                + (f" — lädt {', '.join(heavy)}" if heavy else "")
+            )
+            if import_ms > budget:
+                failed.append(template)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
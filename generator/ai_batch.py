@@ -0,0 +1,293 @@
+"""Icebreaker-Generierung über die Anthropic Message Batches API.
+
+Für große Läufe (`ai_mode: batch`): alle Prompts werden als Message Batches
+eingereicht, zum halben Preis und ohne Rate-Limit-Druck durch tausende
+Einzelanfragen. Die `custom_id` jeder Anfrage ist ihr Cache-Schlüssel, so
+dass identische Prompts nur einmal eingereicht werden.
+
+Batch-IDs und Ergebnisse landen in einem `BatchJournal` (SQLite). Bricht ein
+Lauf ab oder wird die maximale Wartezeit überschritten, setzt der nächste
+Lauf mit derselben Eingabe die laufenden Batches fort, statt neu einzureichen.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from generator.ai_personalizer import (
+    PromptParts,
+    build_prompt_parts,
+    build_request,
+    fallback_batch,
+    fallback_single,
+    request_key,
+    response_text,
+)
+
+if TYPE_CHECKING:
+    from generator.response_cache import ResponseCache
+    from generator.segmenter import AssignmentLike
+
+logger = logging.getLogger(__name__)
+
+# Maximale Anzahl Parameter pro SQL-Abfrage
+_SQL_BATCH = 500
+
+# Status einer eingereichten Anfrage (sonst Ergebnistyp der API)
+PENDING = "pending"
+SUCCEEDED = "succeeded"
+
+
+class BatchPending(Exception):
+    """Batches sind nach der maximalen Wartezeit noch nicht fertig."""
+
+    def __init__(self, batch_ids: Iterable[str]) -> None:
+        self.batch_ids = sorted(batch_ids)
+        super().__init__(f"{len(self.batch_ids)} Batches noch in Bearbeitung")
+
+
+class BatchJournal:
+    """Persistente Zuordnung custom_id → Batch-ID, Status und Ergebnistext."""
+
+    def __init__(self, path: str | Path, retention_days: float = 29) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.retention_days = retention_days
+
+        self._conn = sqlite3.connect(self.path, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS batches ("
+            " batch_id TEXT PRIMARY KEY,"
+            " created_at REAL NOT NULL,"
+            " ended INTEGER NOT NULL DEFAULT 0"
+            ")"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS requests ("
+            " custom_id TEXT PRIMARY KEY,"
+            " batch_id TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " text TEXT"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def lookup(self, custom_ids: Iterable[str]) -> dict[str, tuple[str, str, str | None]]:
+        """Bekannte Anfragen nachschlagen.
+
+        Returns:
+            custom_id → (Batch-ID, Status, Text) für alle bekannten Anfragen.
+        """
+        custom_ids = list(custom_ids)
+        found: dict[str, tuple[str, str, str | None]] = {}
+        for start in range(0, len(custom_ids), _SQL_BATCH):
+            batch = custom_ids[start : start + _SQL_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT custom_id, batch_id, status, text FROM requests "
+                f"WHERE custom_id IN ({placeholders})",
+                batch,
+            )
+            found.update((row[0], row[1:]) for row in rows)
+        return found
+
+    def add_batch(self, batch_id: str, custom_ids: Iterable[str]) -> None:
+        """Vermerkt einen eingereichten Batch samt seiner Anfragen."""
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO batches (batch_id, created_at) VALUES (?, ?)",
+                (batch_id, time.time()),
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO requests (custom_id, batch_id, status, text) "
+                "VALUES (?, ?, ?, NULL)",
+                [(custom_id, batch_id, PENDING) for custom_id in custom_ids],
+            )
+
+    def finish_batch(self, batch_id: str, results: Iterable[tuple[str, str, str | None]]) -> None:
+        """Speichert die Ergebnisse eines beendeten Batches.
+
+        Args:
+            batch_id: ID des Batches.
+            results: (custom_id, Ergebnistyp, Text) pro Anfrage.
+        """
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE requests SET status = ?, text = ? WHERE custom_id = ? AND batch_id = ?",
+                [(status, text, custom_id, batch_id) for custom_id, status, text in results],
+            )
+            self._conn.execute(
+                "UPDATE batches SET ended = 1 WHERE batch_id = ?", (batch_id,)
+            )
+
+    def purge(self) -> int:
+        """Entfernt abgeschlossene Batches nach Ablauf der Aufbewahrungszeit.
+
+        Returns:
+            Anzahl entfernter Batches.
+        """
+        cutoff = time.time() - self.retention_days * 86400
+        with self._conn:
+            expired = [
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT batch_id FROM batches WHERE ended = 1 AND created_at < ?",
+                    (cutoff,),
+                )
+            ]
+            self._conn.executemany(
+                "DELETE FROM requests WHERE batch_id = ?", [(b,) for b in expired]
+            )
+            self._conn.executemany(
+                "DELETE FROM batches WHERE batch_id = ?", [(b,) for b in expired]
+            )
+        return len(expired)
+
+    def close(self) -> None:
+        """Räumt auf und schließt die Datenbankverbindung."""
+        self.purge()
+        self._conn.close()
+
+
+async def generate_all(
+    assignments: Sequence[AssignmentLike],
+    rules: dict,
+    config: dict,
+    journal: BatchJournal,
+    cache: ResponseCache | None = None,
+    client=None,
+) -> list[str]:
+    """Generiert Icebreaker für alle Assignments über Message Batches.
+
+    Bereits gecachte oder in früheren Läufen abgeschlossene Prompts werden
+    übernommen, laufende Batches fortgesetzt und nur die übrigen Prompts
+    neu eingereicht. Anschließend wird mit exponentiellem Backoff gepollt.
+
+    Args:
+        assignments: Lead-Zuordnungen.
+        rules: Segmentierungsregeln.
+        config: App-Konfiguration.
+        journal: Persistente Batch-Zuordnung.
+        cache: Optionaler persistenter Antwort-Cache.
+        client: Optionaler AsyncAnthropic-Client (sonst neu erzeugt).
+
+    Returns:
+        Icebreaker-Texte (gleiche Reihenfolge wie Eingabe), Fallback für
+        fehlgeschlagene Anfragen.
+
+    Raises:
+        BatchPending: Wenn `ai_batch_max_wait_minutes` überschritten ist.
+            Ein späterer Lauf setzt die Batches fort.
+    """
+    if client is None:
+        api_key = os.environ.get("ANTHROPIC_API_KEY", "")
+        if not api_key:
+            logger.warning("ANTHROPIC_API_KEY nicht gesetzt — nutze Fallback-Icebreaker")
+            return fallback_batch(assignments)
+
+        import anthropic
+
+        client = anthropic.AsyncAnthropic(api_key=api_key)
+
+    prompts = [build_prompt_parts(a, rules) for a in assignments]
+    keys = [request_key(p, config) for p in prompts]
+    texts: dict[str, str] = cache.get_many(keys) if cache is not None else {}
+
+    # Offene Prompts: abgeschlossen, laufend oder neu einzureichen
+    open_prompts = {k: p for k, p in zip(keys, prompts) if k not in texts}
+    known = journal.lookup(open_prompts)
+    waiting: set[str] = set()
+    submit: dict[str, PromptParts] = {}
+    for key, prompt in open_prompts.items():
+        batch_id, status, text = known.get(key, (None, None, None))
+        if status == SUCCEEDED:
+            texts[key] = text
+        elif status == PENDING:
+            waiting.add(batch_id)
+        else:
+            submit[key] = prompt
+
+    if known:
+        logger.info(
+            f"Batch-Journal: {sum(1 for v in known.values() if v[1] == SUCCEEDED)} Ergebnisse "
+            f"übernommen, {len(waiting)} laufende Batches werden fortgesetzt"
+        )
+
+    max_requests = config.get("ai_batch_max_requests", 10_000)
+    # Nach Firma sortiert, damit sich Anfragen mit gleichem Firmen-Prefix den Prompt-Cache teilen
+    items = sorted(submit.items(), key=lambda item: item[1].company)
+    for start in range(0, len(items), max_requests):
+        chunk = items[start : start + max_requests]
+        batch = await client.messages.batches.create(requests=[
+            {"custom_id": key, "params": build_request(prompt, config)}
+            for key, prompt in chunk
+        ])
+        journal.add_batch(batch.id, [key for key, _ in chunk])
+        waiting.add(batch.id)
+        logger.info(f"Batch {batch.id} eingereicht ({len(chunk)} Anfragen)")
+
+    if waiting:
+        await _poll(client, journal, waiting, config)
+        for key, (_, status, text) in journal.lookup(open_prompts).items():
+            if status == SUCCEEDED:
+                texts[key] = text
+                if cache is not None:
+                    cache.put(key, text)
+
+    results = []
+    for assignment, key in zip(assignments, keys):
+        text = texts.get(key)
+        if text is None:
+            logger.warning(
+                f"Fallback-Icebreaker für {assignment.lead.get('email', '?')} "
+                f"— Batch-Anfrage fehlgeschlagen"
+            )
+            text = fallback_single(assignment)
+        results.append(text)
+    return results
+
+
+async def _poll(client, journal: BatchJournal, waiting: set[str], config: dict) -> None:
+    """Pollt Batches mit exponentiellem Backoff und speichert die Ergebnisse."""
+    interval = config.get("ai_batch_poll_seconds", 30)
+    max_interval = config.get("ai_batch_poll_max_seconds", 600)
+    max_wait = config.get("ai_batch_max_wait_minutes", 0) * 60
+    started = time.monotonic()
+
+    while True:
+        for batch_id in sorted(waiting):
+            batch = await client.messages.batches.retrieve(batch_id)
+            if batch.processing_status != "ended":
+                continue
+
+            results = []
+            async for entry in await client.messages.batches.results(batch_id):
+                text = None
+                if entry.result.type == SUCCEEDED:
+                    text = response_text(entry.result.message)
+                results.append((entry.custom_id, entry.result.type, text))
+            journal.finish_batch(batch_id, results)
+            waiting.discard(batch_id)
+
+            failed = sum(1 for _, status, _ in results if status != SUCCEEDED)
+            logger.info(
+                f"Batch {batch_id} abgeschlossen: {len(results) - failed} erfolgreich, "
+                f"{failed} fehlgeschlagen"
+            )
+
+        if not waiting:
+            return
+        if max_wait and time.monotonic() - started + interval > max_wait:
+            raise BatchPending(waiting)
+
+        logger.info(f"{len(waiting)} Batches in Bearbeitung — nächste Abfrage in {interval}s")
+        await asyncio.sleep(interval)
+        interval = min(interval * 2, max_interval)
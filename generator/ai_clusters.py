@@ -0,0 +1,143 @@
+"""Signatur-Cluster für die Icebreaker-Generierung.
+
+Viele Apollo-Leads unterscheiden sich nur in Name und E-Mail: gleicher
+Titel, gleiche Branche, Firmengröße, Stadt, Firma und Segment. Solche Leads
+bekommen einen gemeinsamen, namensfreien Icebreaker pro Cluster (optional
+mehrere Varianten, reihum verteilt). Platzhalter wie `{company_name}` werden
+anschließend lokal pro Lead ersetzt.
+
+Eine Obergrenze pro Variante verhindert, dass große Cluster alle denselben
+Text bekommen: Leads darüber hinaus werden einzeln generiert, ebenso Leads,
+deren Icebreaker nach dem Ersetzen gegen die Regeln verstößt (`rejected`).
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from generator.segmenter import AssignmentLike
+
+logger = logging.getLogger(__name__)
+
+# Personenbezogene Felder — nie Teil einer Signatur
+PERSONAL_FIELDS = frozenset({"first_name", "last_name", "email", "company_name"})
+
+# Platzhalter, die in Cluster-Icebreakern lokal ersetzt werden
+PLACEHOLDERS = ("company_name", "first_name", "last_name")
+
+# Signatur: (company_id, segment_id, Feldwerte ...)
+ClusterSignature = tuple[str, ...]
+
+
+@dataclass
+class ClusterStats:
+    """Zähler eines Clusters.
+
+    `representative` ist das erste Mitglied; aus ihm wird der Prompt aller
+    Mitglieder gebaut, damit Schreibvarianten derselben Signatur (z.B.
+    "Facility Manager" / "FACILITY MANAGER") einen gemeinsamen Call teilen.
+    """
+
+    signature: ClusterSignature
+    size: int
+    variants: int
+    served: int = 0
+    individual: int = 0
+    rejected: int = 0
+    representative: AssignmentLike | None = field(default=None, repr=False, compare=False)
+
+    @property
+    def leads_per_variant(self) -> float:
+        return self.served / self.variants if self.variants else 0.0
+
+
+@dataclass
+class ClusterSlot:
+    """Zuordnung eines Assignments zu Cluster und Variante."""
+
+    cluster: ClusterStats
+    variant: int
+
+
+def signature_fields(fields: Sequence[str]) -> list[str]:
+    """Signaturfelder ohne personenbezogene Felder (mit Warnung)."""
+    personal = [f for f in fields if f in PERSONAL_FIELDS]
+    if personal:
+        logger.warning(f"Personenbezogene Felder nicht in der Cluster-Signatur: {personal}")
+    return [f for f in fields if f not in PERSONAL_FIELDS]
+
+
+def signature(assignment: AssignmentLike, fields: Sequence[str]) -> ClusterSignature:
+    """Cluster-Signatur eines Assignments (Firma, Segment, normalisierte Feldwerte)."""
+    lead = assignment.lead
+    values = (" ".join(str(lead.get(f, "") or "").split()).casefold() for f in fields)
+    return (assignment.company_id, assignment.segment_id, *values)
+
+
+def plan_clusters(
+    assignments: Sequence[AssignmentLike],
+    fields: Sequence[str],
+    max_variants: int = 1,
+    max_per_variant: int = 0,
+    min_size: int = 2,
+) -> tuple[list[ClusterSlot | None], list[ClusterStats]]:
+    """Teilt Assignments in Signatur-Cluster auf.
+
+    Cluster ab `min_size` Leads bekommen bis zu `max_variants` Varianten,
+    die reihum vergeben werden. Jede Variante deckt höchstens
+    `max_per_variant` Leads ab (0 = unbegrenzt); weitere Leads und kleinere
+    Cluster werden einzeln generiert.
+
+    Args:
+        assignments: Lead-Zuordnungen.
+        fields: Lead-Felder der Signatur.
+        max_variants: Maximale Varianten pro Cluster.
+        max_per_variant: Maximale Leads pro Variante (0 = unbegrenzt).
+        min_size: Mindestgröße eines Clusters.
+
+    Returns:
+        (Slot pro Assignment oder None für Einzelgenerierung, Cluster-Statistik).
+    """
+    signatures = [signature(a, fields) for a in assignments]
+    sizes: dict[ClusterSignature, int] = {}
+    first: dict[ClusterSignature, AssignmentLike] = {}
+    for assignment, sig in zip(assignments, signatures):
+        sizes[sig] = sizes.get(sig, 0) + 1
+        first.setdefault(sig, assignment)
+
+    clusters: dict[ClusterSignature, ClusterStats] = {}
+    for sig, size in sizes.items():
+        if size < min_size:
+            continue
+        variants = max(1, max_variants)
+        if max_per_variant:
+            variants = min(variants, math.ceil(size / max_per_variant))
+        clusters[sig] = ClusterStats(sig, size, variants, representative=first[sig])
+
+    slots: list[ClusterSlot | None] = []
+    for sig in signatures:
+        cluster = clusters.get(sig)
+        if cluster is None:
+            slots.append(None)
+            continue
+        member = cluster.served + cluster.individual
+        if max_per_variant and member >= cluster.variants * max_per_variant:
+            cluster.individual += 1
+            slots.append(None)
+        else:
+            cluster.served += 1
+            slots.append(ClusterSlot(cluster, member % cluster.variants))
+
+    return slots, sorted(clusters.values(), key=lambda c: -c.size)
+
+
+def personalize(template: str, lead: Mapping) -> str:
+    """Ersetzt die Platzhalter eines Cluster-Icebreakers durch Lead-Felder."""
+    for name in PLACEHOLDERS:
+        template = template.replace("{" + name + "}", str(lead.get(name, "") or ""))
+    return template
@@ -1,30 +1,51 @@
-"""KI-basierte Icebreaker-Generierung mit Claude API."""
+"""KI-basierte Icebreaker-Generierung mit Claude API.
+
+Das anthropic-SDK wird erst beim ersten API-Aufruf importiert; Fallback und
+Prompt-Bau kommen ohne aus. Antworten können über einen `ResponseCache`
+zwischen Läufen wiederverwendet werden.
+
+Der Prompt besteht aus drei Schichten: statische Anweisungen und Firmen-Prefix
+gehen als gecachte System-Blöcke (Prompt-Caching der API) raus, nur die
+Lead-Daten ändern sich pro Anfrage.
+"""
+
+from __future__ import annotations
 
 import asyncio
+import json
 import logging
 import os
+import time
+from collections.abc import AsyncIterator, Sequence
+from typing import TYPE_CHECKING, NamedTuple
 
-import anthropic
+from generator.ai_clusters import (
+    ClusterSlot,
+    ClusterStats,
+    personalize,
+    plan_clusters,
+    signature_fields,
+)
+from generator.rate_control import CircuitBreaker, RateController, RetryScheduler
+from generator.response_cache import response_key
 
-from generator.segmenter import Assignment
+if TYPE_CHECKING:
+    from generator.response_cache import ResponseCache
+    from generator.segmenter import AssignmentLike
 
 logger = logging.getLogger(__name__)
 
-# Prompt-Template für die Icebreaker-Generierung
-ICEBREAKER_PROMPT = """Du bist ein deutscher Vertriebstexter für ein Handwerksunternehmen aus Hamburg.
+# Assignments pro Cache-Abfrage beim Streamen
+_PREFETCH_SIZE = 500
 
-Schreibe einen personalisierten ersten Satz (maximal 2 Sätze) für eine Kaltakquise-E-Mail.
+# Maximale Länge eines Icebreakers (Zeichen)
+MAX_ICEBREAKER_LENGTH = 200
 
-Empfänger:
-- Name: {first_name} {last_name}
-- Titel: {title}
-- Firma: {company_name}
-- Branche: {industry}
-- Firmengröße: {company_size}
-- Stadt: {city}
+# Statischer Teil des Prompts (Rolle, Regeln, Beispiele) — als System-Block gecacht
+ICEBREAKER_INSTRUCTIONS = """Du bist ein deutscher Vertriebstexter für ein Handwerksunternehmen aus Hamburg.
 
-Absender-Firma: {gruppenwerk_firma}
-Absender-Leistung: {kernleistung}
+Schreibe einen personalisierten ersten Satz (maximal 2 Sätze) für eine Kaltakquise-E-Mail.
+Absender und Empfänger stehen in den folgenden Angaben.
 
 Regeln:
 - Auf Deutsch schreiben
@@ -33,15 +54,72 @@ Regeln:
 - Nenne KEINEN konkreten Preis oder Prozentsatz
 - Stelle keine Frage im Icebreaker
 - Maximal 2 Sätze
-- Kein "Sehr geehrte/r" — starte direkt mit dem Inhalt nach "Hallo {{first_name}},"
+- Kein "Sehr geehrte/r" — starte direkt mit dem Inhalt nach "Hallo {first_name},"
 
 Beispiele für gute Icebreaker:
 - "als Facility Manager bei einer der größeren Hamburger Hausverwaltungen wissen Sie, wie wichtig kurze Reaktionszeiten bei Reparaturen sind."
 - "wir arbeiten bereits mit mehreren Hausverwaltungen im Raum Hamburg zusammen und haben gesehen, dass bei der Fassadensanierung häufig Gerüstbau-Kapazitäten der Engpass sind."
-- "mit über 200 Mitarbeitern und einem wachsenden Immobilienbestand stehen bei {{company_name}} vermutlich regelmäßig Instandhaltungsthemen auf der Agenda."
+- "mit über 200 Mitarbeitern und einem wachsenden Immobilienbestand stehen bei {company_name} vermutlich regelmäßig Instandhaltungsthemen auf der Agenda."
 
 Schreibe NUR den Icebreaker, nichts anderes."""
 
+# Firmen-Prefix — zweiter gecachter System-Block, gleich für alle Leads einer Firma
+COMPANY_PROMPT = """Absender-Firma: {gruppenwerk_firma}
+Absender-Leistung: {kernleistung}"""
+
+# Lead-Daten — die eigentliche Nachricht
+LEAD_PROMPT = """Empfänger:
+- Name: {first_name} {last_name}
+- Titel: {title}
+- Firma: {company_name}
+- Branche: {industry}
+- Firmengröße: {company_size}
+- Stadt: {city}"""
+
+
+class PromptParts(NamedTuple):
+    """Prompt in drei Schichten: statisch, pro Firma, pro Lead."""
+
+    instructions: str
+    company: str
+    lead: str
+
+    def text(self) -> str:
+        """Kompletter Prompt als ein Text."""
+        return "\n\n".join(self)
+
+
+# Lead-Daten eines Signatur-Clusters (namensfrei, Firma als Platzhalter)
+CLUSTER_LEAD_PROMPT = """Empfänger: steht für mehrere gleichartige Kontakte — nenne keinen Namen. Für die Firma des Empfängers schreibe wörtlich {{company_name}}.
+{fields}
+Variante: {variant}"""
+
+# Beschriftung der Lead-Felder im Cluster-Prompt
+FIELD_LABELS: dict[str, str] = {
+    "title": "Titel",
+    "industry": "Branche",
+    "company_size": "Firmengröße",
+    "city": "Stadt",
+    "seniority": "Seniorität",
+    "departments": "Abteilung",
+}
+
+# Nachricht einer Paketanfrage (mehrere Leads derselben Firma und Branche)
+PACK_PROMPT = """Schreibe für jeden der folgenden {count} Empfänger einen eigenen Icebreaker nach den Regeln oben (höchstens 200 Zeichen, keine Frage).
+Abweichend davon antworte NUR mit einem JSON-Array, ein Eintrag pro ID:
+[{{"id": "1", "icebreaker": "..."}}, {{"id": "2", "icebreaker": "..."}}]
+
+{leads}"""
+
+# Nachricht einer Lead-Anfrage (ein Lead, mehrere zugeordnete Absender-Firmen)
+LEAD_GROUP_PROMPT = """Schreibe für den folgenden Empfänger je einen eigenen Icebreaker pro Absender-Firma ({count} Firmen) nach den Regeln oben (höchstens 200 Zeichen, keine Frage). Jeder Icebreaker passt zur Leistung der jeweiligen Firma.
+Abweichend davon antworte NUR mit einem JSON-Array, ein Eintrag pro Firmen-ID:
+[{{"id": "1", "icebreaker": "..."}}, {{"id": "2", "icebreaker": "..."}}]
+
+{lead}
+
+{companies}"""
+
 # Regelbasierte Fallback-Icebreaker
 FALLBACK_ICEBREAKERS: dict[str, str] = {
     "hausverwaltung": (
@@ -71,33 +149,224 @@ FALLBACK_ICEBREAKERS: dict[str, str] = {
 }
 
 
-def build_prompt(assignment: Assignment, rules: dict) -> str:
-    """Baut den Prompt für die Claude API.
+def build_prompt_parts(assignment: AssignmentLike, rules: dict) -> PromptParts:
+    """Baut den Prompt für die Claude API in Schichten (für Prompt-Caching).
 
     Args:
         assignment: Lead-Zuordnung.
         rules: Segmentierungsregeln (für Firmeninfos).
 
     Returns:
-        Fertiger Prompt-String.
+        PromptParts mit statischem Teil, Firmen-Prefix und Lead-Daten.
     """
     lead = assignment.lead
     company_rules = rules.get("segmentierung", {}).get(assignment.company_id, {})
 
-    return ICEBREAKER_PROMPT.format(
-        first_name=lead.get("first_name", ""),
-        last_name=lead.get("last_name", ""),
-        title=lead.get("title", ""),
-        company_name=lead.get("company_name", ""),
-        industry=lead.get("industry", ""),
-        company_size=lead.get("company_size", ""),
-        city=lead.get("city", "Hamburg"),
-        gruppenwerk_firma=company_rules.get("display_name", assignment.company_id),
-        kernleistung=company_rules.get("kernleistung", ""),
+    return PromptParts(
+        instructions=ICEBREAKER_INSTRUCTIONS,
+        company=COMPANY_PROMPT.format(
+            gruppenwerk_firma=company_rules.get("display_name", assignment.company_id),
+            kernleistung=company_rules.get("kernleistung", ""),
+        ),
+        lead=LEAD_PROMPT.format(
+            first_name=lead.get("first_name", ""),
+            last_name=lead.get("last_name", ""),
+            title=lead.get("title", ""),
+            company_name=lead.get("company_name", ""),
+            industry=lead.get("industry", ""),
+            company_size=lead.get("company_size", ""),
+            city=lead.get("city", "Hamburg"),
+        ),
+    )
+
+
+def build_cluster_prompt(
+    assignment: AssignmentLike, rules: dict, fields: Sequence[str], variant: int = 0
+) -> PromptParts:
+    """Baut den namensfreien Prompt für einen Signatur-Cluster.
+
+    Die Lead-Schicht enthält nur die Signaturfelder und die Variante; Name,
+    E-Mail und Firma des Leads fehlen.
+
+    Args:
+        assignment: Ein Assignment des Clusters (liefert Firma und Feldwerte).
+        rules: Segmentierungsregeln (für Firmeninfos).
+        fields: Signaturfelder.
+        variant: Nummer der Variante (ab 0).
+
+    Returns:
+        PromptParts mit statischem Teil, Firmen-Prefix und Cluster-Daten.
+    """
+    parts = build_prompt_parts(assignment, rules)
+    lines = "\n".join(
+        f"- {FIELD_LABELS.get(f, f)}: {assignment.lead.get(f, '') or ''}" for f in fields
+    )
+    return parts._replace(
+        lead=CLUSTER_LEAD_PROMPT.format(fields=lines, variant=variant + 1)
     )
 
 
-def fallback_single(assignment: Assignment) -> str:
+def build_prompt(assignment: AssignmentLike, rules: dict) -> str:
+    """Baut den Prompt für die Claude API.
+
+    Args:
+        assignment: Lead-Zuordnung.
+        rules: Segmentierungsregeln (für Firmeninfos).
+
+    Returns:
+        Fertiger Prompt-String.
+    """
+    return build_prompt_parts(assignment, rules).text()
+
+
+def build_request(prompt: PromptParts, config: dict) -> dict:
+    """Parameter für `messages.create` (auch für die Message Batches API).
+
+    Statischer Teil und Firmen-Prefix gehen als System-Blöcke mit
+    `cache_control` raus, die Lead-Daten als User-Nachricht. Mit
+    `ai_prompt_caching: false` entfallen die Cache-Marker.
+
+    Args:
+        prompt: Prompt-Schichten aus `build_prompt_parts`.
+        config: App-Konfiguration.
+
+    Returns:
+        Dict mit model, max_tokens, temperature, system und messages.
+    """
+    caching = config.get("ai_prompt_caching", True)
+
+    def block(text: str) -> dict:
+        result = {"type": "text", "text": text}
+        if caching:
+            result["cache_control"] = {"type": "ephemeral"}
+        return result
+
+    return {
+        "model": config.get("ai_model", "claude-sonnet-4-5-20250929"),
+        "max_tokens": config.get("ai_max_tokens", 150),
+        "temperature": config.get("ai_temperature", 0.7),
+        "system": [block(prompt.instructions), block(prompt.company)],
+        "messages": [{"role": "user", "content": prompt.lead}],
+    }
+
+
+def request_key(prompt: PromptParts, config: dict) -> str:
+    """Cache-Schlüssel für den Prompt mit den Parametern aus der Konfiguration."""
+    request = build_request(prompt, config)
+    return response_key(
+        prompt.text(), request["model"], request["temperature"], request["max_tokens"]
+    )
+
+
+def estimate_tokens(prompt: PromptParts, config: dict) -> int:
+    """Grobe Schätzung des Token-Verbrauchs einer Anfrage (Input + max. Output)."""
+    return sum(len(part) for part in prompt) // 3 + config.get("ai_max_tokens", 150)
+
+
+def response_text(message) -> str:
+    """Icebreaker-Text aus einer API-Antwort (validiert auf maximal 200 Zeichen)."""
+    text = message.content[0].text.strip()
+    if len(text) > MAX_ICEBREAKER_LENGTH:
+        text = text[: MAX_ICEBREAKER_LENGTH - 3] + "..."
+    return text
+
+
+def valid_icebreaker(text: object) -> bool:
+    """Prüft einen Icebreaker gegen die Regeln (nicht leer, ≤ 200 Zeichen, keine Frage)."""
+    return (
+        isinstance(text, str)
+        and 0 < len(text.strip()) <= MAX_ICEBREAKER_LENGTH
+        and "?" not in text
+    )
+
+
+def build_pack_request(prompts: Sequence[PromptParts], config: dict) -> dict:
+    """Parameter für eine Paketanfrage: mehrere Leads derselben Firma und Branche.
+
+    System-Blöcke wie bei `build_request` (gleicher Firmen-Prefix), die
+    Leads stehen nummeriert in einer Nachricht. `max_tokens` wächst mit der
+    Paketgröße.
+
+    Args:
+        prompts: Prompt-Schichten aller Leads (gleiche Firma).
+        config: App-Konfiguration.
+
+    Returns:
+        Dict für `messages.create`.
+    """
+    request = build_request(prompts[0], config)
+    leads = "\n\n".join(f"ID {number}\n{p.lead}" for number, p in enumerate(prompts, 1))
+    request["max_tokens"] = request["max_tokens"] * len(prompts)
+    request["messages"] = [
+        {"role": "user", "content": PACK_PROMPT.format(count=len(prompts), leads=leads)}
+    ]
+    return request
+
+
+def build_lead_request(prompts: Sequence[PromptParts], config: dict) -> dict:
+    """Parameter für eine Lead-Anfrage: ein Lead, mehrere zugeordnete Firmen.
+
+    Nur die statischen Anweisungen gehen als gecachter System-Block raus;
+    die Lead-Daten stehen einmal in der Nachricht, gefolgt von den
+    nummerierten Firmen-Angaben (inkl. Kernleistung).
+
+    Args:
+        prompts: Prompt-Schichten aller Assignments des Leads.
+        config: App-Konfiguration.
+
+    Returns:
+        Dict für `messages.create`.
+    """
+    request = build_request(prompts[0], config)
+    companies = "\n\n".join(
+        f"ID {number}\n{p.company}" for number, p in enumerate(prompts, 1)
+    )
+    request["system"] = request["system"][:1]
+    request["max_tokens"] = request["max_tokens"] * len(prompts)
+    request["messages"] = [{
+        "role": "user",
+        "content": LEAD_GROUP_PROMPT.format(
+            count=len(prompts), lead=prompts[0].lead, companies=companies
+        ),
+    }]
+    return request
+
+
+def parse_pack(text: str, count: int) -> dict[str, str]:
+    """Liest die Icebreaker einer Paketantwort aus.
+
+    Args:
+        text: Antworttext (JSON-Array, ggf. mit Text drumherum).
+        count: Anzahl Leads im Paket (IDs 1 bis count).
+
+    Returns:
+        ID → Icebreaker für alle gültigen Einträge. Fehlende, doppelte oder
+        regelwidrige Einträge fehlen im Ergebnis.
+    """
+    start, end = text.find("["), text.rfind("]")
+    try:
+        entries = json.loads(text[start : end + 1]) if 0 <= start < end else []
+    except ValueError:
+        entries = []
+
+    ids = {str(number) for number in range(1, count + 1)}
+    found: dict[str, str] = {}
+    seen: set[str] = set()
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        entry_id = str(entry.get("id", ""))
+        if entry_id in seen:
+            found.pop(entry_id, None)
+            continue
+        seen.add(entry_id)
+        icebreaker = entry.get("icebreaker")
+        if entry_id in ids and valid_icebreaker(icebreaker):
+            found[entry_id] = icebreaker.strip()
+    return found
+
+
+def fallback_single(assignment: AssignmentLike) -> str:
     """Generiert einen regelbasierten Fallback-Icebreaker.
 
     Args:
@@ -118,7 +387,7 @@ def fallback_single(assignment: Assignment) -> str:
     )
 
 
-def fallback_batch(assignments: list[Assignment]) -> list[str]:
+def fallback_batch(assignments: Sequence[AssignmentLike]) -> list[str]:
     """Generiert Fallback-Icebreaker für eine Liste von Assignments.
 
     Args:
@@ -130,84 +399,626 @@ def fallback_batch(assignments: list[Assignment]) -> list[str]:
     return [fallback_single(a) for a in assignments]
 
 
-async def generate_batch(
-    assignments: list[Assignment],
-    rules: dict,
-    config: dict,
-) -> list[str]:
-    """Generiert Icebreaker per Claude API für einen Batch von Assignments.
+class IcebreakerGenerator:
+    """Langlebiger Icebreaker-Generator für einen ganzen Lauf.
 
-    Nutzt asyncio für parallele API-Calls mit Concurrency-Limit.
-    Bei Fehler für einzelne Leads wird auf Fallback zurückgegriffen.
+    Teilt einen AsyncAnthropic-Client (mit Connection-Pool), die
+    Ratensteuerung (`RateController`), den `CircuitBreaker`, den
+    Antwort-Cache und die laufenden Anfragen (Single-Flight) über alle
+    Batches. Muss innerhalb der Event-Loop erzeugt werden, in der er
+    genutzt wird.
+    """
 
-    Args:
-        assignments: Liste von Lead-Zuordnungen.
-        rules: Segmentierungsregeln.
-        config: App-Konfiguration.
+    def __init__(
+        self,
+        rules: dict,
+        config: dict,
+        cache: ResponseCache | None = None,
+        client=None,
+        rate: RateController | None = None,
+    ) -> None:
+        self.rules = rules
+        self.config = config
+        self.cache = cache
+        self.client = client
+        self.rate = rate or RateController.from_config(config)
+        self.breaker = CircuitBreaker.from_config(config)
+        self.max_retries = config.get("ai_max_retries", 3)
+        self.delay = config.get("ai_rate_limit_delay_seconds", 1)
+        self.retries = RetryScheduler(
+            base_delay=self.delay,
+            max_delay=config.get("ai_retry_max_delay_seconds", 60),
+            jitter=config.get("ai_retry_jitter", 0.5),
+        )
+        self.requests = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_write_tokens = 0
+        self.latencies: list[float] = []
 
-    Returns:
-        Liste von Icebreaker-Texten (gleiche Reihenfolge wie Eingabe).
-    """
-    api_key = os.environ.get("ANTHROPIC_API_KEY", "")
-    if not api_key:
-        logger.warning("ANTHROPIC_API_KEY nicht gesetzt — nutze Fallback-Icebreaker")
-        return fallback_batch(assignments)
+        # Paketanfragen: Paketgröße passt sich der Fehlerquote an
+        self.max_pack_size = max(1, config.get("ai_pack_size", 1))
+        self.pack_size = float(self.max_pack_size)
+        self.max_pack_failure_rate = config.get("ai_pack_max_failure_rate", 0.1)
+        self.pack_linger = config.get("ai_pack_linger_seconds", 0.05)
+        self.packs = 0
+        self.pack_retries = 0
+
+        # Ein Call pro Lead für alle zugeordneten Firmen (hat Vorrang vor Paketen)
+        self.group_by_lead = config.get("ai_group_by_lead", False)
+        self.max_fan_out = max(1, len(rules.get("segmentierung", {})))
+
+        # Signatur-Cluster: ein namensfreier Icebreaker für gleichartige Leads
+        self.cluster_fields = signature_fields(config.get("ai_cluster_signature") or [])
+        self.clusters: list[ClusterStats] = []
+
+        self._cached: dict[str, str] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._packs: dict[_PackGroup, list[_PackItem]] = {}
+        self._pack_timers: dict[_PackGroup, asyncio.TimerHandle] = {}
+        self._pack_tasks: set[asyncio.Task] = set()
+
+        if self.client is None and os.environ.get("ANTHROPIC_API_KEY", ""):
+            import anthropic
+
+            self.client = anthropic.AsyncAnthropic(api_key=os.environ["ANTHROPIC_API_KEY"])
+
+    @property
+    def enabled(self) -> bool:
+        """False ohne API-Key — dann liefert `generate` nur Fallbacks."""
+        return self.client is not None
+
+    def prefetch(self, assignments: Sequence[AssignmentLike]) -> None:
+        """Lädt gecachte Antworten für mehrere Assignments mit einer Abfrage."""
+        if self.cache is None:
+            return
+        keys = [request_key(build_prompt_parts(a, self.rules), self.config) for a in assignments]
+        self._prefetch_keys(keys)
+
+    def _prefetch_keys(self, keys: Sequence[str]) -> None:
+        """Lädt gecachte Antworten vorab; Cache-Fehler gelten als Fehlschläge."""
+        try:
+            self._cached.update(self.cache.get_many(k for k in keys if k not in self._cached))
+        except Exception as e:
+            logger.warning(f"Antwort-Cache nicht lesbar, frage ohne Cache an: {e}")
+
+    async def generate(
+        self, assignment: AssignmentLike, cluster: ClusterSlot | None = None
+    ) -> str:
+        """Generiert den Icebreaker für ein Assignment (Fallback bei Fehler).
+
+        Mit `cluster` wird zuerst der gemeinsame Icebreaker des Clusters
+        (Variante) personalisiert; ist er ungültig, wird einzeln generiert.
+        """
+        if not self.enabled:
+            return fallback_single(assignment)
+
+        if cluster is not None:
+            text = await self._cluster_text(assignment, cluster)
+            if text is not None:
+                return text
+
+        prompt = build_prompt_parts(assignment, self.rules)
+        key = request_key(prompt, self.config)
+        packed = self.group_by_lead or self.max_pack_size > 1
+        text = await self._single_flight(assignment, prompt, key, packed)
+        if text is not None:
+            return text
+
+        # Nach allen Retries oder bei offenem Circuit Breaker: Fallback
+        if self.breaker.is_open:
+            logger.debug(
+                f"Fallback-Icebreaker für {assignment.lead.get('email', '?')} "
+                f"— Circuit Breaker offen"
+            )
+        else:
+            logger.warning(
+                f"Fallback-Icebreaker für {assignment.lead.get('email', '?')} "
+                f"nach {self.max_retries} fehlgeschlagenen Versuchen"
+            )
+        return fallback_single(assignment)
+
+    async def generate_many(self, assignments: Sequence[AssignmentLike]) -> list[str]:
+        """Generiert Icebreaker für mehrere Assignments (gleiche Reihenfolge).
+
+        Die Anfragen starten nach Firma gruppiert, damit der gecachte
+        Firmen-Prefix zwischen aufeinanderfolgenden Calls warm bleibt (mit
+        `ai_group_by_lead` nach Lead gruppiert).
+        """
+        self.prefetch(assignments)
+        clusters = self._plan(assignments)
+        order = self._order(assignments)
+        tasks = [
+            asyncio.ensure_future(self.generate(assignments[i], clusters[i])) for i in order
+        ]
+        texts: list[str] = [""] * len(assignments)
+        for index, text in zip(order, await asyncio.gather(*tasks)):
+            texts[index] = text
+        return texts
+
+    async def stream(
+        self,
+        assignments: Sequence[AssignmentLike],
+        max_pending: int = 500,
+    ) -> AsyncIterator[list[tuple[int, str]]]:
+        """Generiert Icebreaker und liefert sie in Fertigstellungsreihenfolge.
+
+        Höchstens `max_pending` Assignments sind gleichzeitig in Arbeit oder
+        warten auf Abholung; neue werden erst nachgeschoben, wenn Ergebnisse
+        abgeholt wurden. Die Assignments werden nach Firma gruppiert
+        abgearbeitet, damit der gecachte Firmen-Prefix warm bleibt (mit
+        `ai_group_by_lead` nach Lead, damit ein Call alle Firmen abdeckt).
+
+        Yields:
+            Listen von (Index in `assignments`, Icebreaker) — alle Ergebnisse,
+            die seit der letzten Abholung fertig geworden sind.
+        """
+        queue: asyncio.Queue[tuple[int, str]] = asyncio.Queue()
+        slots = asyncio.Semaphore(max_pending)
+        tasks: set[asyncio.Task] = set()
+
+        clusters = self._plan(assignments)
+
+        async def work(index: int, assignment: AssignmentLike) -> None:
+            try:
+                text = await self.generate(assignment, clusters[index])
+            except Exception as e:
+                logger.error(f"Icebreaker-Fehler für {assignment.lead.get('email', '?')}: {e}")
+                text = fallback_single(assignment)
+            await queue.put((index, text))
+
+        async def feed() -> None:
+            order = self._order(assignments)
+            for start in range(0, len(order), _PREFETCH_SIZE):
+                indices = order[start : start + _PREFETCH_SIZE]
+                chunk = [assignments[i] for i in indices]
+                self.prefetch(chunk)
+                for index, assignment in zip(indices, chunk):
+                    await slots.acquire()
+                    task = asyncio.create_task(work(index, assignment))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+
+        feeder = asyncio.create_task(feed())
+        getter: asyncio.Task | None = None
+        try:
+            remaining = len(assignments)
+            while remaining:
+                if feeder.done():
+                    feeder.result()
+                    ready = [await queue.get()]
+                else:
+                    # Zusammen mit dem Feeder warten, damit dessen Fehler nicht hängen bleiben
+                    getter = asyncio.create_task(queue.get())
+                    await asyncio.wait({getter, feeder}, return_when=asyncio.FIRST_COMPLETED)
+                    if not getter.done():
+                        getter.cancel()
+                        continue
+                    ready = [getter.result()]
+                while not queue.empty():
+                    ready.append(queue.get_nowait())
+                for _ in ready:
+                    slots.release()
+                remaining -= len(ready)
+                yield ready
+        finally:
+            feeder.cancel()
+            if getter is not None:
+                getter.cancel()
+            for task in list(tasks):
+                task.cancel()
+
+    async def aclose(self) -> None:
+        """Schließt den Client und dessen Verbindungen."""
+        for timer in self._pack_timers.values():
+            timer.cancel()
+        for task in list(self._pack_tasks):
+            task.cancel()
+        if self.client is not None:
+            await self.client.close()
+
+    def stats(self) -> dict:
+        """API-Verbrauch, Prompt-Cache-Nutzung und Latenz dieses Laufs.
+
+        Returns:
+            Dict mit requests, input_tokens, output_tokens, cache_read_tokens,
+            cache_write_tokens, cache_hit_rate (Anteil gecachter Input-Tokens),
+            latency_p50 und latency_p95 in Sekunden, clusters und cluster_leads
+            (Leads mit Cluster-Icebreaker) sowie packs (Paket- und
+            Lead-Anfragen), pack_retries (einzeln nachgefordert) und pack_size.
+        """
+        total_input = self.input_tokens + self.cache_read_tokens + self.cache_write_tokens
+        latencies = sorted(self.latencies)
+
+        def percentile(q: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+        return {
+            "requests": self.requests,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_read_tokens": self.cache_read_tokens,
+            "cache_write_tokens": self.cache_write_tokens,
+            "cache_hit_rate": self.cache_read_tokens / total_input if total_input else 0.0,
+            "latency_p50": percentile(0.5),
+            "latency_p95": percentile(0.95),
+            "clusters": len(self.clusters),
+            "cluster_leads": sum(c.served - c.rejected for c in self.clusters),
+            "packs": self.packs,
+            "pack_retries": self.pack_retries,
+            "pack_size": int(self.pack_size),
+        }
+
+    def _plan(self, assignments: Sequence[AssignmentLike]) -> list[ClusterSlot | None]:
+        """Teilt die Assignments in Signatur-Cluster auf (ohne Signatur: keine).
+
+        Lädt gecachte Cluster-Icebreaker vorab mit einer Abfrage.
+        """
+        if not self.cluster_fields or not self.enabled:
+            return [None] * len(assignments)
+
+        slots, clusters = plan_clusters(
+            assignments,
+            self.cluster_fields,
+            max_variants=self.config.get("ai_cluster_variants", 1),
+            max_per_variant=self.config.get("ai_cluster_max_per_variant", 0),
+            min_size=self.config.get("ai_cluster_min_size", 2),
+        )
+        self.clusters.extend(clusters)
+
+        used: dict[tuple[int, int], ClusterSlot] = {}
+        for slot in slots:
+            if slot is not None:
+                used.setdefault((id(slot.cluster), slot.variant), slot)
+        if self.cache is not None and used:
+            self._prefetch_keys(
+                [request_key(self._cluster_prompt(slot), self.config) for slot in used.values()]
+            )
+
+        if clusters:
+            logger.info(
+                f"{len(clusters)} Cluster mit {sum(c.served for c in clusters)} Leads, "
+                f"{len(used)} Cluster-Icebreaker"
+            )
+        return slots
+
+    def _cluster_prompt(self, slot: ClusterSlot) -> PromptParts:
+        """Namensfreier Prompt einer Cluster-Variante (aus dem Repräsentanten, für alle gleich)."""
+        return build_cluster_prompt(
+            slot.cluster.representative, self.rules, self.cluster_fields, slot.variant
+        )
+
+    async def _cluster_text(self, assignment: AssignmentLike, slot: ClusterSlot) -> str | None:
+        """Personalisierter Cluster-Icebreaker; None wenn er ungültig ist."""
+        prompt = self._cluster_prompt(slot)
+        key = request_key(prompt, self.config)
+        template = await self._single_flight(assignment, prompt, key, packed=False)
+        if template is not None:
+            text = personalize(template, assignment.lead)
+            if valid_icebreaker(text) and "{" not in text:
+                return text
+        slot.cluster.rejected += 1
+        return None
+
+    async def _single_flight(
+        self, assignment: AssignmentLike, prompt: PromptParts, key: str, packed: bool
+    ) -> str | None:
+        """Antwort für einen Prompt: Cache, laufende Anfrage oder neuer Call."""
+        text = self._cached.get(key)
+        if text is not None:
+            return text
+
+        task = self._inflight.get(key)
+        if task is None:
+            if packed:
+                task = asyncio.ensure_future(self._packed(assignment, prompt, key))
+            else:
+                task = asyncio.ensure_future(self._request(assignment, prompt, key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def _order(self, assignments: Sequence[AssignmentLike]) -> list[int]:
+        """Abarbeitungsreihenfolge: nach Lead oder nach Firma gruppiert."""
+        if self.group_by_lead:
+            return lead_order(assignments, self.rules)
+        return company_order(assignments)
+
+    async def _packed(
+        self, assignment: AssignmentLike, prompt: PromptParts, key: str
+    ) -> str | None:
+        """Icebreaker über eine Paket- oder Lead-Anfrage; fehlende Einträge einzeln nachfordern."""
+        group: _PackGroup | None = None
+        if self.group_by_lead:
+            group = (True, prompt.lead, "")
+        elif self.pack_size >= 2:
+            group = (False, assignment.company_id, assignment.segment_id)
+
+        if group is not None:
+            item = _PackItem(assignment, prompt, key, asyncio.get_running_loop().create_future())
+            pending = self._packs.setdefault(group, [])
+            pending.append(item)
+            if len(pending) >= self._group_size(group):
+                self._flush_pack(group)
+            elif group not in self._pack_timers:
+                self._pack_timers[group] = asyncio.get_running_loop().call_later(
+                    self.pack_linger, self._flush_pack, group
+                )
+            text = await item.future
+            if text is not None:
+                return text
+
+        text = await self._request(assignment, prompt, key)
+        if text is not None and not self.group_by_lead and self.pack_size < 2:
+            # Erfolgreiche Einzelcalls tasten sich langsam zurück zu Paketen
+            self.pack_size = min(self.max_pack_size, self.pack_size + 0.1)
+        return text
 
-    model = config.get("ai_model", "claude-sonnet-4-5-20250929")
-    max_tokens = config.get("ai_max_tokens", 150)
-    temperature = config.get("ai_temperature", 0.7)
-    max_retries = config.get("ai_max_retries", 3)
-    concurrency = config.get("ai_concurrency", 10)
-    delay = config.get("ai_rate_limit_delay_seconds", 1)
+    def _group_size(self, group: _PackGroup) -> int:
+        """Maximale Einträge pro Anfrage: alle Firmen eines Leads bzw. Paketgröße."""
+        return self.max_fan_out if group[0] else max(1, int(self.pack_size))
 
-    client = anthropic.AsyncAnthropic(api_key=api_key)
-    semaphore = asyncio.Semaphore(concurrency)
+    def _flush_pack(self, group: _PackGroup) -> None:
+        """Schickt die wartenden Assignments einer Gruppe als Paket los."""
+        timer = self._pack_timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        pending = self._packs.pop(group, [])
+        size = self._group_size(group)
+        for start in range(0, len(pending), size):
+            chunk = pending[start : start + size]
+            task = asyncio.ensure_future(self._send_pack(chunk, by_lead=group[0]))
+            self._pack_tasks.add(task)
+            task.add_done_callback(self._pack_tasks.discard)
 
-    async def generate_one(assignment: Assignment) -> str:
-        async with semaphore:
-            prompt = build_prompt(assignment, rules)
+    async def _send_pack(self, items: list[_PackItem], by_lead: bool = False) -> None:
+        """Ein API-Call für mehrere Assignments; ungültige Einträge liefern None.
 
-            for attempt in range(max_retries):
+        Mit `by_lead` gehören alle Einträge zum selben Lead (eine Anfrage
+        für alle Firmen), sonst zur selben Firma und Branche. Bei einem Rate
+        Limit wartet das ganze Paket im `RetryScheduler` und wird erneut
+        gesendet; scheitert der Call anders (oder auch der letzte Versuch),
+        bekommen alle Einträge None und werden von `_packed` einzeln (mit
+        Retries) angefragt. Nur Pakete passen die Paketgröße an, Rate Limits
+        nicht.
+        """
+        import anthropic
+
+        if len(items) < 2:
+            for item in items:
+                item.future.set_result(None)
+            return
+
+        prompts = [item.prompt for item in items]
+        estimate = sum(estimate_tokens(p, self.config) for p in prompts)
+        results: dict[str, str] = {}
+        rate_limited = False
+        retry_delay = 0.0
+        try:
+            for attempt in range(max(1, self.max_retries)):
+                if attempt and not self.breaker.is_open:
+                    await self.retries.wait(retry_delay)
+                rate_limited = False
                 try:
-                    response = await client.messages.create(
-                        model=model,
-                        max_tokens=max_tokens,
-                        temperature=temperature,
-                        messages=[{"role": "user", "content": prompt}],
+                    async with self.rate.slot():
+                        if not self.breaker.allow():
+                            for item in items:
+                                item.future.set_result(None)
+                            items = []
+                            return
+                        await self.rate.acquire(estimate)
+                        self.requests += 1
+                        self.packs += 1
+                        started = time.monotonic()
+                        build = build_lead_request if by_lead else build_pack_request
+                        raw = await self.client.messages.with_raw_response.create(
+                            **build(prompts, self.config)
+                        )
+                        response = await raw.parse()
+                        latency = time.monotonic() - started
+                        self.latencies.append(latency)
+                        self.rate.on_success(latency, raw.headers, _used_tokens(response), estimate)
+                        self.breaker.record_success()
+                        self._count_usage(response)
+                        results = parse_pack(response.content[0].text, len(items))
+                    break
+
+                except anthropic.RateLimitError as e:
+                    rate_limited = True
+                    retry_after = self.rate.on_rate_limited(getattr(e.response, "headers", None))
+                    retry_delay = self.retries.backoff(attempt, minimum=retry_after)
+                    logger.warning(
+                        f"Rate Limit bei Paketanfrage — {len(items)} Leads gemeinsam erneut in "
+                        f"{retry_delay:.1f}s (Versuch {attempt + 1}/{self.max_retries})"
                     )
-                    text = response.content[0].text.strip()
 
-                    # Validierung: maximal 200 Zeichen
-                    if len(text) > 200:
-                        text = text[:197] + "..."
+                except anthropic.APIError as e:
+                    self.breaker.record_failure()
+                    logger.error(f"API-Fehler bei Paketanfrage: {e} — {len(items)} Leads einzeln")
+                    break
+
+        except asyncio.CancelledError:
+            for item in items:
+                item.future.cancel()
+            items = []
+            raise
+
+        finally:
+            failed = 0
+            for number, item in enumerate(items, 1):
+                text = results.get(str(number))
+                if text is None:
+                    failed += 1
+                else:
+                    if self.cache is not None:
+                        self.cache.put(item.key, text)
+                    self._cached[item.key] = text
+                if not item.future.done():
+                    item.future.set_result(text)
+            self.pack_retries += failed
+            if items and not by_lead and not rate_limited:
+                self._adapt_pack_size(failed / len(items))
+
+    def _adapt_pack_size(self, failure_rate: float) -> None:
+        """Halbiert die Paketgröße bei zu vielen Fehlern, sonst +1 bis zum Maximum."""
+        if failure_rate > self.max_pack_failure_rate:
+            self.pack_size = max(1.0, self.pack_size / 2)
+            logger.info(
+                f"Paketgröße auf {int(self.pack_size)} reduziert ({failure_rate:.0%} ungültig)"
+            )
+        else:
+            self.pack_size = min(float(self.max_pack_size), self.pack_size + 1)
+
+    async def _request(
+        self, assignment: AssignmentLike, prompt: PromptParts, key: str
+    ) -> str | None:
+        """API-Call mit Retries; None wenn alle Versuche fehlschlagen.
+
+        Jeder Versuch belegt einen Slot nur für die Dauer des Calls. Nach
+        einem Fehler wartet die Anfrage ohne Slot im `RetryScheduler`. Ist
+        der Circuit Breaker offen, gibt es ohne Call und ohne Warten None.
+        """
+        import anthropic
+
+        estimate = estimate_tokens(prompt, self.config)
+        retry_delay = 0.0
+        for attempt in range(self.max_retries):
+            if attempt and not self.breaker.is_open:
+                await self.retries.wait(retry_delay)
+
+            async with self.rate.slot():
+                if not self.breaker.allow():
+                    return None
+                try:
+                    await self.rate.acquire(estimate)
+                    self.requests += 1
+                    started = time.monotonic()
+                    raw = await self.client.messages.with_raw_response.create(
+                        **build_request(prompt, self.config)
+                    )
+                    response = await raw.parse()
+                    latency = time.monotonic() - started
+                    self.latencies.append(latency)
+                    self.rate.on_success(
+                        latency, raw.headers, _used_tokens(response), estimate
+                    )
+                    self.breaker.record_success()
+                    text = response_text(response)
+                    self._count_usage(response)
 
                     logger.debug(
                         f"Icebreaker für {assignment.lead.get('email', '?')}: {text[:50]}..."
                     )
+                    if self.cache is not None:
+                        self.cache.put(key, text)
+                    self._cached[key] = text
                     return text
 
-                except anthropic.RateLimitError:
-                    wait_time = delay * (2 ** attempt)
+                except anthropic.RateLimitError as e:
+                    retry_after = self.rate.on_rate_limited(getattr(e.response, "headers", None))
+                    retry_delay = self.retries.backoff(attempt, minimum=retry_after)
                     logger.warning(
-                        f"Rate Limit erreicht — warte {wait_time}s "
-                        f"(Versuch {attempt + 1}/{max_retries})"
+                        f"Rate Limit erreicht — Wiederholung in {retry_delay:.1f}s, Concurrency "
+                        f"{self.rate.limit:.1f} (Versuch {attempt + 1}/{self.max_retries})"
                     )
-                    await asyncio.sleep(wait_time)
 
                 except anthropic.APIError as e:
+                    self.breaker.record_failure()
+                    retry_delay = self.retries.backoff(attempt)
                     logger.error(
                         f"API-Fehler für {assignment.lead.get('email', '?')}: {e} "
-                        f"(Versuch {attempt + 1}/{max_retries})"
+                        f"(Versuch {attempt + 1}/{self.max_retries})"
                     )
-                    if attempt < max_retries - 1:
-                        await asyncio.sleep(delay)
+        return None
 
-            # Nach allen Retries: Fallback
-            logger.warning(
-                f"Fallback-Icebreaker für {assignment.lead.get('email', '?')} "
-                f"nach {max_retries} fehlgeschlagenen Versuchen"
-            )
-            return fallback_single(assignment)
+    def _count_usage(self, response) -> None:
+        """Summiert die Token-Nutzung einer Antwort."""
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.input_tokens += getattr(usage, "input_tokens", 0) or 0
+            self.output_tokens += getattr(usage, "output_tokens", 0) or 0
+            self.cache_read_tokens += getattr(usage, "cache_read_input_tokens", 0) or 0
+            self.cache_write_tokens += getattr(usage, "cache_creation_input_tokens", 0) or 0
+
+
+# Gruppe wartender Assignments: (pro Lead?, Lead-Daten bzw. Firma, Segment)
+_PackGroup = tuple[bool, str, str]
+
+
+class _PackItem(NamedTuple):
+    """Wartendes Assignment einer Paketanfrage."""
+
+    assignment: AssignmentLike
+    prompt: PromptParts
+    key: str
+    future: asyncio.Future
+
+
+def company_order(assignments: Sequence[AssignmentLike]) -> list[int]:
+    """Indizes der Assignments, stabil nach Firma gruppiert.
+
+    Aufeinanderfolgende Anfragen mit demselben Firmen-Prefix treffen den
+    Prompt-Cache der API, solange er warm ist.
+    """
+    codes = getattr(assignments, "company_codes", None)
+    if codes is not None:
+        return codes.argsort(kind="stable").tolist()
+    return sorted(range(len(assignments)), key=lambda i: assignments[i].company_id)
+
+
+def lead_order(assignments: Sequence[AssignmentLike], rules: dict) -> list[int]:
+    """Indizes der Assignments, stabil nach Lead gruppiert.
+
+    Alle Zuordnungen eines Leads folgen aufeinander, damit sie in einer
+    gemeinsamen Anfrage landen.
+    """
+    rows = getattr(assignments, "rows", None)
+    if rows is not None:
+        return rows.argsort(kind="stable").tolist()
+    leads = [build_prompt_parts(a, rules).lead for a in assignments]
+    return sorted(range(len(assignments)), key=leads.__getitem__)
+
+
+def _used_tokens(response) -> int | None:
+    """Tatsächlicher Token-Verbrauch einer Antwort (Input + Output)."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    return (getattr(usage, "input_tokens", 0) or 0) + (getattr(usage, "output_tokens", 0) or 0)
+
+
+async def generate_batch(
+    assignments: Sequence[AssignmentLike],
+    rules: dict,
+    config: dict,
+    cache: ResponseCache | None = None,
+) -> list[str]:
+    """Generiert Icebreaker per Claude API für einen Batch von Assignments.
+
+    Nutzt asyncio für parallele API-Calls mit Concurrency-Limit.
+    Identische Prompts werden nur einmal angefragt; mit `cache` werden
+    bereits bekannte Antworten ohne API-Call übernommen.
+    Bei Fehler für einzelne Leads wird auf Fallback zurückgegriffen.
+    Für ganze Läufe `IcebreakerGenerator` direkt nutzen.
+
+    Args:
+        assignments: Liste von Lead-Zuordnungen.
+        rules: Segmentierungsregeln.
+        config: App-Konfiguration.
+        cache: Optionaler persistenter Antwort-Cache.
+
+    Returns:
+        Liste von Icebreaker-Texten (gleiche Reihenfolge wie Eingabe).
+    """
+    generator = IcebreakerGenerator(rules, config, cache)
+    if not generator.enabled:
+        logger.warning("ANTHROPIC_API_KEY nicht gesetzt — nutze Fallback-Icebreaker")
+        return fallback_batch(assignments)
 
-    tasks = [generate_one(a) for a in assignments]
-    return await asyncio.gather(*tasks)
+    try:
+        return await generator.generate_many(assignments)
+    finally:
+        await generator.aclose()
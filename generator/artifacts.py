@@ -0,0 +1,198 @@
+"""Vorkompilierte Artefakte für einen schnellen CLI-Start.
+
+Geparste YAML-Dateien, kompilierte Segmentierungsregeln und aufgelöste
+PDF-Links werden in einem `__compiled__`-Verzeichnis neben den Quellen
+abgelegt (analog zu `__pycache__`). Ein Artefakt gilt, solange sich seine
+Quelldateien nicht geändert haben: Zuerst werden mtime und Größe
+verglichen, bei Abweichung der SHA-256 des Inhalts. Unveränderter Inhalt
+mit neuer mtime (z.B. nach `git checkout`) wird weiterverwendet.
+
+Die Jinja-Bytecodes der Templates landen in `templates/__compiled__/jinja`
+(siehe `template_engine.create_environment`).
+
+Kann ein Artefakt nicht geschrieben werden (z.B. schreibgeschütztes
+Verzeichnis), wird ohne Cache weitergearbeitet.
+
+Die Artefakt-Version enthält einen Hash über die Quelltexte der Module,
+deren Objekte gepickelt werden (`CODE_MODULES`). Ändert sich z.B. das
+Layout von `CompiledRules` oder `KeywordMatcher`, werden alte Pickles
+verworfen statt mit veraltetem Aufbau geladen.
+
+yaml, pandas und der Segmenter werden nur beim Neubau importiert — ein
+Warmstart lädt nur die Pickles.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import pickle
+from collections.abc import Callable
+from functools import cache
+from pathlib import Path
+from typing import TYPE_CHECKING, TypeVar
+
+if TYPE_CHECKING:
+    from generator.segmenter import CompiledRules
+
+logger = logging.getLogger(__name__)
+
+# Bei Änderungen am Format der Artefakte erhöhen
+ARTIFACT_VERSION = "1"
+COMPILED_DIRNAME = "__compiled__"
+
+# Module, deren Klassen in Artefakten gepickelt werden (Teil der Version)
+CODE_MODULES = (
+    "artifacts.py",
+    "keyword_matcher.py",
+    "pdf_linker.py",
+    "segment_cache.py",
+    "segment_profile.py",
+    "segmenter.py",
+)
+
+T = TypeVar("T")
+
+
+def cached_artifact(sources: list[Path], kind: str, build: Callable[[list[bytes]], T]) -> T:
+    """Lädt ein Artefakt aus dem Cache oder baut es aus den Quellen neu.
+
+    Args:
+        sources: Quelldateien (das Artefakt liegt neben der ersten).
+        kind: Art des Artefakts (Teil des Dateinamens).
+        build: Baut das Artefakt aus den Dateiinhalten der Quellen.
+
+    Returns:
+        Das (ggf. gecachte) Artefakt.
+    """
+    sources = [Path(p) for p in sources]
+    artifact_path = sources[0].parent / COMPILED_DIRNAME / f"{sources[0].name}.{kind}.pkl"
+    stats = [os.stat(p) for p in sources]
+    stamps = [(s.st_mtime_ns, s.st_size) for s in stats]
+
+    cached = _read(artifact_path)
+    if cached is not None and cached["kind"] == kind and len(cached["sources"]) == len(sources):
+        if cached["stamps"] == stamps:
+            return cached["value"]
+
+    contents = [p.read_bytes() for p in sources]
+    digests = [hashlib.sha256(c).hexdigest() for c in contents]
+
+    if cached is not None and cached.get("digests") == digests:
+        # Nur die mtime hat sich geändert — Artefakt weiterverwenden
+        value = cached["value"]
+    else:
+        logger.debug(f"Kompiliere {kind} aus {', '.join(str(p) for p in sources)}")
+        value = build(contents)
+
+    _write(artifact_path, {
+        "version": artifact_version(),
+        "kind": kind,
+        "sources": [str(p) for p in sources],
+        "stamps": stamps,
+        "digests": digests,
+        "value": value,
+    })
+    return value
+
+
+def load_yaml_cached(path: str | Path) -> dict:
+    """Lädt eine YAML-Datei (geparst gecacht).
+
+    Raises:
+        FileNotFoundError: Wenn die Datei nicht existiert.
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Konfigurationsdatei nicht gefunden: {path}")
+    return cached_artifact([path], "yaml", lambda contents: _parse_yaml(contents[0]))
+
+
+def load_rules(path: str | Path) -> tuple[dict, CompiledRules]:
+    """Lädt rules.yaml samt kompilierten Keyword-Matchern.
+
+    Raises:
+        FileNotFoundError: Wenn die Datei nicht existiert.
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Konfigurationsdatei nicht gefunden: {path}")
+
+    def build(contents: list[bytes]) -> tuple[dict, CompiledRules]:
+        from generator.segmenter import compile_rules
+
+        rules = _parse_yaml(contents[0])
+        return rules, compile_rules(rules)
+
+    return cached_artifact([path], "rules", build)
+
+
+def load_links(links_path: str | Path, rules_path: str | Path) -> tuple[dict, dict]:
+    """Lädt links.yaml und löst die Links aller Firma/Segment-Kombinationen auf.
+
+    Returns:
+        Tuple (Links-Konfiguration, {(Firma, Segment): Link}).
+
+    Raises:
+        FileNotFoundError: Wenn eine der Dateien nicht existiert.
+    """
+    links_path, rules_path = Path(links_path), Path(rules_path)
+    for path in (links_path, rules_path):
+        if not path.exists():
+            raise FileNotFoundError(f"Konfigurationsdatei nicht gefunden: {path}")
+
+    def build(contents: list[bytes]) -> tuple[dict, dict]:
+        from generator.pdf_linker import resolve_all
+
+        links = _parse_yaml(contents[0])
+        return links, resolve_all(links, _parse_yaml(contents[1]))
+
+    return cached_artifact([links_path, rules_path], "links", build)
+
+
+@cache
+def artifact_version() -> str:
+    """Artefakt-Version samt Hash über die Quelltexte in `CODE_MODULES`."""
+    digest = hashlib.sha256(ARTIFACT_VERSION.encode())
+    package_dir = Path(__file__).parent
+    for name in CODE_MODULES:
+        try:
+            digest.update((package_dir / name).read_bytes())
+        except OSError:
+            digest.update(b"\0")
+    return f"{ARTIFACT_VERSION}-{digest.hexdigest()[:16]}"
+
+
+def _parse_yaml(content: bytes) -> dict:
+    """Parst YAML-Inhalt (leere Datei = leeres Dict)."""
+    import yaml
+
+    return yaml.safe_load(content.decode("utf-8")) or {}
+
+
+def _read(path: Path) -> dict | None:
+    """Liest ein Artefakt; fehlende, veraltete oder defekte Dateien = None."""
+    try:
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.debug(f"Artefakt {path} nicht lesbar: {e}")
+        return None
+    if not isinstance(data, dict) or data.get("version") != artifact_version():
+        return None
+    return data
+
+
+def _write(path: Path, data: dict) -> None:
+    """Schreibt ein Artefakt atomar; Fehler werden nur geloggt."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+    except OSError as e:
+        logger.debug(f"Artefakt {path} nicht geschrieben: {e}")
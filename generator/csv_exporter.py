@@ -1,11 +1,17 @@
 """Export der generierten E-Mails als Instantly.ai-kompatible CSV-Dateien."""
 
+from __future__ import annotations
+
 import logging
 from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import pandas as pd
 
+if TYPE_CHECKING:
+    from generator.suppression import SuppressionIndex
+
 logger = logging.getLogger(__name__)
 
 # Spaltenreihenfolge für Instantly.ai CSV
@@ -71,6 +77,7 @@ def export(
     output_dir: str | Path,
     separator: str = ",",
     encoding: str = "utf-8",
+    suppression: SuppressionIndex | None = None,
 ) -> list[Path]:
     """Exportiert die Ergebnisse als Instantly-CSVs, eine pro Kampagne.
 
@@ -79,6 +86,9 @@ def export(
         output_dir: Ausgabeverzeichnis.
         separator: CSV-Trennzeichen.
         encoding: Datei-Encoding.
+        suppression: Optional — Sperr-Index, in den alle exportierten
+            Adressen eingetragen werden. Der Bloom-Filter wird einmal am
+            Ende gespeichert, nicht pro Kampagne.
 
     Returns:
         Liste der geschriebenen Dateipfade.
@@ -110,6 +120,12 @@ def export(
         logger.info(f"Exportiert: {filepath} ({len(export_df)} Leads)")
         written_files.append(filepath)
 
+        if suppression is not None:
+            suppression.add(export_df["email"], campaign_id)
+
+    if suppression is not None:
+        suppression.flush()
+
     logger.info(f"Gesamt: {len(valid_df)} E-Mails in {len(written_files)} Dateien exportiert")
     return written_files
 
@@ -1,13 +1,21 @@
 """Apollo.io CSV einlesen, validieren und bereinigen."""
 
+import csv
 import logging
+from collections.abc import Iterator
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
-from email_validator import EmailNotValidError, validate_email
+
+from generator.email_check import is_valid_email, valid_email_mask
 
 logger = logging.getLogger(__name__)
 
+# Version der Einlese- und Bereinigungslogik — bei Änderungen erhöhen,
+# damit gespeicherte Snapshots (siehe snapshot.py) ungültig werden
+READER_VERSION = "4"
+
 # Pflichtfelder — ohne diese wird der Lead übersprungen
 REQUIRED_COLUMNS = [
     "first_name",
@@ -34,12 +42,58 @@ OPTIONAL_COLUMNS = [
     "company_website",
 ]
 
+# Nur diese Spalten werden aus dem Apollo-Export gelesen (60+ Spalten)
+PROJECTED_COLUMNS = REQUIRED_COLUMNS + OPTIONAL_COLUMNS
+
+# Werte, die pandas standardmäßig als fehlend liest — der Arrow-Pfad nutzt
+# dieselbe Liste, damit beide Engines identische DataFrames liefern
+NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+]
+
+# Spalten mit wenigen verschiedenen Werten — werden als Kategorie gespeichert
+CATEGORICAL_COLUMNS = [
+    "industry",
+    "company_size",
+    "company_revenue",
+    "city",
+    "state",
+    "country",
+    "seniority",
+    "departments",
+]
+
+
+def _string_dtype() -> str:
+    """Arrow-basierte Strings wenn pyarrow installiert ist, sonst pandas-Strings."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return "string"
+    return "string[pyarrow]"
+
+
+# Dtype für alle übrigen Textspalten
+STRING_DTYPE = _string_dtype()
 
-def read_and_validate(path: str | Path) -> pd.DataFrame:
+
+def read_and_validate(
+    path: str | Path,
+    engine: str = "auto",
+    memory_map: bool = True,
+) -> pd.DataFrame:
     """Liest Apollo.io CSV ein und validiert die Struktur.
 
+    Es werden nur die PROJECTED_COLUMNS gelesen. Mit engine "auto" wird der
+    multithreaded Arrow-Parser genutzt, wenn pyarrow installiert ist,
+    sonst der pandas-Parser.
+
     Args:
         path: Pfad zur CSV-Datei.
+        engine: "auto", "pyarrow" oder "pandas".
+        memory_map: Eingabedatei per Memory-Mapping lesen.
 
     Returns:
         Bereinigter DataFrame mit allen Pflicht- und optionalen Spalten.
@@ -48,12 +102,141 @@ def read_and_validate(path: str | Path) -> pd.DataFrame:
         FileNotFoundError: Wenn die Datei nicht existiert.
         ValueError: Wenn Pflichtspalten fehlen.
     """
-    path = Path(path)
-    if not path.exists():
-        raise FileNotFoundError(f"Eingabedatei nicht gefunden: {path}")
+    path = _check_path(path)
+
+    columns = _projected_columns(path)
+
+    if _resolve_engine(engine) == "pyarrow":
+        logger.info(f"Lese CSV (Arrow): {path}")
+        df = _read_with_arrow(path, columns, memory_map)
+    else:
+        logger.info(f"Lese CSV: {path}")
+        df = pd.read_csv(path, dtype=str, usecols=columns, memory_map=memory_map)
+
+    df = prepare_frame(df)
+
+    logger.info(f"{len(df)} gültige Leads geladen")
+    return df
+
+
+def read_in_chunks(
+    path: str | Path,
+    chunk_size: int,
+    drop_duplicates: bool = True,
+    memory_map: bool = True,
+    engine: str = "auto",
+) -> Iterator[pd.DataFrame]:
+    """Liest eine Apollo.io CSV blockweise ein (Streaming-Modus).
+
+    Jeder Block wird wie bei `read_and_validate` geprüft, bereinigt und
+    validiert. Der Speicherbedarf hängt damit von `chunk_size` ab, nicht
+    von der Dateigröße. Beim Deduplizieren wird der Zustand über alle
+    Blöcke hinweg mitgeführt, sodass das Ergebnis dem von `deduplicate`
+    auf der Gesamtdatei entspricht. Mit engine "auto" wird der Arrow-
+    Streaming-Reader genutzt, wenn pyarrow installiert ist.
+
+    Args:
+        path: Pfad zur CSV-Datei.
+        chunk_size: Anzahl Zeilen pro Block.
+        drop_duplicates: Doppelte E-Mails über alle Blöcke entfernen.
+        memory_map: Eingabedatei per Memory-Mapping lesen.
+        engine: "auto", "pyarrow" oder "pandas".
+
+    Yields:
+        Bereinigte DataFrames (leere Blöcke werden übersprungen).
 
-    logger.info(f"Lese CSV: {path}")
-    df = pd.read_csv(path, dtype=str)
+    Raises:
+        FileNotFoundError: Wenn die Datei nicht existiert.
+        ValueError: Wenn Pflichtspalten fehlen oder chunk_size < 1.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size muss positiv sein: {chunk_size}")
+
+    path = _check_path(path)
+    columns = _projected_columns(path)
+    if _resolve_engine(engine) == "pyarrow":
+        logger.info(f"Lese CSV blockweise (Arrow): {path} ({chunk_size} Zeilen pro Block)")
+        raw_chunks = _iter_arrow_chunks(path, columns, chunk_size, memory_map)
+    else:
+        logger.info(f"Lese CSV blockweise: {path} ({chunk_size} Zeilen pro Block)")
+        raw_chunks = _iter_pandas_chunks(path, columns, chunk_size, memory_map)
+
+    seen_emails: set[str] | None = set() if drop_duplicates else None
+    total = 0
+
+    for chunk in raw_chunks:
+        chunk = prepare_frame(chunk)
+        if seen_emails is not None:
+            chunk = deduplicate(chunk, seen=seen_emails)
+        if chunk.empty:
+            continue
+        total += len(chunk)
+        yield chunk
+
+    logger.info(f"{total} gültige Leads geladen")
+
+
+def _iter_pandas_chunks(
+    path: Path, columns: list[str] | None, chunk_size: int, memory_map: bool
+) -> Iterator[pd.DataFrame]:
+    """Rohe Blöcke über den pandas-Parser."""
+    with pd.read_csv(
+        path, dtype=str, usecols=columns, chunksize=chunk_size, memory_map=memory_map
+    ) as reader:
+        yield from reader
+
+
+def _iter_arrow_chunks(
+    path: Path, columns: list[str] | None, chunk_size: int, memory_map: bool
+) -> Iterator[pd.DataFrame]:
+    """Rohe Blöcke über den Arrow-Streaming-Reader (gleicher Index wie pandas)."""
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    if columns is None:
+        raise pd.errors.EmptyDataError("No columns to parse from file")
+
+    read_options, convert_options = _arrow_options(columns)
+
+    def to_frame(table: pa.Table, offset: int) -> pd.DataFrame:
+        df = table.to_pandas()
+        df.index = pd.RangeIndex(offset, offset + len(df))
+        return df
+
+    source = pa.memory_map(str(path)) if memory_map else pa.OSFile(str(path))
+    with source:
+        reader = pa_csv.open_csv(
+            source, read_options=read_options, convert_options=convert_options
+        )
+        pending: list[pa.RecordBatch] = []
+        buffered = 0
+        offset = 0
+        for batch in reader:
+            pending.append(batch)
+            buffered += batch.num_rows
+            while buffered >= chunk_size:
+                table = pa.Table.from_batches(pending, schema=reader.schema)
+                yield to_frame(table.slice(0, chunk_size), offset)
+                offset += chunk_size
+                rest = table.slice(chunk_size)
+                pending = rest.to_batches()
+                buffered = rest.num_rows
+        if buffered:
+            yield to_frame(pa.Table.from_batches(pending, schema=reader.schema), offset)
+
+
+def prepare_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Prüft, ergänzt, bereinigt und validiert einen rohen Apollo-DataFrame.
+
+    Args:
+        df: Roher DataFrame (ganze Datei oder ein Block).
+
+    Returns:
+        Bereinigter DataFrame mit allen Pflicht- und optionalen Spalten.
+
+    Raises:
+        ValueError: Wenn Pflichtspalten fehlen.
+    """
     df = df.fillna("")
 
     # Pflichtspalten prüfen
@@ -69,24 +252,102 @@ def read_and_validate(path: str | Path) -> pd.DataFrame:
             df[col] = ""
 
     df = clean_data(df)
-    df = validate_emails(df)
+    return validate_emails(df)
 
-    logger.info(f"{len(df)} gültige Leads geladen")
-    return df
+
+def _check_path(path: str | Path) -> Path:
+    """Wandelt den Pfad um und prüft, ob die Datei existiert."""
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Eingabedatei nicht gefunden: {path}")
+    return path
+
+
+def _projected_columns(path: Path) -> list[str] | None:
+    """Liest die Kopfzeile und gibt die benötigten vorhandenen Spalten zurück.
+
+    Returns:
+        Spaltenliste in Dateireihenfolge, oder None bei leerer Datei
+        (der Parser meldet den Fehler dann selbst).
+    """
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        header = next(csv.reader(f), None)
+    if not header:
+        return None
+    return [col for col in header if col in PROJECTED_COLUMNS]
+
+
+def _resolve_engine(engine: str) -> str:
+    """Wählt den CSV-Parser; fällt ohne pyarrow auf pandas zurück."""
+    if engine not in ("auto", "pyarrow", "pandas"):
+        raise ValueError(f"Unbekannte CSV-Engine: '{engine}'")
+    if engine == "pandas":
+        return "pandas"
+
+    try:
+        import pyarrow.csv  # noqa: F401
+    except ImportError:
+        if engine == "pyarrow":
+            logger.warning("pyarrow nicht installiert — nutze pandas-Parser")
+        return "pandas"
+    return "pyarrow"
+
+
+def _arrow_options(columns: list[str]) -> tuple:
+    """Lese- und Konvertierungsoptionen des Arrow-Parsers (wie pandas dtype=str)."""
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    read_options = pa_csv.ReadOptions(use_threads=True)
+    convert_options = pa_csv.ConvertOptions(
+        include_columns=columns,
+        column_types={col: pa.string() for col in columns},
+        null_values=NA_VALUES,
+        strings_can_be_null=True,
+    )
+    return read_options, convert_options
+
+
+def _read_with_arrow(
+    path: Path, columns: list[str] | None, memory_map: bool
+) -> pd.DataFrame:
+    """Liest die projizierten Spalten mit dem multithreaded Arrow-Parser."""
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    if columns is None:
+        raise pd.errors.EmptyDataError("No columns to parse from file")
+
+    read_options, convert_options = _arrow_options(columns)
+
+    source = pa.memory_map(str(path)) if memory_map else pa.OSFile(str(path))
+    with source:
+        table = pa_csv.read_csv(
+            source, read_options=read_options, convert_options=convert_options
+        )
+    return table.to_pandas()
 
 
 def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     """Bereinigt Daten: Whitespace entfernen, leere Pflichtfelder filtern.
 
+    Spalten aus CATEGORICAL_COLUMNS werden kategorisch gespeichert (Whitespace
+    wird einmal pro Kategorie statt pro Zeile entfernt), alle übrigen als
+    STRING_DTYPE.
+
     Args:
         df: Roher DataFrame.
 
     Returns:
-        Bereinigter DataFrame (Leads mit leeren Pflichtfeldern entfernt).
+        Bereinigter, kompakter DataFrame (Leads mit leeren Pflichtfeldern
+        entfernt).
     """
     # Whitespace entfernen
     for col in df.columns:
-        df[col] = df[col].astype(str).str.strip()
+        if col in CATEGORICAL_COLUMNS:
+            df[col] = _strip_categorical(df[col])
+        else:
+            df[col] = df[col].astype(STRING_DTYPE).str.strip()
 
     # Leads ohne Pflichtfelder entfernen
     initial_count = len(df)
@@ -103,16 +364,39 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     return df.reset_index(drop=True)
 
 
-def validate_emails(df: pd.DataFrame) -> pd.DataFrame:
+def _strip_categorical(series: pd.Series) -> pd.Series:
+    """Wandelt eine Spalte in eine Kategorie um und entfernt Whitespace pro Kategorie.
+
+    Kategorien, die nach dem Strippen zusammenfallen (z.B. "Hamburg " und
+    "Hamburg"), werden zusammengeführt.
+    """
+    categorical = series.astype(str).astype("category")
+    stripped = categorical.cat.categories.str.strip()
+    new_categories = pd.Index(stripped.unique())
+
+    mapping = new_categories.get_indexer(stripped)
+    codes = categorical.cat.codes.to_numpy()
+    new_codes = np.where(codes >= 0, mapping[codes], -1)
+
+    return pd.Series(
+        pd.Categorical.from_codes(new_codes, categories=new_categories),
+        index=series.index,
+        name=series.name,
+    )
+
+
+def validate_emails(df: pd.DataFrame, workers: int | None = None) -> pd.DataFrame:
     """Prüft E-Mail-Adressen auf gültiges Format (RFC 5322).
 
     Args:
         df: DataFrame mit 'email' Spalte.
+        workers: Prozesse für die vollständige Prüfung (siehe
+            `email_check.valid_email_mask`).
 
     Returns:
         DataFrame nur mit gültigen E-Mail-Adressen.
     """
-    valid_mask = df["email"].apply(_is_valid_email)
+    valid_mask = valid_email_mask(df["email"], workers)
     invalid_count = (~valid_mask).sum()
 
     if invalid_count > 0:
@@ -127,24 +411,27 @@ def validate_emails(df: pd.DataFrame) -> pd.DataFrame:
 
 def _is_valid_email(email: str) -> bool:
     """Prüft eine einzelne E-Mail-Adresse."""
-    try:
-        validate_email(email, check_deliverability=False)
-        return True
-    except EmailNotValidError:
-        return False
+    return is_valid_email(email)
 
 
-def deduplicate(df: pd.DataFrame) -> pd.DataFrame:
+def deduplicate(df: pd.DataFrame, seen: set[str] | None = None) -> pd.DataFrame:
     """Entfernt doppelte Leads basierend auf E-Mail-Adresse.
 
     Args:
         df: DataFrame mit 'email' Spalte.
+        seen: Optional — bereits gesehene E-Mails aus vorherigen Blöcken.
+            Wird um die E-Mails dieses DataFrames ergänzt.
 
     Returns:
         DataFrame ohne Duplikate (erster Eintrag wird behalten).
     """
     initial_count = len(df)
-    df = df.drop_duplicates(subset=["email"], keep="first").reset_index(drop=True)
+    keep = ~df["email"].duplicated(keep="first")
+    if seen:
+        keep &= ~df["email"].isin(seen)
+    df = df[keep].reset_index(drop=True)
+    if seen is not None:
+        seen.update(df["email"])
     removed = initial_count - len(df)
 
     if removed > 0:
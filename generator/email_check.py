@@ -0,0 +1,146 @@
+"""Schnelle E-Mail-Validierung für große Lead-Listen.
+
+Liefert dieselbe gültig/ungültig-Maske wie ein `validate_email`-Aufruf pro
+Adresse, arbeitet aber in drei Stufen:
+
+1. Vektorisierter Regex-Vorfilter verwirft offensichtlichen Müll
+   (kein oder mehrere @, Whitespace) für die ganze Spalte auf einmal.
+2. Domain-Prüfungen (inkl. IDNA-Normalisierung) werden pro Domain einmal
+   ausgeführt und gecacht. Einfache ASCII-Adressen mit gültiger Domain
+   werden danach ohne weiteren `validate_email`-Aufruf akzeptiert.
+3. Die restlichen Adressen (z.B. internationalisierte Local-Parts) laufen
+   durch die vollständige RFC-Prüfung — ab einer Mindestmenge parallel in
+   einem Prozess-Pool.
+"""
+
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from email_validator import EmailNotValidError, validate_email
+
+logger = logging.getLogger(__name__)
+
+# Alles, was nicht genau ein @ ohne Whitespace enthält, ist sicher ungültig
+# (quoted Local-Parts und Display-Names sind in validate_email deaktiviert)
+_PREFILTER_PATTERN = r"[^@\s]+@[^@\s]+"
+
+# Dot-Atom aus RFC 5322 (identisch zu email_validator.rfc_constants)
+_ATEXT = r"a-zA-Z0-9_!#\$%&'\*\+\-/=\?\^`\{\|\}~"
+_DOT_ATOM = re.compile("[" + _ATEXT + "]+(?:\\.[" + _ATEXT + "]+)*\\Z")
+
+_LOCAL_PART_MAX_LENGTH = 64
+_EMAIL_MAX_LENGTH = 254
+
+# Ab dieser Anzahl verbleibender Adressen lohnt sich ein Prozess-Pool
+PARALLEL_THRESHOLD = 5000
+DOMAIN_CACHE_SIZE = 100_000
+
+
+def is_valid_email(email: str) -> bool:
+    """Prüft eine einzelne E-Mail-Adresse vollständig (RFC 5322)."""
+    try:
+        validate_email(email, check_deliverability=False)
+        return True
+    except EmailNotValidError:
+        return False
+
+
+def valid_email_mask(emails: pd.Series, workers: int | None = None) -> pd.Series:
+    """Berechnet die gültig/ungültig-Maske für eine Spalte von E-Mails.
+
+    Args:
+        emails: Spalte mit E-Mail-Adressen.
+        workers: Prozesse für die vollständige Prüfung (Default: CPU-Anzahl,
+            1 = kein Pool).
+
+    Returns:
+        Bool-Series mit demselben Index wie `emails`.
+    """
+    if emails.empty:
+        return pd.Series(False, index=emails.index, dtype=bool)
+
+    # Jede Adresse nur einmal prüfen
+    codes, uniques = pd.factorize(emails.astype(str), use_na_sentinel=False)
+    unique_values = pd.Series(uniques, dtype=object)
+    result = np.zeros(len(unique_values), dtype=bool)
+
+    # Stufe 1: Vorfilter
+    candidates = np.flatnonzero(
+        unique_values.str.fullmatch(_PREFILTER_PATTERN).to_numpy(dtype=bool)
+    )
+
+    # Stufe 2: Domain-Cache und ASCII-Schnellpfad
+    remaining: list[int] = []
+    for idx in candidates:
+        verdict = _fast_verdict(unique_values.iat[idx])
+        if verdict is None:
+            remaining.append(idx)
+        else:
+            result[idx] = verdict
+
+    # Stufe 3: Vollständige Prüfung für den Rest
+    if remaining:
+        values = [unique_values.iat[idx] for idx in remaining]
+        result[remaining] = _full_check(values, workers)
+
+    return pd.Series(result[codes], index=emails.index, dtype=bool)
+
+
+def _fast_verdict(email: str) -> bool | None:
+    """Entscheidet einfache Fälle ohne vollständige Prüfung.
+
+    Returns:
+        False bei ungültiger Domain, True bei einfacher ASCII-Adresse mit
+        gültiger Domain, None wenn die vollständige Prüfung nötig ist.
+    """
+    local_part, domain = email.split("@")
+    domain_info = _check_domain(domain)
+    if domain_info is None:
+        return False
+
+    normalized_domain, ascii_domain = domain_info
+    if (
+        local_part.isascii()
+        and normalized_domain == ascii_domain
+        and len(local_part) <= _LOCAL_PART_MAX_LENGTH
+        and max(len(email), len(local_part) + 1 + len(ascii_domain)) <= _EMAIL_MAX_LENGTH
+        and _DOT_ATOM.match(local_part)
+    ):
+        return True
+    return None
+
+
+@lru_cache(maxsize=DOMAIN_CACHE_SIZE)
+def _check_domain(domain: str) -> tuple[str, str] | None:
+    """Prüft und normalisiert eine Domain (gecacht).
+
+    Nutzt eine Probe-Adresse mit minimalem Local-Part: Scheitert sie,
+    scheitert jede Adresse mit dieser Domain.
+
+    Returns:
+        Tuple (normalisierte Domain, IDNA-ASCII-Domain) oder None.
+    """
+    try:
+        info = validate_email(f"x@{domain}", check_deliverability=False)
+    except EmailNotValidError:
+        return None
+    return info.domain, info.ascii_domain
+
+
+def _full_check(values: list[str], workers: int | None) -> list[bool]:
+    """Vollständige Prüfung, ab PARALLEL_THRESHOLD im Prozess-Pool."""
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1 or len(values) < PARALLEL_THRESHOLD:
+        return [is_valid_email(v) for v in values]
+
+    logger.debug(f"Prüfe {len(values)} E-Mails mit {workers} Prozessen")
+    chunksize = max(1, len(values) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(is_valid_email, values, chunksize=chunksize))
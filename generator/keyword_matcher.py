@@ -0,0 +1,93 @@
+"""Aho-Corasick-Automat für die Keyword-Listen der Segmentierungsregeln.
+
+Alle Keyword-Listen eines Feldes (z.B. alle `branchen` und
+`branchen_enthalten` für die Branche) werden einmal in einen Automaten
+kompiliert. Ein Durchlauf über den Text liefert dann alle Listen, von denen
+mindestens ein Keyword als Teilstring enthalten ist — unabhängig davon,
+wie viele Firmen oder Keywords es gibt.
+
+Die Semantik entspricht `keyword.lower() in text.lower()` für jedes Keyword.
+"""
+
+from collections import deque
+from collections.abc import Iterable, Mapping
+
+
+class KeywordMatcher:
+    """Multi-Pattern-Matcher über benannte Keyword-Listen (case-insensitive)."""
+
+    def __init__(self, keyword_lists: Mapping[str, Iterable[str]]) -> None:
+        """Kompiliert die Keyword-Listen.
+
+        Args:
+            keyword_lists: Listenname → Keywords.
+        """
+        self.keyword_lists = {name: tuple(keywords) for name, keywords in keyword_lists.items()}
+        self.names: list[str] = list(self.keyword_lists)
+        self._bits = {name: 1 << i for i, name in enumerate(self.names)}
+
+        self._goto: list[dict[str, int]] = [{}]
+        self._output: list[int] = [0]
+        # Leere Keywords sind in jedem Text enthalten
+        self._always = 0
+
+        for name, keywords in self.keyword_lists.items():
+            bit = self._bits[name]
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if not keyword:
+                    self._always |= bit
+                    continue
+                state = 0
+                for char in keyword:
+                    next_state = self._goto[state].get(char)
+                    if next_state is None:
+                        next_state = len(self._goto)
+                        self._goto[state][char] = next_state
+                        self._goto.append({})
+                        self._output.append(0)
+                    state = next_state
+                self._output[state] |= bit
+
+        self._fail = self._build_failure_links()
+
+    def match_mask(self, text: str) -> int:
+        """Bitmaske aller Listen mit mindestens einem Treffer in `text`."""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        mask = self._always
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            mask |= output[state]
+        return mask
+
+    def matches(self, text: str) -> set[str]:
+        """Namen aller Listen mit mindestens einem Treffer in `text`."""
+        mask = self.match_mask(text)
+        return {name for name, bit in self._bits.items() if mask & bit}
+
+    def single(self, name: str) -> "KeywordMatcher":
+        """Eigener Automat nur für eine Liste (für die Zeitmessung pro Liste)."""
+        return KeywordMatcher({name: self.keyword_lists[name]})
+
+    def bit(self, name: str) -> int:
+        """Bit einer Liste in der Maske von `match_mask`."""
+        return self._bits[name]
+
+    def _build_failure_links(self) -> list[int]:
+        """Berechnet die Failure-Links per Breitensuche und vererbt Ausgaben."""
+        fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = fail[fallback]
+                candidate = self._goto[fallback].get(char, 0)
+                fail[next_state] = candidate if candidate != next_state else 0
+                self._output[next_state] |= self._output[fail[next_state]]
+        return fail
@@ -43,3 +43,37 @@ def resolve(company_id: str, segment_id: str, links: dict) -> str:
         )
 
     return default_link
+
+
+def resolve_all(links: dict, rules: dict) -> dict[tuple[str, str], str]:
+    """Löst die Links aller Firma/Segment-Kombinationen aus den Regeln vorab auf.
+
+    Args:
+        links: PDF-Links-Konfiguration aus links.yaml.
+        rules: Segmentierungsregeln (Firmen mit ihren Templates).
+
+    Returns:
+        Dict {(company_id, segment_id): URL-String oder ""}.
+    """
+    resolved: dict[tuple[str, str], str] = {}
+    for company_id, company_rules in rules.get("segmentierung", {}).items():
+        segments = list(company_rules.get("templates", []))
+        default_template = company_rules.get("default_template", "hausverwaltung")
+        if default_template not in segments:
+            segments.append(default_template)
+        for segment_id in segments:
+            resolved[(company_id, segment_id)] = resolve(company_id, segment_id, links)
+    return resolved
+
+
+def lookup(
+    company_id: str,
+    segment_id: str,
+    links: dict,
+    resolved: dict[tuple[str, str], str],
+) -> str:
+    """Link aus der vorab aufgelösten Tabelle (sonst wie `resolve`)."""
+    link = resolved.get((company_id, segment_id))
+    if link is None:
+        link = resolve(company_id, segment_id, links)
+    return link
@@ -0,0 +1,550 @@
+"""Adaptive Ratensteuerung für die Claude API.
+
+Ein `RateController` wird von allen Anfragen eines Laufs geteilt:
+
+- Token-Buckets für Requests und Tokens pro Minute, nachgeführt über die
+  `anthropic-ratelimit-*`-Header jeder Antwort.
+- AIMD-Concurrency: das Limit steigt additiv (+1 pro Fenster erfolgreicher
+  Anfragen) und halbiert sich bei 429; steigt die Latenz deutlich über die
+  Basislatenz, wird es leicht gesenkt statt weiter erhöht.
+- Eine gemeinsame Pause bei 429 (`retry-after`), statt dass jede Anfrage
+  für sich schläft.
+- Ein `RetryScheduler` für verzögerte Wiederholungen: fehlgeschlagene
+  Anfragen geben ihren Slot frei und warten mit Jitter in einer eigenen
+  Warteschlange, während neue Anfragen weiterlaufen.
+- Ein `CircuitBreaker` für den ganzen Lauf: steigt die Fehlerquote im
+  gleitenden Fenster über die Schwelle, gehen keine Anfragen mehr raus
+  (Fallback), bis eine Probe-Anfrage wieder durchkommt.
+
+Gelernte Limits werden als JSON gespeichert, damit der nächste Lauf direkt
+mit der passenden Geschwindigkeit startet.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Mapping
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+
+# Abstand zwischen zwei Senkungen des Concurrency-Limits (Sekunden)
+_DECREASE_COOLDOWN = 2.0
+
+# Latenz über diesem Vielfachen der Basislatenz gilt als Überlast
+_LATENCY_TOLERANCE = 2.0
+
+
+class TokenBucket:
+    """Token-Bucket mit Rate pro Minute; Kapazität = eine Minute.
+
+    Anfragen reservieren Tokens auch auf Vorschuss (negativer Stand) und
+    erhalten die Wartezeit, bis die Reservierung gedeckt ist. So werden
+    gleichzeitige Anfragen ohne Polling der Reihe nach bedient.
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self.per_minute = per_minute
+        self.tokens = per_minute
+        self._updated = clock()
+
+    def set_limit(self, per_minute: float) -> None:
+        """Setzt eine neue Rate (z.B. aus den Rate-Limit-Headern)."""
+        self._refill()
+        self.per_minute = per_minute
+        self.tokens = min(self.tokens, per_minute)
+
+    def reserve(self, amount: float) -> float:
+        """Reserviert `amount` Tokens.
+
+        Returns:
+            Wartezeit in Sekunden, bis die Reservierung gedeckt ist.
+        """
+        self._refill()
+        amount = min(amount, self.per_minute)
+        self.tokens -= amount
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / (self.per_minute / 60)
+
+    def drain_to(self, remaining: float) -> None:
+        """Gleicht den Stand an die vom Server gemeldeten Rest-Tokens an."""
+        self._refill()
+        self.tokens = min(self.tokens, remaining)
+
+    def adjust(self, delta: float) -> None:
+        """Bucht die Differenz zwischen tatsächlichem und geschätztem Verbrauch."""
+        self.tokens -= delta
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._updated
+        self._updated = now
+        self.tokens = min(self.per_minute, self.tokens + elapsed * self.per_minute / 60)
+
+
+class RateController:
+    """Gemeinsame Raten- und Concurrency-Steuerung aller API-Anfragen."""
+
+    def __init__(
+        self,
+        rpm: float = 50,
+        tpm: float = 30_000,
+        max_concurrency: int = 10,
+        min_concurrency: int = 1,
+        concurrency: float | None = None,
+        safety: float = 0.95,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialisiert den Controller.
+
+        Args:
+            rpm: Angenommenes Request-Limit pro Minute (bis Header kommen).
+            tpm: Angenommenes Token-Limit pro Minute.
+            max_concurrency: Obergrenze gleichzeitiger Anfragen.
+            min_concurrency: Untergrenze gleichzeitiger Anfragen.
+            concurrency: Start-Limit (Standard: max_concurrency).
+            safety: Anteil der Server-Limits, der ausgenutzt wird.
+            clock: Zeitquelle (monoton, Sekunden).
+        """
+        self._clock = clock
+        self.safety = safety
+        self.rpm_limit = rpm
+        self.tpm_limit = tpm
+        self.requests = TokenBucket(rpm * safety, clock)
+        self.tokens = TokenBucket(tpm * safety, clock)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.limit = float(
+            min(max(concurrency or max_concurrency, self.min_concurrency), max_concurrency)
+        )
+        self.in_flight = 0
+        self.pause_until = 0.0
+        self.rate_limited = 0
+        self.latency: float | None = None
+        self.base_latency: float | None = None
+
+        self._last_decrease = -math.inf
+        self._condition: asyncio.Condition | None = None
+
+    @classmethod
+    def from_config(cls, config: dict, path: str | Path | None = None) -> "RateController":
+        """Erzeugt den Controller aus der Konfiguration und ggf. gelernten Limits.
+
+        Args:
+            config: App-Konfiguration.
+            path: Gespeicherter Zustand eines früheren Laufs (optional).
+        """
+        rpm = config.get("ai_rpm_limit", 50)
+        tpm = config.get("ai_tpm_limit", 30_000)
+        max_concurrency = config.get("ai_concurrency", 10)
+        concurrency = None
+
+        state = _load_state(path) if path else None
+        if state is not None:
+            rpm = state.get("rpm_limit", rpm)
+            tpm = state.get("tpm_limit", tpm)
+            concurrency = state.get("concurrency")
+            logger.info(
+                f"Gelernte Rate-Limits geladen: {rpm:.0f} RPM, {tpm:.0f} TPM, "
+                f"Concurrency {concurrency or max_concurrency}"
+            )
+
+        return cls(
+            rpm=rpm,
+            tpm=tpm,
+            max_concurrency=max_concurrency,
+            min_concurrency=config.get("ai_concurrency_min", 1),
+            concurrency=concurrency,
+            safety=config.get("ai_rate_safety", 0.95),
+        )
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Belegt einen Concurrency-Slot (wartet, solange das Limit erreicht ist)."""
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            async with condition:
+                self.in_flight -= 1
+                condition.notify_all()
+
+    async def acquire(self, tokens: float) -> None:
+        """Wartet auf eine laufende 429-Pause und reserviert Request und Tokens."""
+        while (pause := self.pause_until - self._clock()) > 0:
+            await asyncio.sleep(pause)
+
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_success(
+        self,
+        latency: float,
+        headers: Mapping[str, str] | None = None,
+        used_tokens: float | None = None,
+        estimated_tokens: float = 0,
+    ) -> None:
+        """Verarbeitet eine erfolgreiche Antwort.
+
+        Args:
+            latency: Dauer des API-Calls in Sekunden.
+            headers: Antwort-Header (Rate-Limit-Angaben).
+            used_tokens: Tatsächlicher Verbrauch (Input + Output).
+            estimated_tokens: Bei `acquire` reservierte Tokens.
+        """
+        if used_tokens is not None:
+            self.tokens.adjust(used_tokens - estimated_tokens)
+        if headers:
+            self.observe_headers(headers)
+
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        if self.base_latency is None or latency < self.base_latency:
+            self.base_latency = latency
+        else:
+            # Basislatenz langsam nachführen (Lastwechsel beim Server)
+            self.base_latency *= 1.001
+
+        if self.latency > _LATENCY_TOLERANCE * self.base_latency:
+            self._decrease(0.9, "Latenz")
+        elif self.limit < self.max_concurrency:
+            self._set_limit(self.limit + 1 / self.limit)
+
+    def on_rate_limited(self, headers: Mapping[str, str] | None = None) -> float:
+        """Verarbeitet ein 429: Limit halbieren, ggf. gemeinsame Pause setzen.
+
+        Nur ein `retry-after` des Servers pausiert alle Anfragen; ohne
+        Header regelt allein das gesenkte Concurrency-Limit.
+
+        Args:
+            headers: Header der 429-Antwort.
+
+        Returns:
+            Pause laut `retry-after` in Sekunden (0 ohne Header).
+        """
+        self.rate_limited += 1
+        normalized = _normalize(headers or {})
+        if normalized:
+            self.observe_headers(normalized)
+
+        wait = _parse_float(normalized.get("retry-after")) or 0.0
+        if wait > 0:
+            self.pause_until = max(self.pause_until, self._clock() + wait)
+        self._decrease(0.5, "Rate Limit")
+        return wait
+
+    def observe_headers(self, headers: Mapping[str, str]) -> None:
+        """Übernimmt Limits und Reststände aus den `anthropic-ratelimit-*`-Headern."""
+        headers = _normalize(headers)
+
+        rpm = _parse_float(headers.get("anthropic-ratelimit-requests-limit"))
+        if rpm and rpm != self.rpm_limit:
+            self.rpm_limit = rpm
+            self.requests.set_limit(rpm * self.safety)
+        remaining = _parse_float(headers.get("anthropic-ratelimit-requests-remaining"))
+        if remaining is not None:
+            self.requests.drain_to(remaining)
+
+        tpm = _parse_float(headers.get("anthropic-ratelimit-tokens-limit"))
+        if tpm and tpm != self.tpm_limit:
+            self.tpm_limit = tpm
+            self.tokens.set_limit(tpm * self.safety)
+        remaining = _parse_float(headers.get("anthropic-ratelimit-tokens-remaining"))
+        if remaining is not None:
+            self.tokens.drain_to(remaining)
+
+    def save(self, path: str | Path) -> None:
+        """Speichert die gelernten Limits für den nächsten Lauf."""
+        path = Path(path)
+        state = {
+            "version": STATE_VERSION,
+            "rpm_limit": self.rpm_limit,
+            "tpm_limit": self.tpm_limit,
+            "concurrency": round(self.limit, 2),
+            "saved_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+            tmp.replace(path)
+        except OSError as e:
+            logger.warning(f"Rate-Limits konnten nicht gespeichert werden: {e}")
+
+    def stats(self) -> dict:
+        """Aktueller Zustand für Logs."""
+        return {
+            "rpm_limit": self.rpm_limit,
+            "tpm_limit": self.tpm_limit,
+            "concurrency": round(self.limit, 2),
+            "rate_limited": self.rate_limited,
+            "latency": self.latency,
+        }
+
+    def _decrease(self, factor: float, reason: str) -> None:
+        """Senkt das Limit multiplikativ (höchstens einmal pro Cooldown)."""
+        now = self._clock()
+        if now - self._last_decrease < _DECREASE_COOLDOWN:
+            return
+        self._last_decrease = now
+        self._set_limit(self.limit * factor)
+        logger.info(f"Concurrency gesenkt auf {self.limit:.1f} ({reason})")
+
+    def _set_limit(self, limit: float) -> None:
+        grew = int(limit) > int(self.limit)
+        self.limit = min(max(limit, self.min_concurrency), self.max_concurrency)
+        if grew and self._condition is not None:
+            asyncio.ensure_future(self._notify())
+
+    async def _notify(self) -> None:
+        async with self._condition:
+            self._condition.notify_all()
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+
+class RetryScheduler:
+    """Warteschlange für verzögerte Wiederholungen.
+
+    Eine fehlgeschlagene Anfrage gibt ihren Concurrency-Slot frei und wartet
+    hier bis zu ihrem Wiederholungszeitpunkt. Ein einzelner Dispatcher weckt
+    fällige Einträge in Zeitreihenfolge.
+    """
+
+    def __init__(
+        self,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        jitter: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        """Initialisiert den Scheduler.
+
+        Args:
+            base_delay: Wartezeit vor der ersten Wiederholung (verdoppelt sich).
+            max_delay: Obergrenze der Wartezeit.
+            jitter: Anteil der Wartezeit, der zufällig gekürzt wird (0–1).
+            clock: Zeitquelle (monoton, Sekunden).
+            rng: Zufallsquelle in [0, 1).
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.scheduled = 0
+        self._clock = clock
+        self._rng = rng
+        self._heap: list[tuple[float, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._wakeup: asyncio.Event | None = None
+        self._dispatcher: asyncio.Task | None = None
+
+    def backoff(self, attempt: int, minimum: float = 0.0) -> float:
+        """Wartezeit vor Wiederholung Nr. `attempt + 1` (mit Jitter).
+
+        Args:
+            attempt: Index des fehlgeschlagenen Versuchs (ab 0).
+            minimum: Untergrenze, z.B. `retry-after` des Servers.
+        """
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        delay *= 1 - self.jitter * self._rng()
+        return max(delay, minimum)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    async def wait(self, delay: float) -> None:
+        """Reiht die Anfrage ein und kehrt zurück, wenn sie fällig ist."""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (self._clock() + delay, next(self._counter), future))
+        self.scheduled += 1
+
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        else:
+            self._wakeup.set()
+        await future
+
+    async def _dispatch(self) -> None:
+        """Weckt fällige Einträge; endet, wenn die Warteschlange leer ist."""
+        while self._heap:
+            due, _, future = self._heap[0]
+            remaining = due - self._clock()
+            if remaining > 0:
+                self._wakeup.clear()
+                try:
+                    # Früher aufwachen, wenn ein früher fälliger Eintrag dazukommt
+                    await asyncio.wait_for(self._wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._heap)
+            if not future.done():
+                future.set_result(None)
+
+
+class CircuitBreaker:
+    """Lauf-weiter Circuit Breaker (closed → open → half-open → closed).
+
+    - closed: alle Anfragen gehen raus; Ergebnisse landen im gleitenden
+      Fenster der letzten `window` Anfragen. Ab `min_requests` Ergebnissen
+      und einer Fehlerquote ≥ `error_rate` öffnet er.
+    - open: `allow()` lehnt ab, bis `open_seconds` vergangen sind.
+    - half-open: genau eine Probe-Anfrage darf raus. Erfolg schließt den
+      Breaker (Fenster geleert), Fehler öffnet ihn erneut. Hängt die Probe
+      länger als `open_seconds`, darf eine neue raus.
+
+    Rate Limits (429) zählen nicht als Fehler — dafür ist der
+    `RateController` zuständig.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        window: int = 50,
+        min_requests: int = 20,
+        error_rate: float = 0.5,
+        open_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialisiert den Breaker.
+
+        Args:
+            window: Anzahl der letzten Anfragen im gleitenden Fenster.
+            min_requests: Mindestanzahl Ergebnisse, bevor er öffnen kann.
+            error_rate: Fehlerquote im Fenster, ab der er öffnet.
+            open_seconds: Wartezeit bis zur nächsten Probe-Anfrage.
+            clock: Zeitquelle (monoton, Sekunden).
+        """
+        self.min_requests = min(min_requests, window)
+        self.error_rate = error_rate
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self.transitions: dict[str, int] = {self.OPEN: 0, self.HALF_OPEN: 0, self.CLOSED: 0}
+        self.probes = 0
+        self.rejected = 0
+        self._clock = clock
+        self._results: deque[bool] = deque(maxlen=window)
+        self._opened_at = -math.inf
+        self._probe_started: float | None = None
+
+    @classmethod
+    def from_config(cls, config: dict) -> "CircuitBreaker":
+        """Erzeugt den Breaker aus der Konfiguration."""
+        return cls(
+            window=config.get("ai_breaker_window", 50),
+            min_requests=config.get("ai_breaker_min_requests", 20),
+            error_rate=config.get("ai_breaker_error_rate", 0.5),
+            open_seconds=config.get("ai_breaker_open_seconds", 60),
+        )
+
+    @property
+    def is_open(self) -> bool:
+        return self.state != self.CLOSED
+
+    def allow(self) -> bool:
+        """True, wenn eine Anfrage rausgehen darf (ggf. als Probe)."""
+        if self.state == self.CLOSED:
+            return True
+
+        now = self._clock()
+        if self.state == self.OPEN and now - self._opened_at >= self.open_seconds:
+            self._transition(self.HALF_OPEN, "Probe-Anfrage")
+        if self.state == self.HALF_OPEN and (
+            self._probe_started is None or now - self._probe_started >= self.open_seconds
+        ):
+            self._probe_started = now
+            self.probes += 1
+            return True
+
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        """Vermerkt eine erfolgreiche Anfrage."""
+        if self.state == self.HALF_OPEN:
+            self._results.clear()
+            self._probe_started = None
+            self._transition(self.CLOSED, "Probe erfolgreich")
+            return
+        self._results.append(True)
+
+    def record_failure(self) -> None:
+        """Vermerkt eine fehlgeschlagene Anfrage (kein 429)."""
+        if self.state == self.HALF_OPEN:
+            self._open("Probe fehlgeschlagen")
+            return
+        self._results.append(False)
+        if self.state == self.CLOSED and len(self._results) >= self.min_requests:
+            failures = self._results.count(False)
+            if failures / len(self._results) >= self.error_rate:
+                self._open(f"{failures}/{len(self._results)} Anfragen fehlgeschlagen")
+
+    def stats(self) -> dict:
+        """Aktueller Zustand für Logs."""
+        return {
+            "state": self.state,
+            "opened": self.transitions[self.OPEN],
+            "probes": self.probes,
+            "rejected": self.rejected,
+        }
+
+    def _open(self, reason: str) -> None:
+        self._opened_at = self._clock()
+        self._probe_started = None
+        self._transition(self.OPEN, reason)
+
+    def _transition(self, state: str, reason: str) -> None:
+        self.state = state
+        self.transitions[state] += 1
+        log = logger.warning if state == self.OPEN else logger.info
+        log(f"Circuit Breaker {state} ({reason})")
+
+
+def _normalize(headers: Mapping[str, str]) -> dict[str, str]:
+    """Header-Namen in Kleinschreibung."""
+    return {str(k).lower(): v for k, v in headers.items()}
+
+
+def _parse_float(value: str | None) -> float | None:
+    """Zahl aus einem Header-Wert (None bei fehlendem oder ungültigem Wert)."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _load_state(path: str | Path) -> dict | None:
+    """Lädt gespeicherte Limits (None, wenn nicht vorhanden oder ungültig)."""
+    try:
+        state = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(state, dict) or state.get("version") != STATE_VERSION:
+        return None
+    return state
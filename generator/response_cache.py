@@ -0,0 +1,157 @@
+"""Persistenter Cache für Icebreaker-Antworten der Claude API.
+
+Identische Prompts (z.B. nach einem Abbruch, bei Wiederholungsläufen oder
+überlappenden Apollo-Listen) werden nicht erneut an die API geschickt. Der
+Schlüssel ist ein Hash aus Prompt, Modell, Temperatur und max_tokens.
+
+Der Cache liegt als SQLite-Datenbank im WAL-Modus auf der Platte und kann
+von mehreren gleichzeitigen Läufen genutzt werden. Einträge verfallen nach
+`ttl_seconds`; beim Schließen werden zusätzlich die am längsten ungenutzten
+Einträge entfernt, bis höchstens `max_entries` übrig sind.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Maximale Anzahl Parameter pro SQL-Abfrage
+_SQL_BATCH = 500
+
+# Wartezeit auf Sperren anderer Läufe (Sekunden)
+_BUSY_TIMEOUT = 30.0
+
+
+def response_key(prompt: str, model: str, temperature: float, max_tokens: int) -> str:
+    """Cache-Schlüssel einer Anfrage.
+
+    Returns:
+        Hex-Digest (SHA-256).
+    """
+    payload = json.dumps(
+        [prompt, model, float(temperature), int(max_tokens)], ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """On-Disk-Cache für API-Antworten (Schlüssel → Text)."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        ttl_seconds: float = 30 * 86400,
+        max_entries: int = 1_000_000,
+    ) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(self.path, timeout=_BUSY_TIMEOUT)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " text TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " used_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, str]:
+        """Schlägt mehrere Schlüssel nach.
+
+        Abgelaufene Einträge zählen als Fehltreffer. Treffer werden als
+        zuletzt genutzt markiert.
+
+        Returns:
+            Schlüssel → Text für alle gültigen Treffer.
+        """
+        keys = list(dict.fromkeys(keys))
+        now = time.time()
+        found: dict[str, str] = {}
+        for start in range(0, len(keys), _SQL_BATCH):
+            batch = keys[start : start + _SQL_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT key, text FROM responses WHERE created_at >= ? "
+                f"AND key IN ({placeholders})",
+                [now - self.ttl_seconds, *batch],
+            )
+            found.update(rows)
+
+        if found:
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE responses SET used_at = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key: str) -> str | None:
+        """Schlägt einen Schlüssel nach (None = kein gültiger Eintrag)."""
+        return self.get_many([key]).get(key)
+
+    def put(self, key: str, text: str) -> None:
+        """Speichert eine Antwort (überschreibt einen vorhandenen Eintrag)."""
+        now = time.time()
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, text, created_at, used_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, text, now, now),
+            )
+
+    def evict(self) -> int:
+        """Entfernt abgelaufene und überzählige Einträge.
+
+        Returns:
+            Anzahl entfernter Einträge.
+        """
+        before = self._conn.total_changes
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY used_at LIMIT ?"
+                    ")",
+                    (count - self.max_entries,),
+                )
+        removed = self._conn.total_changes - before
+        if removed:
+            logger.info(f"{removed} Icebreaker aus dem Antwort-Cache entfernt")
+        return removed
+
+    def stats(self) -> dict:
+        """Treffer-Statistik dieses Laufs."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self) -> None:
+        """Räumt auf und schließt die Datenbankverbindung."""
+        self.evict()
+        self._conn.close()
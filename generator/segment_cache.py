@@ -0,0 +1,149 @@
+"""LRU-Cache für Segmentierungsergebnisse pro Lead-Signatur.
+
+Das Ergebnis der Segmentierung hängt nur von wenigen Lead-Feldern ab:
+Branche, Jobtitel, Unternehmensgröße, Keywords und ob ein Firmenname
+vorhanden ist. Apollo-Listen wiederholen diese Kombinationen stark.
+`assign_all` wertet deshalb jede Signatur nur einmal aus; dieser Cache hält
+die Ergebnisse über Blöcke und — auf der Platte — über Läufe hinweg.
+
+Der Cache ist an die Regeln und an den Segmentierungscode gebunden: Ändert
+sich rules.yaml oder die Scoring-Logik (`artifacts.artifact_version`), wird
+er verworfen.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+from collections import OrderedDict
+from pathlib import Path
+
+from generator.artifacts import artifact_version
+
+logger = logging.getLogger(__name__)
+
+# Bei Änderungen am Dateiformat erhöhen; Code-Änderungen deckt der Fingerprint ab
+CACHE_VERSION = "1"
+
+# Signatur: (industry, title, company_size, keywords, hat Firmennamen)
+Signature = tuple[str, str, str, str, bool]
+# Ergebnis pro Firma in Regel-Reihenfolge: ((score, segment_id), ...)
+SignatureResult = tuple[tuple[float, str], ...]
+
+
+class SegmentCache:
+    """LRU-Cache Signatur → Segmentierungsergebnis aller Firmen."""
+
+    def __init__(self, maxsize: int = 1_000_000, path: str | Path | None = None) -> None:
+        """Erstellt den Cache und lädt ihn ggf. von der Platte.
+
+        Args:
+            maxsize: Maximale Anzahl Signaturen.
+            path: Optional — Datei für die Persistenz zwischen Läufen.
+        """
+        self.maxsize = maxsize
+        self.path = Path(path) if path else None
+        self.hits = 0
+        self.misses = 0
+        self._fingerprint: str | None = None
+        self._entries: OrderedDict[Signature, SignatureResult] = OrderedDict()
+        self._dirty = False
+
+        if self.path is not None and self.path.exists():
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def bind(self, rules: dict) -> None:
+        """Bindet den Cache an einen Regelsatz (verwirft ihn bei Änderungen)."""
+        fingerprint = rules_fingerprint(rules)
+        if fingerprint != self._fingerprint:
+            if self._entries:
+                logger.info("Regeln geändert — Segment-Cache verworfen")
+            self._entries.clear()
+            self._fingerprint = fingerprint
+            self._dirty = True
+
+    def get(self, signature: Signature) -> SignatureResult | None:
+        """Liefert das gecachte Ergebnis und zählt Treffer/Fehlschläge."""
+        result = self._entries.get(signature)
+        if result is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(signature)
+        self.hits += 1
+        return result
+
+    def put(self, signature: Signature, result: SignatureResult) -> None:
+        """Speichert ein Ergebnis und verdrängt ggf. die ältesten Einträge."""
+        self._entries[signature] = result
+        self._entries.move_to_end(signature)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        self._dirty = True
+
+    @property
+    def hit_rate(self) -> float:
+        """Anteil der Signatur-Abfragen, die aus dem Cache beantwortet wurden."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        """Zähler für Logging und Auswertung."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "size": len(self._entries),
+        }
+
+    def save(self) -> None:
+        """Schreibt den Cache auf die Platte (nur bei Änderungen)."""
+        if self.path is None or not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(
+                {
+                    "version": CACHE_VERSION,
+                    "fingerprint": self._fingerprint,
+                    "entries": list(self._entries.items()),
+                },
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        tmp.replace(self.path)
+        self._dirty = False
+
+    def _load(self) -> None:
+        """Lädt einen gespeicherten Cache; unlesbare oder fremde Dateien werden ignoriert."""
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+            if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+                return
+            fingerprint = data["fingerprint"]
+            entries = OrderedDict(data["entries"][-self.maxsize:])
+        except Exception as e:
+            logger.warning(f"Segment-Cache nicht lesbar, starte leer: {e}")
+            return
+
+        self._fingerprint = fingerprint
+        self._entries = entries
+
+
+def rules_fingerprint(rules: dict) -> str:
+    """Hash über die Segmentierungsregeln und den Segmentierungscode.
+
+    Ohne `sort_keys`: Die Reihenfolge in `segmentierung` und `template_auswahl`
+    bestimmt die Segment-Priorität, und die gecachten Tupel sind positionsbezogen.
+    Umsortierte Regeln müssen den Cache daher verwerfen. Die Artefakt-Version
+    enthält einen Hash über `segmenter.py`, sodass geänderte Scoring-Logik
+    bei gleichen Regeln ebenfalls neu auswertet.
+    """
+    payload = json.dumps(rules, ensure_ascii=False, default=str)
+    version = f"{CACHE_VERSION}\0{artifact_version()}"
+    return hashlib.sha256(f"{version}\0{payload}".encode()).hexdigest()
@@ -0,0 +1,160 @@
+"""Profiling der Segmentierung: Auswertungen, Treffer und Zeit pro Regel.
+
+Wird `assign_all` mit einem `SegmentationProfile` aufgerufen, zählt jede
+Bedingung (pro Firma bzw. Firma/Segment), wie viele Leads sie geprüft hat,
+wie viele davon getroffen wurden und wie lange die Auswertung gedauert hat.
+Ohne Profil wird nichts gemessen.
+
+Zählungen beziehen sich auf Leads (Signaturen werden mit ihrer Lead-Anzahl
+gewichtet), Zeiten auf die tatsächliche Arbeit pro Signatur.
+
+Die Keyword-Suche läuft für alle Listen gemeinsam in einem Automaten
+("*" / "keyword_scan"). Damit eine teure Keyword-Liste trotzdem ihrer
+Bedingung zugeordnet werden kann, wird jede Liste zusätzlich einzeln
+gemessen und diese Suchzeit der Bedingung zugeschlagen (`scan_seconds`).
+"""
+
+import json
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import numpy as np
+
+
+# Hinweis in Tabelle und JSON: wie Keyword-Zeiten verbucht werden
+KEYWORD_SCAN_NOTE = (
+    "Keyword-Bedingungen enthalten die einzeln gemessene Suchzeit ihrer Liste; "
+    "'* keyword_scan' ist die tatsächliche gemeinsame Suche über alle Listen."
+)
+
+
+@dataclass
+class ConditionStats:
+    """Zähler einer Bedingung."""
+
+    company_id: str
+    segment_id: str
+    condition: str
+    evaluated: int = 0
+    hits: int = 0
+    seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.evaluated if self.evaluated else 0.0
+
+
+class SegmentationProfile:
+    """Sammelt Profiling-Daten über alle Blöcke eines Laufs."""
+
+    def __init__(self) -> None:
+        self.leads = 0
+        self.signatures = 0
+        self.assignments = 0
+        self.conditions: dict[tuple[str, str, str], ConditionStats] = {}
+        self.scores: dict[str, dict[str, int]] = {}
+        # Lead-Anzahl pro Signatur im aktuell ausgewerteten Block
+        self.weights: np.ndarray = np.zeros(0, dtype=np.int64)
+
+    @staticmethod
+    def start() -> float:
+        """Startzeitpunkt für `record`."""
+        return time.perf_counter()
+
+    def record(
+        self,
+        company_id: str,
+        segment_id: str,
+        condition: str,
+        started: float,
+        hits: np.ndarray | None,
+        evaluated: np.ndarray | None = None,
+        scan_seconds: float = 0.0,
+    ) -> None:
+        """Verbucht eine ausgewertete Bedingung.
+
+        Args:
+            company_id: Firma ("*" für firmenübergreifende Arbeit).
+            segment_id: Segment ("" für Firmenkriterien).
+            condition: Name der Bedingung aus rules.yaml.
+            started: Rückgabe von `start()` vor der Auswertung.
+            hits: Treffer-Maske pro Signatur (None = reine Zeitmessung).
+            evaluated: Optional — Maske der tatsächlich geprüften Signaturen
+                (Default: alle).
+            scan_seconds: Einzeln gemessene Keyword-Suchzeit der Liste dieser
+                Bedingung.
+        """
+        seconds = time.perf_counter() - started
+        key = (company_id, segment_id, condition)
+        stats = self.conditions.get(key)
+        if stats is None:
+            stats = self.conditions[key] = ConditionStats(company_id, segment_id, condition)
+
+        if evaluated is None:
+            evaluated = np.ones(len(self.weights), dtype=bool)
+        stats.evaluated += int(self.weights[evaluated].sum())
+        if hits is not None:
+            stats.hits += int(self.weights[hits & evaluated].sum())
+        stats.seconds += seconds + scan_seconds
+
+    def add_scores(self, company_id: str, scores: np.ndarray) -> None:
+        """Verbucht die Score-Verteilung einer Firma (pro Lead)."""
+        values, counts = np.unique(np.round(scores, 1), return_counts=True)
+        distribution = self.scores.setdefault(company_id, {})
+        for value, count in zip(values.tolist(), counts.tolist()):
+            label = f"{value:.1f}"
+            distribution[label] = distribution.get(label, 0) + count
+
+    def sorted_conditions(self) -> list[ConditionStats]:
+        """Bedingungen nach kumulierter Zeit (absteigend)."""
+        return sorted(
+            self.conditions.values(),
+            key=lambda s: (-s.seconds, s.company_id, s.segment_id, s.condition),
+        )
+
+    def to_dict(self) -> dict:
+        """Maschinenlesbarer Report."""
+        return {
+            "leads": self.leads,
+            "signatures": self.signatures,
+            "assignments": self.assignments,
+            "note": KEYWORD_SCAN_NOTE,
+            "conditions": [
+                {**asdict(s), "hit_rate": round(s.hit_rate, 4)}
+                for s in self.sorted_conditions()
+            ],
+            "score_distribution": {
+                company_id: dict(sorted(distribution.items()))
+                for company_id, distribution in sorted(self.scores.items())
+            },
+        }
+
+    def write_json(self, path: str | Path) -> Path:
+        """Schreibt den Report als JSON."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        return path
+
+    def format_table(self) -> str:
+        """Report als Texttabelle (sortiert nach Zeit)."""
+        header = (
+            f"{'Firma':<22} {'Segment':<16} {'Bedingung':<24} "
+            f"{'Geprüft':>9} {'Treffer':>9} {'Quote':>7} {'Zeit ms':>9}"
+        )
+        lines = [header, "-" * len(header)]
+        for s in self.sorted_conditions():
+            lines.append(
+                f"{s.company_id:<22} {s.segment_id or '-':<16} {s.condition:<24} "
+                f"{s.evaluated:>9} {s.hits:>9} {s.hit_rate:>7.1%} {s.seconds * 1000:>9.2f}"
+            )
+
+        lines.append(KEYWORD_SCAN_NOTE)
+        lines.append("")
+        lines.append("Score-Verteilung (Leads pro Score):")
+        for company_id, distribution in sorted(self.scores.items()):
+            values = "  ".join(f"{score}: {count}" for score, count in sorted(distribution.items()))
+            lines.append(f"  {company_id:<22} {values}")
+        return "\n".join(lines)
@@ -2,10 +2,18 @@
 
 import logging
 import re
+import time
+from collections.abc import Iterator, Mapping
 from dataclasses import dataclass, field
+from functools import lru_cache
 
+import numpy as np
 import pandas as pd
 
+from generator.keyword_matcher import KeywordMatcher
+from generator.segment_cache import SegmentCache, Signature, SignatureResult
+from generator.segment_profile import SegmentationProfile
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,56 +27,729 @@ class Assignment:
     match_score: float = 0.0
 
 
+class AssignmentTable:
+    """Spaltenweise Zuordnungen (ersetzt eine Liste von Assignments).
+
+    Pro Zuordnung werden nur die Zeilennummer im Lead-DataFrame, die
+    codierte Firma, das codierte Segment und der Score gespeichert. Der
+    Lead selbst wird erst beim Zugriff über eine Zeilenansicht gelesen.
+
+    Verhält sich wie eine Sequenz: `len()`, Iteration (liefert
+    `AssignmentRow`), Index (eine Zeile) und Slices/Masken (neue Tabelle).
+    """
+
+    def __init__(
+        self,
+        leads: pd.DataFrame,
+        rows: np.ndarray,
+        company_codes: np.ndarray,
+        segment_codes: np.ndarray,
+        scores: np.ndarray,
+        companies: list[str],
+        segments: list[str],
+    ) -> None:
+        self.leads = leads
+        self.rows = np.asarray(rows, dtype=np.int32)
+        self.company_codes = np.asarray(company_codes, dtype=np.int16)
+        self.segment_codes = np.asarray(segment_codes, dtype=np.int16)
+        self.scores = np.asarray(scores, dtype=np.float64)
+        self.companies = list(companies)
+        self.segments = list(segments)
+        self._columns: dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_ids(
+        cls,
+        leads: pd.DataFrame,
+        rows: np.ndarray,
+        company_ids: np.ndarray | list[str],
+        segment_ids: np.ndarray | list[str],
+        scores: np.ndarray | list[float],
+    ) -> "AssignmentTable":
+        """Baut eine Tabelle aus Firmen- und Segment-IDs im Klartext."""
+        company_codes, companies = pd.factorize(np.asarray(company_ids, dtype=object))
+        segment_codes, segments = pd.factorize(np.asarray(segment_ids, dtype=object))
+        return cls(
+            leads, rows, company_codes, segment_codes, scores,
+            [str(c) for c in companies], [str(s) for s in segments],
+        )
+
+    @classmethod
+    def concat(cls, tables: list["AssignmentTable"]) -> "AssignmentTable":
+        """Hängt Tabellen (z.B. pro Block) zu einer Tabelle zusammen."""
+        if not tables:
+            return cls.from_ids(pd.DataFrame(), [], [], [], [])
+        if len(tables) == 1:
+            return tables[0]
+
+        leads = pd.concat([t.leads for t in tables], ignore_index=True)
+        offsets = np.cumsum([0] + [len(t.leads) for t in tables[:-1]])
+        return cls.from_ids(
+            leads,
+            np.concatenate([t.rows.astype(np.int64) + off for t, off in zip(tables, offsets)]),
+            np.concatenate([t.company_ids for t in tables]),
+            np.concatenate([t.segment_ids for t in tables]),
+            np.concatenate([t.scores for t in tables]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self) -> Iterator["AssignmentRow"]:
+        for i in range(len(self.rows)):
+            yield AssignmentRow(self, i)
+
+    def __getitem__(self, key: int | slice | np.ndarray) -> "AssignmentRow | AssignmentTable":
+        if isinstance(key, (int, np.integer)):
+            if key < 0:
+                key += len(self.rows)
+            if not 0 <= key < len(self.rows):
+                raise IndexError(key)
+            return AssignmentRow(self, int(key))
+        return self._take(key)
+
+    @property
+    def company_ids(self) -> np.ndarray:
+        """Firmen-ID pro Zuordnung."""
+        return np.asarray(self.companies, dtype=object)[self.company_codes]
+
+    @property
+    def segment_ids(self) -> np.ndarray:
+        """Segment-ID pro Zuordnung."""
+        return np.asarray(self.segments, dtype=object)[self.segment_codes]
+
+    def column(self, name: str) -> np.ndarray:
+        """Werte einer Lead-Spalte pro Zuordnung (fehlende Spalte = "")."""
+        return self._lead_column(name)[self.rows]
+
+    def filter(self, mask: np.ndarray) -> "AssignmentTable":
+        """Behält nur Zuordnungen mit True in der Maske."""
+        return self._take(np.asarray(mask, dtype=bool))
+
+    @property
+    def nbytes(self) -> int:
+        """Speicherbedarf der Zuordnungen (ohne Lead-DataFrame)."""
+        return (
+            self.rows.nbytes + self.company_codes.nbytes
+            + self.segment_codes.nbytes + self.scores.nbytes
+        )
+
+    def _take(self, key: slice | np.ndarray) -> "AssignmentTable":
+        """Teilmenge der Zuordnungen; der Lead-DataFrame wird geteilt."""
+        table = AssignmentTable(
+            self.leads,
+            self.rows[key],
+            self.company_codes[key],
+            self.segment_codes[key],
+            self.scores[key],
+            self.companies,
+            self.segments,
+        )
+        table._columns = self._columns
+        return table
+
+    def _lead_column(self, name: str) -> np.ndarray:
+        """Lead-Spalte als Object-Array (einmal pro Spalte umgewandelt)."""
+        values = self._columns.get(name)
+        if values is None:
+            if name in self.leads.columns:
+                values = self.leads[name].to_numpy(dtype=object)
+            else:
+                values = np.full(len(self.leads), "", dtype=object)
+            self._columns[name] = values
+        return values
+
+
+class AssignmentRow:
+    """Ansicht auf eine Zuordnung einer AssignmentTable (wie Assignment)."""
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: AssignmentTable, index: int) -> None:
+        self._table = table
+        self._index = index
+
+    @property
+    def row(self) -> int:
+        """Zeilennummer des Leads im Lead-DataFrame."""
+        return int(self._table.rows[self._index])
+
+    @property
+    def lead(self) -> "LeadRow":
+        """Lead-Daten als leichte Mapping-Ansicht."""
+        return LeadRow(self._table, self.row)
+
+    @property
+    def company_id(self) -> str:
+        return self._table.companies[self._table.company_codes[self._index]]
+
+    @property
+    def segment_id(self) -> str:
+        return self._table.segments[self._table.segment_codes[self._index]]
+
+    @property
+    def match_score(self) -> float:
+        return float(self._table.scores[self._index])
+
+
+class LeadRow(Mapping):
+    """Lesende Ansicht auf eine Lead-Zeile; Werte werden spaltenweise gelesen."""
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: AssignmentTable, row: int) -> None:
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, key: str) -> object:
+        if key not in self._table.leads.columns:
+            raise KeyError(key)
+        return self._table._lead_column(key)[self._row]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table.leads.columns)
+
+    def __len__(self) -> int:
+        return len(self._table.leads.columns)
+
+    def to_dict(self) -> dict:
+        """Lead als dict (wie `pd.Series.to_dict`)."""
+        return {key: self[key] for key in self}
+
+
+# Einzelne Zuordnung: frei erzeugt oder als Ansicht auf eine Tabelle
+AssignmentLike = Assignment | AssignmentRow
+
+
+@dataclass
+class CompiledRules:
+    """Segmentierungsregeln, kompiliert zu einem Keyword-Matcher pro Feld.
+
+    Listennamen haben die Form "<regel>:<firma oder segment>",
+    z.B. "branchen:seehafer_elemente" oder "titel_enthalten:bauunternehmen".
+    """
+
+    industry: KeywordMatcher
+    title: KeywordMatcher
+    text: KeywordMatcher
+
+
+def compile_rules(rules: dict) -> CompiledRules:
+    """Kompiliert alle Keyword-Listen aus rules.yaml.
+
+    Args:
+        rules: Geladene Segmentierungsregeln.
+
+    Returns:
+        CompiledRules für `assign_all`.
+    """
+    industry: dict[str, list[str]] = {}
+    title: dict[str, list[str]] = {}
+    text: dict[str, list[str]] = {}
+
+    for company_id, company_rules in rules.get("segmentierung", {}).items():
+        industry[f"branchen:{company_id}"] = company_rules.get("branchen", [])
+        title[f"jobtitel_keywords:{company_id}"] = company_rules.get("jobtitel_keywords", [])
+
+    for segment_id, segment_rules in rules.get("template_auswahl", {}).items():
+        conditions = segment_rules.get("bedingungen", {})
+        industry[f"branchen_enthalten:{segment_id}"] = conditions.get("branchen_enthalten", [])
+        title[f"titel_enthalten:{segment_id}"] = conditions.get("titel_enthalten", [])
+        text[f"keywords_enthalten:{segment_id}"] = conditions.get("keywords_enthalten", [])
+
+    return CompiledRules(
+        industry=KeywordMatcher(industry),
+        title=KeywordMatcher(title),
+        text=KeywordMatcher(text),
+    )
+
+
+# Zuletzt kompilierte Regeln (assign_all wird pro Block mit denselben Regeln aufgerufen)
+_last_compiled: tuple[dict, CompiledRules] | None = None
+
+
+def _compiled_for(rules: dict) -> CompiledRules:
+    """Kompiliert die Regeln einmal pro Regel-Dict."""
+    global _last_compiled
+    if _last_compiled is None or _last_compiled[0] is not rules:
+        _last_compiled = (rules, compile_rules(rules))
+    return _last_compiled[1]
+
+
+def use_compiled(rules: dict, compiled: CompiledRules) -> None:
+    """Hinterlegt bereits kompilierte Regeln (z.B. aus dem Artefakt-Cache)."""
+    global _last_compiled
+    _last_compiled = (rules, compiled)
+
+
 def assign_all(
     df: pd.DataFrame,
     rules: dict,
     company_filter: str | None = None,
-) -> list[Assignment]:
+    compiled: CompiledRules | None = None,
+    cache: SegmentCache | None = None,
+    profile: SegmentationProfile | None = None,
+) -> AssignmentTable:
     """Weist alle Leads den passenden Firmen und Segmenten zu.
 
+    Leads werden auf ihre Signaturen (Branche, Titel, Größe, Keywords,
+    Firmenname vorhanden) reduziert; jede Signatur wird nur einmal
+    ausgewertet und das Ergebnis auf die Leads zurückverteilt.
+
     Args:
         df: DataFrame mit Lead-Daten.
         rules: Geladene Segmentierungsregeln aus rules.yaml.
         company_filter: Optional — nur für diese Firma zuordnen.
+        compiled: Optional — bereits kompilierte Regeln (`compile_rules`).
+        cache: Optional — Signatur-Cache über Blöcke und Läufe hinweg.
+        profile: Optional — sammelt Auswertungen, Treffer und Zeiten pro
+            Bedingung. Mit Profil werden alle Signaturen neu ausgewertet.
 
     Returns:
-        Liste von Assignments (ein Lead kann mehrfach vorkommen).
+        AssignmentTable (ein Lead kann mehrfach vorkommen).
+    """
+    all_companies = list(rules.get("segmentierung", {}).keys())
+    companies = select_companies(rules, company_filter)
+
+    signature_codes, signatures = lead_signatures(df)
+    if profile is not None:
+        profile.leads += len(df)
+        profile.signatures += len(signatures)
+        profile.weights = np.bincount(signature_codes, minlength=len(signatures))
+    sig_scores, sig_segments = _evaluate_signatures(
+        signatures, rules, compiled or _compiled_for(rules), cache, profile
+    )
+    logger.debug(f"{len(df)} Leads → {len(signatures)} Signaturen")
+
+    # Score- und Segment-Matrix (Leads × Firmen) aus den Signaturen
+    selected = [all_companies.index(c) for c in companies]
+    scores = sig_scores[:, selected][signature_codes]
+    segments = sig_segments[:, selected][signature_codes]
+
+    # Zeilenweise Reihenfolge wie zuvor: Lead für Lead, Firma für Firma
+    rows, cols = np.nonzero(scores >= 0.5)
+    segment_codes, segment_values = pd.factorize(segments[rows, cols])
+    assignments = AssignmentTable(
+        df,
+        rows,
+        cols,
+        segment_codes,
+        scores[rows, cols],
+        companies,
+        [str(s) for s in segment_values],
+    )
+
+    if profile is not None:
+        profile.assignments += len(assignments)
+        for j, company_id in enumerate(companies):
+            profile.add_scores(company_id, scores[:, j])
+
+    # Statistiken loggen
+    _log_statistics(assignments, len(df))
+
+    return assignments
+
+
+_SIGNATURE_COLUMNS = ("industry", "title", "company_size", "keywords")
+
+
+def lead_signatures(df: pd.DataFrame) -> tuple[np.ndarray, list[Signature]]:
+    """Reduziert Leads auf die Felder, von denen die Segmentierung abhängt.
+
+    Args:
+        df: DataFrame mit Lead-Daten.
+
+    Returns:
+        Tuple (Signatur-Code pro Lead, eindeutige Signaturen).
+    """
+    if len(df) == 0:
+        return np.zeros(0, dtype=np.int64), []
+
+    factorized = [_factorize(df, column) for column in _SIGNATURE_COLUMNS]
+    company_codes, company_names = _factorize(df, "company_name")
+    has_name = np.array([bool(v.strip()) for v in company_names], dtype=np.int64)
+
+    codes = np.stack([c for c, _ in factorized] + [has_name[company_codes]], axis=1)
+    unique_codes, signature_codes = np.unique(codes, axis=0, return_inverse=True)
+
+    values = [v for _, v in factorized]
+    signatures = [
+        (
+            values[0][i], values[1][t], values[2][s], values[3][k], bool(n),
+        )
+        for i, t, s, k, n in unique_codes.tolist()
+    ]
+    return signature_codes.reshape(-1), signatures
+
+
+def _evaluate_signatures(
+    signatures: list[Signature],
+    rules: dict,
+    compiled: CompiledRules,
+    cache: SegmentCache | None,
+    profile: SegmentationProfile | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Score- und Segment-Matrix (Signaturen × alle Firmen).
+
+    Nicht gecachte Signaturen werden gemeinsam spaltenweise ausgewertet.
+    Mit Profil wird der Cache nur befüllt, nicht gelesen.
     """
     segmentation_rules = rules.get("segmentierung", {})
     template_rules = rules.get("template_auswahl", {})
-    assignments: list[Assignment] = []
+    companies = list(segmentation_rules.keys())
+
+    scores = np.zeros((len(signatures), len(companies)))
+    segments = np.empty((len(signatures), len(companies)), dtype=object)
+
+    missing = list(range(len(signatures)))
+    if cache is not None:
+        cache.bind(rules)
+    if cache is not None and profile is None:
+        missing = []
+        for idx, signature in enumerate(signatures):
+            result = cache.get(signature)
+            if result is None:
+                missing.append(idx)
+                continue
+            for j, (score, segment_id) in enumerate(result):
+                scores[idx, j] = score
+                segments[idx, j] = segment_id
+
+    if not missing:
+        return scores, segments
+
+    pending = [signatures[idx] for idx in missing]
+    signature_df = pd.DataFrame({
+        "industry": [s[0] for s in pending],
+        "title": [s[1] for s in pending],
+        "company_size": [s[2] for s in pending],
+        "keywords": [s[3] for s in pending],
+        "company_name": ["x" if s[4] else "" for s in pending],
+    })
+    if profile is not None:
+        profile.weights = profile.weights[missing]
+        started = profile.start()
+    columns = LeadColumns(signature_df, compiled)
+    if profile is not None:
+        # Normalisierung und Keyword-Suche für alle Listen auf einmal
+        profile.record("*", "", "keyword_scan", started, None)
+        # Zusätzlich pro Liste einzeln messen, für die Zuordnung zur Bedingung
+        columns.time_lists()
+
+    for j, company_id in enumerate(companies):
+        company_rules = segmentation_rules[company_id]
+        company_scores = score_column(columns, company_id, company_rules, profile)
+        scores[missing, j] = company_scores
+        if profile is None:
+            segments[missing, j] = segment_column(columns, company_rules, template_rules)
+            continue
 
-    companies = segmentation_rules.keys()
-    if company_filter:
-        if company_filter not in companies:
-            raise ValueError(
-                f"Unbekannte Firma: '{company_filter}'. "
-                f"Verfügbar: {', '.join(companies)}"
+        # Segmente zählen nur für Leads, die der Firma zugeordnet werden
+        weights = profile.weights
+        profile.weights = np.where(company_scores >= 0.5, weights, 0)
+        segments[missing, j] = segment_column(
+            columns, company_rules, template_rules, profile, company_id
+        )
+        profile.weights = weights
+
+    if cache is not None:
+        for idx in missing:
+            result: SignatureResult = tuple(
+                (float(scores[idx, j]), str(segments[idx, j])) for j in range(len(companies))
             )
-        companies = [company_filter]
+            cache.put(signatures[idx], result)
 
-    for _, lead in df.iterrows():
-        for company_id in companies:
-            company_rules = segmentation_rules[company_id]
-            matched, score = match_company(lead, company_rules)
+    return scores, segments
+
+
+class LeadColumns:
+    """Vorberechnete Lead-Spalten für die spaltenweise Segmentierung.
+
+    Jede Spalte wird einmal pro eindeutigem Wert bereinigt, geparst bzw.
+    durch den Keyword-Matcher geschickt und über Codes auf die Leads
+    abgebildet.
+    """
 
-            if matched:
-                segment_id = determine_segment(
-                    lead, company_id, company_rules, template_rules
+    def __init__(self, df: pd.DataFrame, compiled: CompiledRules) -> None:
+        self.size = len(df)
+
+        industry_codes, industry = _factorize(df, "industry")
+        title_codes, title = _factorize(df, "title")
+        keyword_codes, keywords = _factorize(df, "keywords")
+        size_codes, sizes = _factorize(df, "company_size")
+        company_codes, company_names = _factorize(df, "company_name")
+
+        self.industry = _TextColumn(
+            industry_codes, [v.strip() for v in industry], compiled.industry
+        )
+        self.title = _TextColumn(title_codes, [v.strip() for v in title], compiled.title)
+
+        # Kombinierter Text für keywords_enthalten: nur eindeutige Kombinationen bauen
+        combined_key = (
+            industry_codes.astype(np.int64) * (len(title) * len(keywords))
+            + title_codes * len(keywords)
+            + keyword_codes
+        )
+        combined_uniques, combined_codes = np.unique(combined_key, return_inverse=True)
+        combined_text = []
+        for key in combined_uniques.tolist():
+            i, rest = divmod(key, len(title) * len(keywords))
+            t, k = divmod(rest, len(keywords))
+            combined_text.append(
+                f"{industry[i].strip()} {title[t].strip()} {keywords[k].strip()}"
+            )
+        self.combined = _TextColumn(combined_codes.reshape(-1), combined_text, compiled.text)
+
+        self.company_size = np.array(
+            [_parse_company_size(v) for v in sizes], dtype=np.int64
+        )[size_codes]
+        self.has_company_name = np.array(
+            [bool(v.strip()) for v in company_names], dtype=bool
+        )[company_codes]
+
+    def time_lists(self) -> None:
+        """Misst die Keyword-Suche pro Liste einzeln (nur für das Profiling)."""
+        for column in (self.industry, self.title, self.combined):
+            column.time_lists()
+
+
+class _TextColumn:
+    """Textspalte als Codes + Treffer-Matrix (eindeutige Werte × Keyword-Listen)."""
+
+    def __init__(self, codes: np.ndarray, values: list[str], matcher: KeywordMatcher) -> None:
+        self.codes = codes
+        self._values = values
+        self._matcher = matcher
+        self._scan_seconds: dict[str, float] = {}
+        self._names = {name: i for i, name in enumerate(matcher.names)}
+        self._hits = np.zeros((len(values), len(matcher.names)), dtype=bool)
+        for row, value in enumerate(values):
+            mask = matcher.match_mask(value)
+            col = 0
+            while mask:
+                if mask & 1:
+                    self._hits[row, col] = True
+                mask >>= 1
+                col += 1
+
+    def contains_any(self, list_name: str) -> np.ndarray:
+        """Maske: Wert enthält eines der Keywords der Liste (case-insensitive)."""
+        return self._hits[:, self._names[list_name]][self.codes]
+
+    def time_lists(self) -> None:
+        """Misst pro Liste, wie lange die Suche nur mit ihren Keywords dauert."""
+        for name in self._names:
+            single = self._matcher.single(name)
+            started = time.perf_counter()
+            for value in self._values:
+                single.match_mask(value)
+            self._scan_seconds[name] = time.perf_counter() - started
+
+    def scan_seconds(self, list_name: str) -> float:
+        """Einzeln gemessene Suchzeit einer Liste (0 ohne `time_lists`)."""
+        return self._scan_seconds.get(list_name, 0.0)
+
+
+def score_column(
+    columns: LeadColumns,
+    company_id: str,
+    company_rules: dict,
+    profile: SegmentationProfile | None = None,
+) -> np.ndarray:
+    """Spaltenweise Variante von `match_company`: Score pro Lead.
+
+    Args:
+        columns: Vorberechnete Lead-Spalten.
+        company_id: ID der Firma.
+        company_rules: Regeln für eine Firma.
+        profile: Optional — Profiling pro Bedingung.
+
+    Returns:
+        Float-Array mit denselben Scores wie `match_company`.
+    """
+    score = np.zeros(columns.size)
+
+    started = profile.start() if profile is not None else 0.0
+    industry_list = f"branchen:{company_id}"
+    industry_hit = columns.industry.contains_any(industry_list)
+    if profile is not None:
+        profile.record(
+            company_id, "", "branchen", started, industry_hit,
+            scan_seconds=columns.industry.scan_seconds(industry_list),
+        )
+    score += np.where(industry_hit, 0.5, 0.0)
+
+    started = profile.start() if profile is not None else 0.0
+    title_list = f"jobtitel_keywords:{company_id}"
+    title_hit = columns.title.contains_any(title_list)
+    if profile is not None:
+        profile.record(
+            company_id, "", "jobtitel_keywords", started, title_hit,
+            scan_seconds=columns.title.scan_seconds(title_list),
+        )
+    score += np.where(title_hit, 0.3, 0.0)
+
+    started = profile.start() if profile is not None else 0.0
+    min_size = company_rules.get("unternehmensgroesse_min", 0)
+    size_hit = columns.company_size >= min_size
+    if profile is not None:
+        profile.record(company_id, "", "unternehmensgroesse_min", started, size_hit)
+    score += np.where(size_hit, 0.2, 0.0)
+    return score
+
+
+def segment_column(
+    columns: LeadColumns,
+    company_rules: dict,
+    template_rules: dict,
+    profile: SegmentationProfile | None = None,
+    company_id: str = "",
+) -> np.ndarray:
+    """Spaltenweise Variante von `determine_segment`: Segment pro Lead.
+
+    Die Bedingungen jedes Sekundärsegments werden als Masken ausgewertet;
+    das erste passende Segment in Prioritätsreihenfolge gewinnt.
+
+    Args:
+        columns: Vorberechnete Lead-Spalten.
+        company_rules: Regeln der Firma.
+        template_rules: Sekundäre Segmentierungsregeln.
+        profile: Optional — Profiling pro Bedingung.
+        company_id: ID der Firma (nur für das Profiling).
+
+    Returns:
+        Object-Array mit Segment-IDs.
+    """
+    available_templates = company_rules.get("templates", [])
+    default_template = company_rules.get("default_template", "hausverwaltung")
+
+    result = np.full(columns.size, default_template, dtype=object)
+    unresolved = np.ones(columns.size, dtype=bool)
+
+    def record(
+        segment_id: str, condition: str, started: float, hits, evaluated,
+        column: _TextColumn | None = None,
+    ) -> None:
+        scan = column.scan_seconds(f"{condition}:{segment_id}") if column is not None else 0.0
+        profile.record(company_id, segment_id, condition, started, hits, evaluated, scan)
+
+    for segment_id, segment_rules in template_rules.items():
+        if segment_id not in available_templates or not unresolved.any():
+            continue
+
+        conditions = segment_rules.get("bedingungen", {})
+        hit = np.zeros(columns.size, dtype=bool)
+
+        keywords_check = conditions.get("keywords_enthalten", [])
+        if keywords_check:
+            started = profile.start() if profile is not None else 0.0
+            keyword_hit = columns.combined.contains_any(f"keywords_enthalten:{segment_id}")
+            if profile is not None:
+                record(
+                    segment_id, "keywords_enthalten", started, keyword_hit, unresolved,
+                    columns.combined,
                 )
-                assignments.append(
-                    Assignment(
-                        lead=lead,
-                        company_id=company_id,
-                        segment_id=segment_id,
-                        match_score=score,
+            hit |= keyword_hit
+
+        # Branche passt, Titel nicht → restliche Bedingungen entfallen
+        skip_rest = np.zeros(columns.size, dtype=bool)
+        branchen_check = conditions.get("branchen_enthalten", [])
+        if branchen_check:
+            started = profile.start() if profile is not None else 0.0
+            industry_hit = columns.industry.contains_any(f"branchen_enthalten:{segment_id}")
+            if profile is not None:
+                record(
+                    segment_id, "branchen_enthalten", started, industry_hit, unresolved & ~hit,
+                    columns.industry,
+                )
+            titel_check = conditions.get("titel_enthalten", [])
+            if titel_check:
+                started = profile.start() if profile is not None else 0.0
+                title_hit = columns.title.contains_any(f"titel_enthalten:{segment_id}")
+                if profile is not None:
+                    record(
+                        segment_id, "titel_enthalten", started, title_hit,
+                        unresolved & ~hit & industry_hit, columns.title,
                     )
+                hit |= industry_hit & title_hit
+                skip_rest = industry_hit & ~title_hit
+            else:
+                hit |= industry_hit
+
+        rest = np.zeros(columns.size, dtype=bool)
+        size_min = conditions.get("unternehmensgroesse_min")
+        if size_min is not None:
+            started = profile.start() if profile is not None else 0.0
+            size_hit = columns.company_size >= size_min
+            if profile is not None:
+                record(
+                    segment_id, "unternehmensgroesse_min", started, size_hit,
+                    unresolved & ~hit & ~skip_rest,
                 )
+            rest |= size_hit
 
-    # Statistiken loggen
-    _log_statistics(assignments, len(df))
+        size_max = conditions.get("unternehmensgroesse_max")
+        if size_max is not None:
+            started = profile.start() if profile is not None else 0.0
+            size_hit = (columns.company_size > 0) & (columns.company_size <= size_max)
+            if profile is not None:
+                record(
+                    segment_id, "unternehmensgroesse_max", started, size_hit,
+                    unresolved & ~hit & ~skip_rest & ~rest,
+                )
+            rest |= size_hit
+
+        if conditions.get("kein_firmenname"):
+            started = profile.start() if profile is not None else 0.0
+            name_missing = ~columns.has_company_name
+            if profile is not None:
+                record(
+                    segment_id, "kein_firmenname", started, name_missing,
+                    unresolved & ~hit & ~skip_rest & ~rest,
+                )
+            rest |= name_missing
+
+        hit |= rest & ~skip_rest
+        newly = hit & unresolved
+        result[newly] = segment_id
+        unresolved &= ~hit
+
+    return result
+
+
+def _factorize(df: pd.DataFrame, column: str) -> tuple[np.ndarray, list[str]]:
+    """Codes und eindeutige Werte einer Spalte (fehlende Spalte = "")."""
+    if column not in df.columns:
+        return np.zeros(len(df), dtype=np.int64), [""]
+    codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+    values = [str(v) for v in uniques]
+    if not values:
+        values = [""]
+    return codes.astype(np.int64), values
 
-    return assignments
+
+def select_companies(rules: dict, company_filter: str | None = None) -> list[str]:
+    """Bestimmt die Firmen, für die zugeordnet wird.
+
+    Args:
+        rules: Geladene Segmentierungsregeln aus rules.yaml.
+        company_filter: Optional — nur diese Firma.
+
+    Returns:
+        Liste der Firmen-IDs in Regel-Reihenfolge.
+
+    Raises:
+        ValueError: Wenn die Firma im Filter nicht existiert.
+    """
+    companies = list(rules.get("segmentierung", {}).keys())
+    if company_filter:
+        if company_filter not in companies:
+            raise ValueError(
+                f"Unbekannte Firma: '{company_filter}'. "
+                f"Verfügbar: {', '.join(companies)}"
+            )
+        return [company_filter]
+    return companies
 
 
 def match_company(
@@ -185,20 +866,23 @@ def determine_segment(
 
 def _matches_any(value: str, targets: list[str]) -> bool:
     """Prüft ob ein Wert (case-insensitive) in einer Liste enthalten ist."""
-    value_lower = value.lower()
-    return any(target.lower() in value_lower for target in targets)
+    return _keyword_matcher(tuple(targets)).match_mask(value) != 0
 
 
 def _title_matches_keywords(title: str, keywords: list[str]) -> bool:
     """Prüft ob ein Jobtitel eines der Keywords enthält (case-insensitive)."""
-    title_lower = title.lower()
-    return any(kw.lower() in title_lower for kw in keywords)
+    return _keyword_matcher(tuple(keywords)).match_mask(title) != 0
 
 
 def _text_contains_any(text: str, keywords: list[str]) -> bool:
     """Prüft ob ein Text eines der Keywords enthält (case-insensitive)."""
-    text_lower = text.lower()
-    return any(kw.lower() in text_lower for kw in keywords)
+    return _keyword_matcher(tuple(keywords)).match_mask(text) != 0
+
+
+@lru_cache(maxsize=1024)
+def _keyword_matcher(keywords: tuple[str, ...]) -> KeywordMatcher:
+    """Kompiliert eine einzelne Keyword-Liste (gecacht)."""
+    return KeywordMatcher({"keywords": keywords})
 
 
 def _parse_company_size(size_str: str) -> int:
@@ -222,14 +906,14 @@ def _parse_company_size(size_str: str) -> int:
     return 0
 
 
-def _log_statistics(assignments: list[Assignment], total_leads: int) -> None:
+def _log_statistics(assignments: AssignmentTable, total_leads: int) -> None:
     """Loggt Segmentierungsstatistiken."""
-    if not assignments:
+    if not len(assignments):
         logger.warning("Keine Leads konnten zugeordnet werden")
         return
 
     # Leads mit mindestens einer Zuordnung
-    unique_emails = {a.lead["email"] for a in assignments}
+    unique_emails = set(assignments.column("email").tolist())
     unmatched = total_leads - len(unique_emails)
 
     logger.info(f"Segmentierung: {len(assignments)} Zuordnungen für {len(unique_emails)} Leads")
@@ -238,9 +922,12 @@ def _log_statistics(assignments: list[Assignment], total_leads: int) -> None:
         logger.warning(f"{unmatched} Leads ohne Zuordnung (keiner Firma zugewiesen)")
 
     # Pro Firma
-    company_counts: dict[str, int] = {}
-    for a in assignments:
-        company_counts[a.company_id] = company_counts.get(a.company_id, 0) + 1
+    counts = np.bincount(assignments.company_codes, minlength=len(assignments.companies))
+    company_counts = {
+        company_id: int(count)
+        for company_id, count in zip(assignments.companies, counts)
+        if count
+    }
 
     for company_id, count in sorted(company_counts.items()):
         logger.info(f"  → {company_id}: {count} Leads")
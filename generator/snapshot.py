@@ -0,0 +1,237 @@
+"""Inhaltsadressierte Snapshots der bereinigten Leads und der Segmentierung.
+
+`generate`, `segment` und `preview` arbeiten oft mehrfach auf derselben CSV.
+Ein Snapshot speichert pro Block den bereinigten Lead-DataFrame und das
+Segmentierungsergebnis als unkomprimierte Arrow-IPC-Dateien, die beim Laden
+per Memory-Mapping gelesen werden. Der Schlüssel ist ein Hash aus
+Eingabedatei, rules.yaml und Reader-Version — ändert sich eines davon,
+entsteht ein neuer Snapshot.
+
+Benötigt pyarrow.
+"""
+
+import hashlib
+import logging
+import shutil
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import pandas as pd
+
+from generator.csv_reader import READER_VERSION
+from generator.segmenter import AssignmentTable
+
+logger = logging.getLogger(__name__)
+
+_HASH_BLOCK_SIZE = 1024 * 1024
+_LEADS_PREFIX = "leads"
+_SEGMENTS_PREFIX = "segments"
+
+# Staging-Verzeichnisse abgestürzter Läufe gelten nach dieser Zeit als verwaist
+_STALE_TMP_SECONDS = 86400
+
+
+def arrow_available() -> bool:
+    """Prüft, ob pyarrow installiert ist."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class SnapshotStore:
+    """Verzeichnis mit Snapshots, ein Unterverzeichnis pro Schlüssel."""
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def key(self, input_path: str | Path, rules_path: str | Path, *extra: object) -> str:
+        """Berechnet den Snapshot-Schlüssel.
+
+        Args:
+            input_path: Apollo CSV.
+            rules_path: Segmentierungsregeln.
+            *extra: Weitere Optionen, die das Ergebnis beeinflussen.
+
+        Returns:
+            Hex-Digest (SHA-256).
+        """
+        digest = hashlib.sha256()
+        digest.update(f"reader={READER_VERSION}".encode())
+        for path in (input_path, rules_path):
+            with open(path, "rb") as f:
+                while block := f.read(_HASH_BLOCK_SIZE):
+                    digest.update(block)
+            digest.update(b"\0")
+        for value in extra:
+            digest.update(repr(value).encode())
+        return digest.hexdigest()
+
+    def load(self, key: str) -> Iterator[tuple[pd.DataFrame, AssignmentTable]] | None:
+        """Lädt einen Snapshot blockweise.
+
+        Returns:
+            Iterator über (Lead-DataFrame, Assignments) pro Block, oder None
+            wenn kein Snapshot existiert.
+        """
+        snapshot_dir = self.directory / key
+        if not snapshot_dir.is_dir():
+            return None
+
+        # Zugriffszeit für die Altersbereinigung aktualisieren
+        snapshot_dir.touch()
+        logger.info(f"Nutze Snapshot {key[:12]}")
+        return self._iter_blocks(snapshot_dir)
+
+    def writer(self, key: str) -> "SnapshotWriter":
+        """Öffnet einen Writer für einen neuen Snapshot."""
+        return SnapshotWriter(self.directory, key)
+
+    def collect_garbage(self, max_age_days: float, max_bytes: int) -> int:
+        """Entfernt alte Snapshots und begrenzt die Gesamtgröße.
+
+        Zuerst werden Snapshots gelöscht, die länger als `max_age_days`
+        nicht genutzt wurden, danach die am längsten ungenutzten, bis die
+        Gesamtgröße unter `max_bytes` liegt. Staging-Verzeichnisse
+        (`.<key>.*.tmp`), die seit einem Tag nicht geändert wurden, stammen
+        von abgestürzten Läufen und werden ebenfalls entfernt.
+
+        Returns:
+            Anzahl gelöschter Snapshots.
+        """
+        now = time.time()
+        entries = []
+        for path in self.directory.iterdir():
+            if not path.is_dir():
+                continue
+            if path.name.startswith("."):
+                if path.name.endswith(".tmp") and now - path.stat().st_mtime > _STALE_TMP_SECONDS:
+                    logger.debug(f"Entferne verwaistes Staging-Verzeichnis {path.name}")
+                    shutil.rmtree(path, ignore_errors=True)
+                continue
+            size = sum(f.stat().st_size for f in path.iterdir())
+            entries.append((path.stat().st_mtime, size, path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            too_old = now - mtime > max_age_days * 86400
+            if not too_old and total <= max_bytes:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+
+        if removed:
+            logger.info(f"{removed} Snapshots entfernt")
+        return removed
+
+    def _iter_blocks(self, snapshot_dir: Path) -> Iterator[tuple[pd.DataFrame, AssignmentTable]]:
+        """Liest alle Blöcke eines Snapshots in Reihenfolge."""
+        block = 0
+        while (leads_path := snapshot_dir / f"{_LEADS_PREFIX}-{block:05d}.arrow").exists():
+            leads_df = _read_ipc(leads_path)
+            segments_df = _read_ipc(snapshot_dir / f"{_SEGMENTS_PREFIX}-{block:05d}.arrow")
+            yield leads_df, _assignments_from_frame(leads_df, segments_df)
+            block += 1
+
+
+class SnapshotWriter:
+    """Schreibt einen Snapshot blockweise; erst beim fehlerfreien Abschluss gültig.
+
+    Jeder Writer nutzt ein eigenes Staging-Verzeichnis, damit parallele Läufe
+    auf derselben Eingabe sich nicht gegenseitig Blöcke löschen. Hat ein
+    anderer Lauf den Snapshot zuerst abgeschlossen, gewinnt dessen Ergebnis.
+    """
+
+    def __init__(self, directory: Path, key: str) -> None:
+        self._target = directory / key
+        directory.mkdir(parents=True, exist_ok=True)
+        self._tmp = Path(tempfile.mkdtemp(dir=directory, prefix=f".{key}.", suffix=".tmp"))
+        self._block = 0
+
+    def add(self, leads_df: pd.DataFrame, assignments: AssignmentTable) -> None:
+        """Schreibt einen Block (Leads + Segmentierung)."""
+        _write_ipc(leads_df, self._tmp / f"{_LEADS_PREFIX}-{self._block:05d}.arrow")
+        _write_ipc(
+            _assignments_to_frame(assignments),
+            self._tmp / f"{_SEGMENTS_PREFIX}-{self._block:05d}.arrow",
+        )
+        self._block += 1
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            # Abgebrochen (z.B. Vorschau nach den ersten Blöcken) — verwerfen
+            shutil.rmtree(self._tmp, ignore_errors=True)
+            return
+
+        if not self._target.exists():
+            try:
+                self._tmp.rename(self._target)
+            except OSError:
+                # Ein paralleler Lauf war schneller (Ziel existiert, nicht leer)
+                pass
+            else:
+                logger.info(
+                    f"Snapshot geschrieben: {self._target.name[:12]} ({self._block} Blöcke)"
+                )
+                return
+
+        logger.info(f"Snapshot {self._target.name[:12]} existiert bereits — verwerfe eigenen")
+        shutil.rmtree(self._tmp, ignore_errors=True)
+
+
+def _write_ipc(df: pd.DataFrame, path: Path) -> None:
+    """Schreibt einen DataFrame als unkomprimierte Arrow-IPC-Datei."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(str(path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def _read_ipc(path: Path) -> pd.DataFrame:
+    """Liest eine Arrow-IPC-Datei per Memory-Mapping."""
+    import pyarrow as pa
+
+    with pa.memory_map(str(path)) as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas()
+
+
+def _assignments_to_frame(assignments: AssignmentTable) -> pd.DataFrame:
+    """Segmentierungsergebnis als Tabelle (Zeilennummer statt Lead-Kopie)."""
+    return pd.DataFrame({
+        "row": assignments.rows.astype("int64"),
+        "company_id": pd.Categorical.from_codes(
+            assignments.company_codes, categories=assignments.companies
+        ),
+        "segment_id": pd.Categorical.from_codes(
+            assignments.segment_codes, categories=assignments.segments
+        ),
+        "match_score": assignments.scores,
+    })
+
+
+def _assignments_from_frame(leads_df: pd.DataFrame, segments_df: pd.DataFrame) -> AssignmentTable:
+    """Baut die AssignmentTable aus der gespeicherten Tabelle wieder auf."""
+    companies = segments_df["company_id"].cat
+    segments = segments_df["segment_id"].cat
+    return AssignmentTable(
+        leads_df,
+        segments_df["row"].to_numpy(),
+        companies.codes.to_numpy(),
+        segments.codes.to_numpy(),
+        segments_df["match_score"].to_numpy(),
+        [str(c) for c in companies.categories],
+        [str(s) for s in segments.categories],
+    )
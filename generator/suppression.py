@@ -0,0 +1,328 @@
+"""Persistenter Sperr-Index für bereits exportierte E-Mail-Adressen.
+
+Verhindert, dass Leads aus überlappenden Apollo-Listen erneut personalisiert
+und exportiert werden. Der Index liegt als SQLite-Datenbank auf der Platte
+(skaliert auf zig Millionen Adressen). Davor sitzt ein Bloom-Filter, der die
+meisten Anfragen für neue Adressen ohne Plattenzugriff beantwortet.
+
+Einträge gelten entweder global (campaign_id "") oder pro Kampagne.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+from collections.abc import Iterable, Sequence
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from generator.segmenter import AssignmentTable
+
+logger = logging.getLogger(__name__)
+
+DB_FILENAME = "suppression.sqlite3"
+BLOOM_FILENAME = "suppression.bloom"
+
+# Maximale Anzahl Parameter pro SQL-Abfrage
+_SQL_BATCH = 500
+
+# Globale Einträge haben keine Kampagne
+_GLOBAL = ""
+
+# Header der Bloom-Datei: size, hash_count, generation (je int64)
+_BLOOM_HEADER = 24
+
+
+class BloomFilter:
+    """Bloom-Filter mit vektorisierten Abfragen über numpy.
+
+    Nutzt Double Hashing (Kirsch-Mitzenmacher) auf einem BLAKE2b-Digest.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def add_many(self, keys: Iterable[str]) -> None:
+        """Fügt mehrere Schlüssel hinzu."""
+        positions = self._positions(keys)
+        if positions.size:
+            np.bitwise_or.at(
+                self.bits, positions >> 3, (1 << (positions & 7)).astype(np.uint8)
+            )
+
+    def contains_many(self, keys: Sequence[str]) -> np.ndarray:
+        """Prüft mehrere Schlüssel (False = sicher nicht enthalten)."""
+        if not keys:
+            return np.zeros(0, dtype=bool)
+        positions = self._positions(keys)
+        hits = (self.bits[positions >> 3] >> (positions & 7)) & 1
+        return hits.all(axis=1)
+
+    def save(self, path: Path, generation: int) -> None:
+        """Speichert den Filter samt Index-Generation (atomar über eine Temp-Datei)."""
+        header = np.array([self.size, self.hash_count, generation], dtype=np.int64)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(header.tobytes())
+            f.write(self.bits.tobytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> tuple["BloomFilter", int]:
+        """Lädt einen gespeicherten Filter.
+
+        Returns:
+            Tuple (Filter, Index-Generation beim Speichern).
+
+        Raises:
+            ValueError: Wenn die Datei abgeschnitten oder beschädigt ist.
+        """
+        raw = np.fromfile(path, dtype=np.uint8)
+        if raw.size < _BLOOM_HEADER:
+            raise ValueError(f"Bloom-Datei zu kurz: {path}")
+        size, hash_count, generation = raw[:_BLOOM_HEADER].view(np.int64)
+        if size < 1 or hash_count < 1 or raw.size - _BLOOM_HEADER != (size + 7) // 8:
+            raise ValueError(f"Bloom-Datei passt nicht zur Filtergröße: {path}")
+        bloom = cls.__new__(cls)
+        bloom.size = int(size)
+        bloom.hash_count = int(hash_count)
+        bloom.bits = raw[_BLOOM_HEADER:].copy()
+        return bloom, int(generation)
+
+    def _positions(self, keys: Iterable[str]) -> np.ndarray:
+        """Bit-Positionen als Matrix (Schlüssel × Hashfunktionen)."""
+        digests = b"".join(
+            hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+            for key in keys
+        )
+        hashes = np.frombuffer(digests, dtype=np.uint64).reshape(-1, 2)
+        rounds = np.arange(self.hash_count, dtype=np.uint64)
+        combined = hashes[:, :1] + rounds * hashes[:, 1:]
+        return (combined % np.uint64(self.size)).astype(np.int64)
+
+
+class SuppressionIndex:
+    """On-Disk-Index aller exportierten E-Mail-Adressen."""
+
+    def __init__(
+        self,
+        directory: str | Path,
+        bloom_capacity: int = 10_000_000,
+        bloom_error_rate: float = 0.01,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.directory / DB_FILENAME)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS suppressed ("
+            " email TEXT NOT NULL,"
+            " campaign_id TEXT NOT NULL,"
+            " exported_at TEXT NOT NULL,"
+            " PRIMARY KEY (email, campaign_id)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)"
+        )
+        self._conn.commit()
+
+        self._bloom_capacity = bloom_capacity
+        self._bloom_error_rate = bloom_error_rate
+        self._bloom_generation = 0
+        self._bloom_dirty = False
+        self._bloom = self._load_bloom()
+
+    def contains(self, emails: Sequence[str], campaign_id: str | None = None) -> np.ndarray:
+        """Prüft, welche Adressen bereits exportiert wurden.
+
+        Args:
+            emails: E-Mail-Adressen.
+            campaign_id: Optional — nur Exporte in diese Kampagne zählen.
+                None prüft die globalen Einträge.
+
+        Returns:
+            Bool-Array (True = gesperrt).
+        """
+        scope = campaign_id or _GLOBAL
+        normalized = [_normalize(e) for e in emails]
+        result = np.zeros(len(normalized), dtype=bool)
+        if not normalized:
+            return result
+
+        candidates = np.flatnonzero(
+            self._bloom.contains_many([_bloom_key(e, scope) for e in normalized])
+        )
+        if candidates.size == 0:
+            return result
+
+        # Nur Bloom-Treffer auf der Platte nachschlagen
+        found: set[str] = set()
+        candidate_emails = [normalized[i] for i in candidates]
+        for start in range(0, len(candidate_emails), _SQL_BATCH):
+            batch = candidate_emails[start : start + _SQL_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT email FROM suppressed WHERE campaign_id = ? "
+                f"AND email IN ({placeholders})",
+                [scope, *batch],
+            )
+            found.update(row[0] for row in rows)
+
+        for i, email in zip(candidates, candidate_emails):
+            result[i] = email in found
+        return result
+
+    def add(self, emails: Iterable[str], campaign_id: str | None = None) -> int:
+        """Trägt exportierte Adressen ein (global und ggf. pro Kampagne).
+
+        Args:
+            emails: E-Mail-Adressen.
+            campaign_id: Kampagne des Exports.
+
+        Returns:
+            Anzahl neuer Einträge (Adresse × Geltungsbereich).
+
+        Der Bloom-Filter wird nur im Speicher ergänzt und erst von `flush`
+        bzw. `close` einmal gespeichert. Hat ein anderer Lauf den Index seit
+        dem Laden des Filters geändert, fehlen dessen Einträge im Filter —
+        dann wird er aus der Datenbank neu aufgebaut.
+        """
+        scopes = [_GLOBAL] if not campaign_id else [_GLOBAL, campaign_id]
+        normalized = {_normalize(e) for e in emails if e}
+        if not normalized:
+            return 0
+
+        timestamp = datetime.now().isoformat(timespec="seconds")
+        before = self._conn.total_changes
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO suppressed (email, campaign_id, exported_at) "
+                "VALUES (?, ?, ?)",
+                [(email, scope, timestamp) for email in normalized for scope in scopes],
+            )
+            self._conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('generation', 1) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+            )
+            # Innerhalb der Schreibtransaktion — kein anderer Lauf dazwischen
+            generation = self._generation()
+        added = self._conn.total_changes - before - 1
+
+        if generation - 1 != self._bloom_generation:
+            logger.info("Sperr-Index von anderem Lauf geändert — baue Bloom-Filter neu auf")
+            self._bloom = self._build_bloom()
+            return added
+
+        self._bloom.add_many(_bloom_key(e, s) for e in normalized for s in scopes)
+        self._bloom_generation = generation
+        self._bloom_dirty = True
+        return added
+
+    def filter_leads(self, df: pd.DataFrame, campaign_id: str | None = None) -> pd.DataFrame:
+        """Entfernt bereits exportierte Leads aus einem DataFrame.
+
+        Args:
+            df: DataFrame mit 'email' Spalte.
+            campaign_id: Optional — nur Exporte in diese Kampagne zählen.
+
+        Returns:
+            DataFrame ohne gesperrte Leads.
+        """
+        suppressed = self.contains(df["email"].tolist(), campaign_id)
+        count = int(suppressed.sum())
+        if count > 0:
+            logger.info(f"{count} Leads übersprungen — bereits in früherem Lauf exportiert")
+            df = df[~suppressed].reset_index(drop=True)
+        return df
+
+    def filter_assignments(
+        self, assignments: AssignmentTable, campaign_prefix: str
+    ) -> AssignmentTable:
+        """Entfernt Zuordnungen, deren Lead bereits in diese Kampagne exportiert wurde.
+
+        Args:
+            assignments: Lead-Zuordnungen.
+            campaign_prefix: Prefix der Campaign-ID (wie beim Export).
+
+        Returns:
+            Gefilterte Tabelle in unveränderter Reihenfolge.
+        """
+        keep = np.ones(len(assignments), dtype=bool)
+        emails = assignments.column("email")
+
+        for code, company_id in enumerate(assignments.companies):
+            indices = np.flatnonzero(assignments.company_codes == code)
+            if indices.size == 0:
+                continue
+            suppressed = self.contains(
+                emails[indices].tolist(), f"{campaign_prefix}_{company_id}"
+            )
+            keep[indices[suppressed]] = False
+
+        removed = len(assignments) - int(keep.sum())
+        if removed > 0:
+            logger.info(f"{removed} Zuordnungen übersprungen — bereits in diese Kampagne exportiert")
+        return assignments.filter(keep)
+
+    def flush(self) -> None:
+        """Speichert den Bloom-Filter, falls seit dem letzten Speichern ergänzt."""
+        if self._bloom_dirty:
+            self._bloom.save(self.directory / BLOOM_FILENAME, self._bloom_generation)
+            self._bloom_dirty = False
+
+    def close(self) -> None:
+        """Speichert den Bloom-Filter und schließt die Datenbankverbindung."""
+        self.flush()
+        self._conn.close()
+
+    def _generation(self) -> int:
+        """Änderungszähler des Index (für die Gültigkeit des Bloom-Filters)."""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return row[0] if row else 0
+
+    def _load_bloom(self) -> BloomFilter:
+        """Lädt den Bloom-Filter oder baut ihn aus der Datenbank neu auf."""
+        path = self.directory / BLOOM_FILENAME
+        if path.exists():
+            try:
+                bloom, saved_generation = BloomFilter.load(path)
+            except ValueError as e:
+                logger.warning(f"{e} — baue neu auf")
+            else:
+                if saved_generation == self._generation():
+                    self._bloom_generation = saved_generation
+                    return bloom
+                logger.info("Bloom-Filter veraltet — baue neu auf")
+        return self._build_bloom()
+
+    def _build_bloom(self) -> BloomFilter:
+        """Baut den Bloom-Filter aus der Datenbank auf und speichert ihn."""
+        # Generation vor den Zeilen lesen: der Filter enthält mindestens diesen Stand
+        generation = self._generation()
+        bloom = BloomFilter(self._bloom_capacity, self._bloom_error_rate)
+        cursor = self._conn.execute("SELECT email, campaign_id FROM suppressed")
+        while rows := cursor.fetchmany(100_000):
+            bloom.add_many(_bloom_key(email, scope) for email, scope in rows)
+        bloom.save(self.directory / BLOOM_FILENAME, generation)
+        self._bloom_generation = generation
+        self._bloom_dirty = False
+        return bloom
+
+
+def _normalize(email: str) -> str:
+    """Normalisiert eine Adresse für den Index."""
+    return email.strip().lower()
+
+
+def _bloom_key(email: str, scope: str) -> str:
+    """Schlüssel im Bloom-Filter (Kampagne + Adresse)."""
+    return f"{scope}\x1f{email}"
@@ -1,10 +1,28 @@
-"""Template-Auswahl und Rendering mit Jinja2."""
+"""Template-Auswahl und Rendering mit Jinja2.
+
+Templates, die nur aus Text und einfachen Variablen (`{{ first_name }}`)
+bestehen, werden beim ersten Gebrauch zu einem `StaticTemplate` kompiliert
+und ohne Jinja-Laufzeit gerendert. Templates mit Blöcken, Filtern oder
+Ausdrücken laufen weiter über Jinja2.
+"""
 
 import logging
+import weakref
+from collections.abc import Iterable, Iterator, Mapping
 from dataclasses import dataclass
 from pathlib import Path
 
-from jinja2 import Environment, FileSystemLoader, TemplateNotFound
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    Template,
+    TemplateNotFound,
+    TemplateSyntaxError,
+    Undefined,
+    meta,
+    nodes,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -19,11 +37,90 @@ class RenderedEmail:
     pdf_link: str
 
 
-def create_environment(templates_dir: str | Path) -> Environment:
+@dataclass
+class RenderJob:
+    """Eine zu rendernde E-Mail (Eingabe für `render_many`)."""
+
+    company_id: str
+    segment_id: str
+    lead: Mapping
+    icebreaker: str
+    pdf_link: str
+
+
+class StaticTemplate:
+    """Vorkompiliertes Template aus statischen Textstücken und Variablen-Slots.
+
+    `parts` enthält den statischen Text, an den Positionen aus `slots` wird
+    beim Rendern der Wert der jeweiligen Variable eingesetzt. Fehlende
+    Variablen werden wie bei Jinja2 (`Undefined`) zu "".
+    """
+
+    __slots__ = ("parts", "slots")
+
+    def __init__(self, parts: list[str], slots: list[tuple[int, str]]) -> None:
+        self.parts = parts
+        self.slots = slots
+
+    def render(self, context: Mapping | None = None) -> str:
+        """Rendert das Template mit einem einzigen Join."""
+        parts = self.parts.copy()
+        if context is not None:
+            for index, name in self.slots:
+                if name in context:
+                    parts[index] = str(context[name])
+        return "".join(parts)
+
+
+def compile_static(env: Environment, source: str) -> StaticTemplate | None:
+    """Kompiliert ein Template mit reinen Variablen-Ersetzungen.
+
+    Args:
+        env: Jinja2 Environment (für Lexer-Einstellungen).
+        source: Template-Quelltext.
+
+    Returns:
+        StaticTemplate, oder None wenn das Template mehr als Text und
+        einfache Variablen enthält (Blöcke, Filter, Ausdrücke, ...).
+    """
+    if env.autoescape or env.finalize is not None or env.undefined is not Undefined:
+        return None
+
+    try:
+        tree = env.parse(source)
+    except TemplateSyntaxError:
+        return None
+
+    parts: list[str] = []
+    slots: list[tuple[int, str]] = []
+    for node in tree.body:
+        if not isinstance(node, nodes.Output):
+            return None
+        for child in node.nodes:
+            if isinstance(child, nodes.TemplateData):
+                parts.append(child.data)
+            elif (
+                isinstance(child, nodes.Name)
+                and child.ctx == "load"
+                and child.name not in env.globals
+            ):
+                slots.append((len(parts), child.name))
+                parts.append("")
+            else:
+                return None
+    return StaticTemplate(parts, slots)
+
+
+def create_environment(
+    templates_dir: str | Path,
+    bytecode_cache: bool = True,
+) -> Environment:
     """Erstellt eine Jinja2-Umgebung für die Templates.
 
     Args:
         templates_dir: Pfad zum Templates-Verzeichnis.
+        bytecode_cache: Kompilierte Templates in
+            `<templates_dir>/__compiled__/jinja` ablegen und wiederverwenden.
 
     Returns:
         Konfigurierte Jinja2 Environment.
@@ -32,14 +129,41 @@ def create_environment(templates_dir: str | Path) -> Environment:
     if not templates_dir.exists():
         raise FileNotFoundError(f"Templates-Verzeichnis nicht gefunden: {templates_dir}")
 
+    cache = None
+    if bytecode_cache:
+        cache_dir = templates_dir / "__compiled__" / "jinja"
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            cache = FileSystemBytecodeCache(str(cache_dir))
+        except OSError as e:
+            logger.debug(f"Kein Bytecode-Cache für Templates: {e}")
+
     return Environment(
         loader=FileSystemLoader(str(templates_dir)),
         trim_blocks=True,
         lstrip_blocks=True,
         keep_trailing_newline=False,
+        bytecode_cache=cache,
     )
 
 
+def precompile(env: Environment) -> int:
+    """Lädt alle E-Mail-Templates (`{company}/{segment}.txt`) vorab.
+
+    Füllt den Bytecode-Cache bzw. lädt daraus, sodass beim Rendern nichts
+    mehr kompiliert werden muss.
+
+    Returns:
+        Anzahl geladener Templates.
+    """
+    names = env.list_templates(
+        filter_func=lambda name: name.endswith(".txt") and "__compiled__" not in name
+    )
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
 def render(
     company_id: str,
     segment_id: str,
@@ -95,6 +219,143 @@ def render(
     )
 
 
+def render_many(
+    jobs: Iterable[RenderJob],
+    sender_name: str,
+    env: Environment,
+    static: bool = True,
+) -> Iterator[RenderedEmail | None]:
+    """Rendert viele E-Mails; Ergebnis identisch zu `render` pro Job.
+
+    Jedes Template wird pro (company_id, segment_id) nur einmal geladen und
+    vorbereitet. Bei Templates der Form "Betreff: ...", Leerzeile, Body ohne
+    Jinja-Blöcke werden Betreff und Body getrennt gerendert — ein Betreff
+    ohne Variablen nur einmal. Andere Templates werden wie in `render`
+    komplett gerendert und danach getrennt.
+
+    Args:
+        jobs: Zu rendernde E-Mails (werden gestreamt).
+        sender_name: Name des Absenders.
+        env: Jinja2 Environment.
+        static: Einfache Templates als `StaticTemplate` ohne Jinja rendern.
+
+    Yields:
+        RenderedEmail pro Job in Eingabereihenfolge, None wenn das Rendern
+        fehlgeschlagen ist (Fehler wird geloggt).
+    """
+    prepared: dict[tuple[str, str], _PreparedTemplate | Exception] = {}
+
+    for job in jobs:
+        key = (job.company_id, job.segment_id)
+        template = prepared.get(key)
+        if template is None:
+            try:
+                template = _prepare(env, *key, static=static)
+            except Exception as e:
+                template = e
+            prepared[key] = template
+
+        try:
+            if isinstance(template, Exception):
+                raise template
+            context = dict(job.lead)
+            context["icebreaker"] = job.icebreaker
+            context["pdf_link"] = job.pdf_link
+            context["sender_name"] = sender_name
+            subject_line, body = template.render(context)
+        except Exception as e:
+            logger.error(
+                f"Template-Fehler für {job.lead.get('email', '?')} "
+                f"({job.company_id}/{job.segment_id}): {e}"
+            )
+            yield None
+            continue
+
+        yield RenderedEmail(
+            subject_line=subject_line,
+            body=body,
+            icebreaker=job.icebreaker,
+            pdf_link=job.pdf_link,
+        )
+
+
+class _PreparedTemplate:
+    """Ein geladenes Template, ggf. in Betreff und Body zerlegt."""
+
+    def __init__(
+        self,
+        full: Template | StaticTemplate,
+        subject: Template | StaticTemplate | None = None,
+        body: Template | StaticTemplate | None = None,
+    ) -> None:
+        self.full = full
+        self.subject = subject
+        self.body = body
+        self.static_subject: str | None = None
+
+    def render(self, context: dict) -> tuple[str, str]:
+        """Rendert Betreff und Body."""
+        if self.subject is None:
+            return _split_subject_and_body(self.full.render(context))
+
+        subject_line = self.static_subject
+        if subject_line is None:
+            subject_line = self.subject.render(context)
+            if "\n" in subject_line:
+                # Zeilenumbruch aus den Lead-Daten — Trennung wie beim Einzel-Rendern
+                return _split_subject_and_body(self.full.render(context))
+            subject_line = subject_line.strip()
+        if not subject_line:
+            logger.warning("Keine Betreffzeile im Template gefunden")
+
+        body = self.body.render(context).strip()
+        return subject_line, body
+
+
+# Vorbereitete Templates pro Environment (bleiben über Batches erhalten)
+_prepared_cache: "weakref.WeakKeyDictionary[Environment, dict]" = weakref.WeakKeyDictionary()
+
+
+def _prepare(
+    env: Environment, company_id: str, segment_id: str, static: bool = True
+) -> _PreparedTemplate:
+    """Lädt ein Template und zerlegt es, wenn möglich, in Betreff und Body."""
+    cache = _prepared_cache.setdefault(env, {})
+    key = (company_id, segment_id, static)
+    if key in cache:
+        return cache[key]
+
+    template_path = f"{company_id}/{segment_id}.txt"
+    try:
+        full = env.get_template(template_path)
+    except TemplateNotFound:
+        logger.error(f"Template nicht gefunden: {template_path}")
+        raise
+
+    source = env.loader.get_source(env, template_path)[0]
+
+    def compile_part(text: str) -> Template | StaticTemplate:
+        return (static and compile_static(env, text)) or env.from_string(text)
+
+    prepared = _PreparedTemplate((static and compile_static(env, source)) or full)
+    if "{%" not in source and "{#" not in source:
+        lines = source.split("\n")
+        first = next((i for i, line in enumerate(lines) if line.strip()), None)
+        if first is not None and lines[first].strip().lower().startswith("betreff:"):
+            subject_source = lines[first].strip()[len("Betreff:"):].strip()
+            body_source = "\n".join(lines[first + 1:])
+            try:
+                prepared.subject = compile_part(subject_source)
+                prepared.body = compile_part(body_source)
+                if not meta.find_undeclared_variables(env.parse(subject_source)):
+                    prepared.static_subject = prepared.subject.render().strip()
+            except TemplateSyntaxError:
+                prepared.subject = prepared.body = prepared.static_subject = None
+
+    cache[key] = prepared
+    return prepared
+
+
 def _split_subject_and_body(rendered: str) -> tuple[str, str]:
     """Trennt Betreffzeile und Body aus dem gerenderten Template.
 
@@ -2,20 +2,36 @@
 
 Verwandelt Apollo.io CSV-Exporte in personalisierte, segmentierte
 Kaltakquise-E-Mails und exportiert sie als Instantly.ai-kompatible CSVs.
+
+Schwere Abhängigkeiten (pandas, anthropic, jinja2, email_validator) werden
+erst in den Befehlen importiert, die sie brauchen — `--help` und `stats`
+starten ohne sie.
 """
 
-import asyncio
+from __future__ import annotations
+
+import csv
 import logging
 import sys
+from collections.abc import Callable, Iterator
 from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import click
-import pandas as pd
-import yaml
 
-from generator import csv_reader, segmenter, template_engine, ai_personalizer, pdf_linker
-from generator.csv_exporter import build_output_row, export
+from generator import artifacts
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from generator import segmenter
+    from generator.ai_batch import BatchJournal
+    from generator.response_cache import ResponseCache
+    from generator.segment_cache import SegmentCache
+    from generator.segment_profile import SegmentationProfile
+    from generator.snapshot import SnapshotStore
+    from generator.suppression import SuppressionIndex
 
 
 def load_yaml(path: str | Path) -> dict:
@@ -25,17 +41,45 @@ def load_yaml(path: str | Path) -> dict:
         path: Pfad zur YAML-Datei.
 
     Returns:
-        Geladenes Dict.
+        Geladenes Dict (geparst gecacht, siehe generator/artifacts.py).
 
     Raises:
         FileNotFoundError: Wenn die Datei nicht existiert.
     """
-    path = Path(path)
-    if not path.exists():
-        raise FileNotFoundError(f"Konfigurationsdatei nicht gefunden: {path}")
+    return artifacts.load_yaml_cached(path)
+
+
+def load_rules(config: dict) -> dict:
+    """Lädt die Segmentierungsregeln samt vorkompilierten Keyword-Matchern.
+
+    Args:
+        config: App-Konfiguration.
+
+    Returns:
+        Geladene Regeln (die kompilierte Fassung nutzt `assign_all` automatisch).
+    """
+    from generator import segmenter
+
+    rules, compiled = artifacts.load_rules(
+        config.get("segments_config", "./segments/rules.yaml")
+    )
+    segmenter.use_compiled(rules, compiled)
+    return rules
+
+
+def load_links(config: dict) -> tuple[dict, dict]:
+    """Lädt die PDF-Links und die vorab aufgelösten Links pro Firma/Segment.
 
-    with open(path, encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+    Args:
+        config: App-Konfiguration.
+
+    Returns:
+        Tuple (links.yaml, {(Firma, Segment): Link}).
+    """
+    return artifacts.load_links(
+        config.get("promo_materials_config", "./promo_materials/links.yaml"),
+        config.get("segments_config", "./segments/rules.yaml"),
+    )
 
 
 def setup_logging(log_level: str, output_dir: str | Path) -> None:
@@ -74,6 +118,346 @@ def chunked(lst: list, size: int) -> list[list]:
     return [lst[i : i + size] for i in range(0, len(lst), size)]
 
 
+def iter_leads(
+    input_path: str | Path,
+    config: dict,
+    drop_duplicates: bool | None = None,
+) -> Iterator[pd.DataFrame]:
+    """Liest die Apollo CSV ein — blockweise, wenn `chunk_size` gesetzt ist.
+
+    Args:
+        input_path: Pfad zur Apollo.io CSV-Datei.
+        config: App-Konfiguration.
+        drop_duplicates: Duplikate entfernen (Default: `duplicate_check`).
+
+    Yields:
+        Bereinigte Lead-DataFrames (bei chunk_size 0 genau einer).
+    """
+    from generator import csv_reader
+
+    if drop_duplicates is None:
+        drop_duplicates = config.get("duplicate_check", True)
+
+    chunk_size = config.get("chunk_size", 0)
+    memory_map = config.get("csv_memory_map", True)
+    engine = config.get("csv_engine", "auto")
+    if chunk_size:
+        yield from csv_reader.read_in_chunks(
+            input_path, chunk_size, drop_duplicates, memory_map=memory_map, engine=engine
+        )
+        return
+
+    leads_df = csv_reader.read_and_validate(input_path, engine=engine, memory_map=memory_map)
+    if drop_duplicates:
+        leads_df = csv_reader.deduplicate(leads_df)
+    yield leads_df
+
+
+def iter_segmented(
+    input_path: str | Path,
+    config: dict,
+    rules: dict,
+    company: str | None = None,
+    drop_duplicates: bool | None = None,
+    suppression: SuppressionIndex | None = None,
+    profile: SegmentationProfile | None = None,
+) -> Iterator[tuple[pd.DataFrame, segmenter.AssignmentTable]]:
+    """Liest und segmentiert die Leads blockweise — aus dem Snapshot, wenn vorhanden.
+
+    Args:
+        input_path: Pfad zur Apollo.io CSV-Datei.
+        config: App-Konfiguration.
+        rules: Segmentierungsregeln.
+        company: Optional — nur für diese Firma zuordnen.
+        drop_duplicates: Duplikate entfernen (Default: `duplicate_check`).
+        suppression: Optional — bereits exportierte Leads direkt nach dem
+            Einlesen entfernen.
+        profile: Optional — Segmentierung profilieren (ohne Snapshot).
+
+    Yields:
+        Tuple (Lead-DataFrame, Assignments) pro Block.
+    """
+    if drop_duplicates is None:
+        drop_duplicates = config.get("duplicate_check", True)
+
+    cache = open_segment_cache(config)
+    try:
+        yield from _iter_segmented(
+            input_path, config, rules, company, drop_duplicates, suppression, cache, profile
+        )
+    finally:
+        if cache is not None:
+            stats = cache.stats()
+            if stats["hits"] or stats["misses"]:
+                logging.getLogger(__name__).info(
+                    f"Segment-Cache: {stats['hits']} Treffer, {stats['misses']} neu berechnet "
+                    f"(Trefferquote {stats['hit_rate']:.1%}, {stats['size']} Signaturen)"
+                )
+            cache.save()
+
+
+def _iter_segmented(
+    input_path: str | Path,
+    config: dict,
+    rules: dict,
+    company: str | None,
+    drop_duplicates: bool,
+    suppression: SuppressionIndex | None,
+    cache: SegmentCache | None,
+    profile: SegmentationProfile | None,
+) -> Iterator[tuple[pd.DataFrame, segmenter.AssignmentTable]]:
+    """Segmentierung mit oder ohne Snapshot (siehe `iter_segmented`)."""
+    from generator import segmenter
+
+    # Beim Profiling muss tatsächlich segmentiert werden
+    store = open_snapshot_store(config) if profile is None else None
+    if store is None:
+        for leads_df in iter_leads(input_path, config, drop_duplicates):
+            if suppression is not None:
+                leads_df = suppression.filter_leads(leads_df)
+            yield leads_df, segmenter.assign_all(
+                leads_df, rules, company, cache=cache, profile=profile
+            )
+        return
+
+    # Snapshots enthalten immer alle Firmen; Filter werden danach angewendet
+    segmenter.select_companies(rules, company)
+    key = store.key(
+        input_path,
+        config.get("segments_config", "./segments/rules.yaml"),
+        drop_duplicates,
+        config.get("chunk_size", 0),
+    )
+    blocks = store.load(key)
+    if blocks is None:
+        blocks = _segment_and_snapshot(
+            store, key, input_path, config, rules, drop_duplicates, cache
+        )
+
+    for leads_df, assignments in blocks:
+        if suppression is not None:
+            filtered_df = suppression.filter_leads(leads_df)
+            if len(filtered_df) != len(leads_df):
+                kept = leads_df["email"].isin(filtered_df["email"]).to_numpy()
+                assignments = assignments.filter(kept[assignments.rows])
+            leads_df = filtered_df
+        if company:
+            assignments = assignments.filter(assignments.company_ids == company)
+        yield leads_df, assignments
+
+
+def _segment_and_snapshot(
+    store: SnapshotStore,
+    key: str,
+    input_path: str | Path,
+    config: dict,
+    rules: dict,
+    drop_duplicates: bool,
+    cache: SegmentCache | None = None,
+) -> Iterator[tuple[pd.DataFrame, segmenter.AssignmentTable]]:
+    """Liest und segmentiert die Leads und schreibt dabei einen Snapshot."""
+    from generator import segmenter
+
+    with store.writer(key) as writer:
+        for leads_df in iter_leads(input_path, config, drop_duplicates):
+            assignments = segmenter.assign_all(leads_df, rules, cache=cache)
+            writer.add(leads_df, assignments)
+            yield leads_df, assignments
+
+    store.collect_garbage(
+        max_age_days=config.get("snapshot_max_age_days", 14),
+        max_bytes=config.get("snapshot_max_mb", 2048) * 1024 * 1024,
+    )
+
+
+async def generate_icebreakers(
+    assignments: segmenter.AssignmentTable,
+    rules: dict,
+    config: dict,
+    cache: ResponseCache | None,
+    emit: Callable[[list[tuple[int, str]]], None],
+    checkpoint: int,
+) -> None:
+    """Generiert alle Icebreaker auf einer Event-Loop mit einem Client.
+
+    Fertige Icebreaker werden sofort an `emit` übergeben (Rendern), ohne
+    auf langsamere Anfragen zu warten. Alle `checkpoint` Icebreaker
+    (= batch_size) werden Fortschritt und API-Verbrauch ausgegeben, am Ende
+    Prompt-Cache-Nutzung und Latenz des Laufs.
+
+    Args:
+        assignments: Alle Lead-Zuordnungen des Laufs.
+        rules: Segmentierungsregeln.
+        config: App-Konfiguration.
+        cache: Optionaler Antwort-Cache.
+        emit: Erhält Listen von (Index, Icebreaker).
+        checkpoint: Icebreaker zwischen zwei Fortschrittsmeldungen.
+    """
+    from generator import ai_personalizer
+    from generator.rate_control import RateController
+
+    rate_state_path = config.get("ai_rate_state_path", "./data/cache/rate_limits.json")
+    rate = RateController.from_config(config, rate_state_path)
+    generator = ai_personalizer.IcebreakerGenerator(rules, config, cache, rate=rate)
+    if not generator.enabled:
+        logging.getLogger(__name__).warning(
+            "ANTHROPIC_API_KEY nicht gesetzt — nutze Fallback-Icebreaker"
+        )
+        emit(list(enumerate(ai_personalizer.fallback_batch(assignments))))
+        return
+
+    total = len(assignments)
+    done = 0
+    next_checkpoint = checkpoint
+    try:
+        async for ready in generator.stream(assignments, config.get("ai_pipeline_size", 500)):
+            emit(ready)
+            done += len(ready)
+            if done >= next_checkpoint or done == total:
+                click.echo(
+                    f"  Checkpoint {done}/{total} Icebreaker — {generator.requests} API-Calls, "
+                    f"{generator.input_tokens} Input-/{generator.output_tokens} Output-Tokens"
+                )
+                next_checkpoint = (done // checkpoint + 1) * checkpoint
+    finally:
+        await generator.aclose()
+        usage = generator.stats()
+        if usage["requests"]:
+            click.echo(
+                f"  Prompt-Cache: {usage['cache_read_tokens']} Tokens gelesen, "
+                f"{usage['cache_write_tokens']} geschrieben ({usage['cache_hit_rate']:.0%} des "
+                f"Inputs) — Latenz p50 {usage['latency_p50']:.2f}s, p95 {usage['latency_p95']:.2f}s"
+            )
+        if usage["clusters"]:
+            click.echo(
+                f"  Cluster: {usage['clusters']} Cluster, {usage['cluster_leads']} Leads "
+                f"mit Cluster-Icebreaker"
+            )
+            for cluster in generator.clusters[:10]:
+                logging.getLogger(__name__).info(
+                    f"Cluster {' | '.join(cluster.signature)}: {cluster.size} Leads, "
+                    f"{cluster.variants} Varianten, {cluster.served} bedient, "
+                    f"{cluster.individual} über Obergrenze, {cluster.rejected} verworfen"
+                )
+        if usage["packs"]:
+            click.echo(
+                f"  Paketanfragen: {usage['packs']}, {usage['pack_retries']} Leads einzeln "
+                f"nachgefordert, Paketgröße zuletzt {usage['pack_size']}"
+            )
+        breaker = generator.breaker.stats()
+        if breaker["opened"]:
+            click.echo(
+                f"  ⚠ Circuit Breaker {breaker['opened']}× geöffnet — {breaker['rejected']} "
+                f"Anfragen direkt mit Fallback, {breaker['probes']} Probe-Anfragen, "
+                f"Zustand zuletzt {breaker['state']}"
+            )
+        rate.save(rate_state_path)
+        stats = rate.stats()
+        logging.getLogger(__name__).info(
+            f"Rate-Steuerung: {stats['rpm_limit']:.0f} RPM, {stats['tpm_limit']:.0f} TPM, "
+            f"Concurrency {stats['concurrency']}, {stats['rate_limited']}× Rate Limit"
+        )
+
+
+def open_snapshot_store(config: dict) -> SnapshotStore | None:
+    """Öffnet den Snapshot-Speicher, wenn aktiviert und pyarrow verfügbar ist.
+
+    Args:
+        config: App-Konfiguration.
+
+    Returns:
+        SnapshotStore oder None.
+    """
+    from generator.snapshot import SnapshotStore, arrow_available
+
+    if not config.get("snapshot_enabled", True):
+        return None
+    if not arrow_available():
+        logging.getLogger(__name__).warning("pyarrow nicht installiert — Snapshots deaktiviert")
+        return None
+    return SnapshotStore(config.get("snapshot_directory", "./data/cache/snapshots"))
+
+
+def open_segment_cache(config: dict) -> SegmentCache | None:
+    """Öffnet den Signatur-Cache der Segmentierung.
+
+    Args:
+        config: App-Konfiguration.
+
+    Returns:
+        SegmentCache oder None, wenn deaktiviert.
+    """
+    from generator.segment_cache import SegmentCache
+
+    if not config.get("segment_cache_enabled", True):
+        return None
+    return SegmentCache(
+        maxsize=config.get("segment_cache_size", 1_000_000),
+        path=config.get("segment_cache_path", "./data/cache/segments.pkl"),
+    )
+
+
+def open_response_cache(config: dict) -> ResponseCache | None:
+    """Öffnet den persistenten Cache für Icebreaker-Antworten.
+
+    Args:
+        config: App-Konfiguration.
+
+    Returns:
+        ResponseCache oder None, wenn deaktiviert.
+    """
+    from generator.response_cache import ResponseCache
+
+    if not config.get("ai_cache_enabled", True):
+        return None
+    return ResponseCache(
+        config.get("ai_cache_path", "./data/cache/icebreakers.sqlite3"),
+        ttl_seconds=config.get("ai_cache_ttl_days", 30) * 86400,
+        max_entries=config.get("ai_cache_max_entries", 1_000_000),
+    )
+
+
+def open_batch_journal(config: dict) -> BatchJournal:
+    """Öffnet das Journal der Message Batches (für `ai_mode: batch`).
+
+    Args:
+        config: App-Konfiguration.
+
+    Returns:
+        BatchJournal.
+    """
+    from generator.ai_batch import BatchJournal
+
+    return BatchJournal(
+        config.get("ai_batch_journal_path", "./data/cache/ai_batches.sqlite3"),
+        retention_days=config.get("ai_batch_retention_days", 29),
+    )
+
+
+def open_suppression_index(config: dict) -> SuppressionIndex | None:
+    """Öffnet den Sperr-Index für bereits exportierte Adressen.
+
+    Args:
+        config: App-Konfiguration.
+
+    Returns:
+        SuppressionIndex oder None, wenn deaktiviert.
+    """
+    from generator.suppression import SuppressionIndex
+
+    if not config.get("suppression_enabled", True):
+        return None
+
+    scope = config.get("suppression_scope", "global")
+    if scope not in ("global", "campaign"):
+        raise ValueError(f"Unbekannter suppression_scope: '{scope}'")
+
+    return SuppressionIndex(
+        config.get("suppression_directory", "./data/suppression"),
+        bloom_capacity=config.get("suppression_bloom_capacity", 10_000_000),
+    )
+
+
 @click.group()
 @click.version_option(version="1.0.0")
 def cli() -> None:
@@ -103,34 +487,66 @@ def cli() -> None:
     default=None,
     help="Nur für diese Firma generieren (z.B. seehafer_elemente).",
 )
+@click.option(
+    "--ignore-suppression",
+    is_flag=True,
+    default=False,
+    help="Bereits exportierte Leads nicht überspringen (Sperr-Index ignorieren).",
+)
 @click.option(
     "--config-path",
     default="config.yaml",
     type=click.Path(exists=True),
     help="Pfad zur Konfigurationsdatei.",
 )
-def generate(input_path: str, no_ai: bool, company: str | None, config_path: str) -> None:
+def generate(
+    input_path: str,
+    no_ai: bool,
+    company: str | None,
+    ignore_suppression: bool,
+    config_path: str,
+) -> None:
     """Vollständiger Durchlauf: Apollo CSV → E-Mails → Instantly CSV."""
+    import asyncio
+
+    import pandas as pd
+
+    from generator import ai_personalizer, pdf_linker, segmenter, template_engine
+    from generator.csv_exporter import build_output_row, export
+
     config = load_yaml(config_path)
     setup_logging(config.get("log_level", "INFO"), config.get("output_directory", "./data/output"))
 
     logger = logging.getLogger(__name__)
     logger.info("=== Gruppenwerk E-Mail-Generator gestartet ===")
 
-    # Schritt 1: CSV einlesen & validieren
-    click.echo("→ Lese Apollo CSV...")
-    leads_df = csv_reader.read_and_validate(input_path)
+    suppression = open_suppression_index(config)
+    global_suppression = (
+        suppression is not None
+        and not ignore_suppression
+        and config.get("suppression_scope", "global") == "global"
+    )
+    campaign_prefix = config.get("campaign_prefix", "gruppenwerk")
 
-    # Schritt 2: Duplikate entfernen
-    if config.get("duplicate_check", True):
-        leads_df = csv_reader.deduplicate(leads_df)
+    # Schritt 1–3: CSV einlesen, validieren, Duplikate entfernen, segmentieren
+    # (blockweise, wenn chunk_size gesetzt ist)
+    click.echo("→ Lese und segmentiere Apollo CSV...")
+    rules = load_rules(config)
+    lead_count = 0
+    tables: list[segmenter.AssignmentTable] = []
+    blocks = iter_segmented(
+        input_path, config, rules, company,
+        suppression=suppression if global_suppression else None,
+    )
+    for leads_df, block_assignments in blocks:
+        lead_count += len(leads_df)
+        tables.append(block_assignments)
+    assignments = segmenter.AssignmentTable.concat(tables)
 
-    click.echo(f"  {len(leads_df)} gültige Leads geladen")
+    if suppression is not None and not ignore_suppression and not global_suppression:
+        assignments = suppression.filter_assignments(assignments, campaign_prefix)
 
-    # Schritt 3: Segmentierung
-    click.echo("→ Segmentiere Leads...")
-    rules = load_yaml(config.get("segments_config", "./segments/rules.yaml"))
-    assignments = segmenter.assign_all(leads_df, rules, company)
+    click.echo(f"  {lead_count} gültige Leads geladen")
     click.echo(f"  {len(assignments)} Zuordnungen erstellt")
 
     if not assignments:
@@ -139,63 +555,100 @@ def generate(input_path: str, no_ai: bool, company: str | None, config_path: str
 
     # Schritt 4: E-Mails generieren
     click.echo("→ Generiere E-Mails...")
-    pdf_links = load_yaml(config.get("promo_materials_config", "./promo_materials/links.yaml"))
+    pdf_links, resolved_links = load_links(config)
     env = template_engine.create_environment(
         config.get("templates_directory", "./templates")
     )
+    template_engine.precompile(env)
     sender_name = config.get("default_sender_name", "Axel Seehafer")
     batch_size = config.get("batch_size", 50)
-    campaign_prefix = config.get("campaign_prefix", "gruppenwerk")
-
-    results: list[dict] = []
-    batches = chunked(assignments, batch_size)
 
-    for batch_idx, batch in enumerate(batches, 1):
-        click.echo(f"  Batch {batch_idx}/{len(batches)} ({len(batch)} Leads)...")
-
-        # Icebreaker generieren
-        if no_ai or not config.get("ai_enabled", True):
-            icebreakers = ai_personalizer.fallback_batch(batch)
-        else:
-            icebreakers = asyncio.run(
-                ai_personalizer.generate_batch(batch, rules, config)
+    use_ai = not no_ai and config.get("ai_enabled", True)
+    ai_mode = config.get("ai_mode", "realtime")
+    if ai_mode not in ("realtime", "batch"):
+        raise ValueError(f"Unbekannter ai_mode: '{ai_mode}'")
+    response_cache = open_response_cache(config) if use_ai else None
+
+    # Message Batches: alle Icebreaker vorab, laufende Batches werden fortgesetzt
+    batch_icebreakers: list[str] | None = None
+    if use_ai and ai_mode == "batch":
+        from generator import ai_batch
+
+        journal = open_batch_journal(config)
+        try:
+            batch_icebreakers = asyncio.run(
+                ai_batch.generate_all(assignments, rules, config, journal, response_cache)
             )
-
-        # Templates rendern und Ausgabezeilen bauen
-        for assignment, icebreaker in zip(batch, icebreakers):
-            lead_dict = assignment.lead.to_dict()
-            link = pdf_linker.resolve(
-                assignment.company_id, assignment.segment_id, pdf_links
+        except ai_batch.BatchPending as e:
+            click.echo(
+                f"⏳ {len(e.batch_ids)} Batches noch in Bearbeitung — "
+                f"Lauf später mit denselben Optionen erneut starten"
             )
-
-            try:
-                rendered = template_engine.render(
-                    company_id=assignment.company_id,
-                    segment_id=assignment.segment_id,
-                    lead=lead_dict,
-                    icebreaker=icebreaker,
-                    pdf_link=link,
-                    sender_name=sender_name,
-                    env=env,
-                )
-            except Exception as e:
-                logger.error(
-                    f"Template-Fehler für {lead_dict.get('email', '?')} "
-                    f"({assignment.company_id}/{assignment.segment_id}): {e}"
-                )
+            return
+        finally:
+            journal.close()
+            if batch_icebreakers is None and response_cache is not None:
+                response_cache.close()
+
+    # Ausgabezeilen in Eingabereihenfolge, gefüllt sobald ein Icebreaker fertig ist
+    rows: list[dict | None] = [None] * len(assignments)
+
+    def emit(ready: list[tuple[int, str]]) -> None:
+        """Rendert fertige Icebreaker und legt die Ausgabezeilen ab."""
+        jobs = []
+        for index, icebreaker in ready:
+            assignment = assignments[index]
+            jobs.append(template_engine.RenderJob(
+                company_id=assignment.company_id,
+                segment_id=assignment.segment_id,
+                lead=assignment.lead.to_dict(),
+                icebreaker=icebreaker,
+                pdf_link=pdf_linker.lookup(
+                    assignment.company_id, assignment.segment_id, pdf_links, resolved_links
+                ),
+            ))
+
+        rendered_all = template_engine.render_many(jobs, sender_name, env)
+        for (index, _), job, rendered in zip(ready, jobs, rendered_all):
+            if rendered is None:
                 continue
-
-            row = build_output_row(
-                lead=lead_dict,
+            rows[index] = build_output_row(
+                lead=job.lead,
                 rendered_body=rendered.body,
                 subject_line=rendered.subject_line,
-                icebreaker=icebreaker,
-                pdf_link=link,
-                company_id=assignment.company_id,
-                segment_id=assignment.segment_id,
+                icebreaker=job.icebreaker,
+                pdf_link=job.pdf_link,
+                company_id=job.company_id,
+                segment_id=job.segment_id,
                 campaign_prefix=campaign_prefix,
             )
-            results.append(row)
+
+    if use_ai and batch_icebreakers is None:
+        asyncio.run(
+            generate_icebreakers(assignments, rules, config, response_cache, emit, batch_size)
+        )
+    else:
+        batches = chunked(assignments, batch_size)
+        offset = 0
+        for batch_idx, batch in enumerate(batches, 1):
+            click.echo(f"  Batch {batch_idx}/{len(batches)} ({len(batch)} Leads)...")
+            if batch_icebreakers is not None:
+                icebreakers = batch_icebreakers[offset : offset + len(batch)]
+            else:
+                icebreakers = ai_personalizer.fallback_batch(batch)
+            emit(list(enumerate(icebreakers, offset)))
+            offset += len(batch)
+
+    results = [row for row in rows if row is not None]
+
+    if response_cache is not None:
+        stats = response_cache.stats()
+        if stats["hits"] or stats["misses"]:
+            logger.info(
+                f"Antwort-Cache: {stats['hits']} Treffer, {stats['misses']} neu "
+                f"({stats['hit_rate']:.0%})"
+            )
+        response_cache.close()
 
     if not results:
         click.echo("⚠ Keine E-Mails generiert. Prüfe die Logs.")
@@ -208,7 +661,9 @@ def generate(input_path: str, no_ai: bool, company: str | None, config_path: str
     separator = config.get("instantly_csv_separator", ",")
     encoding = config.get("instantly_csv_encoding", "utf-8")
 
-    written_files = export(output_df, output_dir, separator, encoding)
+    written_files = export(output_df, output_dir, separator, encoding, suppression)
+    if suppression is not None:
+        suppression.close()
 
     # Zusammenfassung
     click.echo("")
@@ -235,32 +690,40 @@ def generate(input_path: str, no_ai: bool, company: str | None, config_path: str
     type=click.Path(exists=True),
     help="Pfad zur Konfigurationsdatei.",
 )
-def segment(input_path: str, config_path: str) -> None:
+@click.option(
+    "--profile",
+    is_flag=True,
+    default=False,
+    help="Auswertungen, Treffer und Zeit pro Regel messen (JSON-Report + Tabelle).",
+)
+def segment(input_path: str, config_path: str, profile: bool) -> None:
     """Nur Segmentierung anzeigen (ohne E-Mails zu generieren)."""
+    from generator.segment_profile import SegmentationProfile
+
     config = load_yaml(config_path)
-    setup_logging(config.get("log_level", "INFO"), config.get("output_directory", "./data/output"))
+    output_dir = config.get("output_directory", "./data/output")
+    setup_logging(config.get("log_level", "INFO"), output_dir)
 
-    leads_df = csv_reader.read_and_validate(input_path)
-    if config.get("duplicate_check", True):
-        leads_df = csv_reader.deduplicate(leads_df)
+    rules = load_rules(config)
+    segmentation_profile = SegmentationProfile() if profile else None
+    lead_count = 0
+    assignment_count = 0
+    stats: dict[str, dict[str, int]] = {}
+    blocks = iter_segmented(input_path, config, rules, profile=segmentation_profile)
+    for leads_df, assignments in blocks:
+        lead_count += len(leads_df)
+        assignment_count += len(assignments)
 
-    rules = load_yaml(config.get("segments_config", "./segments/rules.yaml"))
-    assignments = segmenter.assign_all(leads_df, rules)
+        # Pro Firma und Segment aufschlüsseln
+        for company_id, segment_id in zip(assignments.company_ids, assignments.segment_ids):
+            segments = stats.setdefault(company_id, {})
+            segments[segment_id] = segments.get(segment_id, 0) + 1
 
     click.echo(f"\n=== Segmentierungsergebnis ===")
-    click.echo(f"Leads geladen: {len(leads_df)}")
-    click.echo(f"Zuordnungen: {len(assignments)}")
+    click.echo(f"Leads geladen: {lead_count}")
+    click.echo(f"Zuordnungen: {assignment_count}")
     click.echo("")
 
-    # Pro Firma und Segment aufschlüsseln
-    stats: dict[str, dict[str, int]] = {}
-    for a in assignments:
-        if a.company_id not in stats:
-            stats[a.company_id] = {}
-        stats[a.company_id][a.segment_id] = (
-            stats[a.company_id].get(a.segment_id, 0) + 1
-        )
-
     for company_id, segments in sorted(stats.items()):
         total = sum(segments.values())
         click.echo(f"{company_id} ({total} Leads):")
@@ -268,6 +731,15 @@ def segment(input_path: str, config_path: str) -> None:
             click.echo(f"  → {segment_id}: {count}")
         click.echo("")
 
+    if segmentation_profile is not None:
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+        report_path = segmentation_profile.write_json(
+            Path(output_dir) / "logs" / f"{timestamp}_segment_profile.json"
+        )
+        click.echo("=== Profil (sortiert nach Zeit) ===")
+        click.echo(segmentation_profile.format_table())
+        click.echo(f"\nJSON-Report: {report_path}")
+
 
 @cli.command()
 @click.option(
@@ -290,14 +762,23 @@ def segment(input_path: str, config_path: str) -> None:
 )
 def preview(input_path: str, count: int, config_path: str) -> None:
     """Vorschau: Zeigt generierte E-Mails für die ersten N Leads."""
+    from generator import ai_personalizer, pdf_linker, segmenter, template_engine
+
     config = load_yaml(config_path)
     setup_logging("WARNING", config.get("output_directory", "./data/output"))
 
-    leads_df = csv_reader.read_and_validate(input_path)
-    rules = load_yaml(config.get("segments_config", "./segments/rules.yaml"))
-    assignments = segmenter.assign_all(leads_df, rules)
-
-    pdf_links = load_yaml(config.get("promo_materials_config", "./promo_materials/links.yaml"))
+    rules = load_rules(config)
+    tables: list[segmenter.AssignmentTable] = []
+    for _, block_assignments in iter_segmented(
+        input_path, config, rules, drop_duplicates=False
+    ):
+        tables.append(block_assignments[:count])
+        # Für die Vorschau reichen die ersten Blöcke
+        if sum(len(t) for t in tables) >= count:
+            break
+    assignments = segmenter.AssignmentTable.concat(tables)
+
+    pdf_links, resolved_links = load_links(config)
     env = template_engine.create_environment(
         config.get("templates_directory", "./templates")
     )
@@ -309,8 +790,8 @@ def preview(input_path: str, count: int, config_path: str) -> None:
 
     for i, (assignment, icebreaker) in enumerate(zip(preview_assignments, icebreakers), 1):
         lead_dict = assignment.lead.to_dict()
-        link = pdf_linker.resolve(
-            assignment.company_id, assignment.segment_id, pdf_links
+        link = pdf_linker.lookup(
+            assignment.company_id, assignment.segment_id, pdf_links, resolved_links
         )
 
         rendered = template_engine.render(
@@ -362,13 +843,19 @@ def stats(output: str) -> None:
 
     total_leads = 0
     for csv_file in csv_files:
-        df = pd.read_csv(csv_file)
-        count = len(df)
+        count = _count_csv_rows(csv_file)
         total_leads += count
         click.echo(f"  {csv_file.name}: {count} Leads")
 
     click.echo(f"\nGesamt: {total_leads} Leads in {len(csv_files)} Dateien")
 
 
+def _count_csv_rows(path: Path) -> int:
+    """Zählt Datenzeilen einer Export-CSV (mehrzeilige Felder korrekt, ohne pandas)."""
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = sum(1 for row in csv.reader(f) if row)
+    return max(rows - 1, 0)
+
+
 if __name__ == "__main__":
     cli()
@@ -1,6 +1,9 @@
 """Gemeinsame Fixtures für alle Tests."""
 
+import asyncio
+import shutil
 from pathlib import Path
+from types import SimpleNamespace
 
 import pandas as pd
 import pytest
@@ -48,6 +51,16 @@ def sample_leads_df(sample_csv_path: Path) -> pd.DataFrame:
     return pd.read_csv(sample_csv_path, dtype=str).fillna("")
 
 
+@pytest.fixture
+def project_templates(tmp_path: Path) -> Path:
+    """Kopie der Projekt-Templates (Bytecode-Cache landet nicht im Repo)."""
+    target = tmp_path / "templates"
+    shutil.copytree(
+        PROJECT_ROOT / "templates", target, ignore=shutil.ignore_patterns("__compiled__")
+    )
+    return target
+
+
 @pytest.fixture
 def segmentation_rules() -> dict:
     """Geladene Segmentierungsregeln."""
@@ -70,3 +83,146 @@ def config() -> dict:
     config_path = PROJECT_ROOT / "config.yaml"
     with open(config_path, encoding="utf-8") as f:
         return yaml.safe_load(f)
+
+
+class FakeAnthropic:
+    """Ersatz für `anthropic.AsyncAnthropic` ohne Netzwerk.
+
+    Zeichnet alle Anfragen in `calls` auf. `respond(request)` liefert den
+    Antworttext oder eine Exception, die geworfen wird, `latency(request)`
+    die simulierte Antwortzeit in Sekunden und `headers(request)` die
+    Antwort-Header (für `with_raw_response`).
+
+    System-Blöcke mit `cache_control` simulieren den Prompt-Cache: der erste
+    Aufruf mit einem Prefix schreibt ihn (`cache_creation_input_tokens`),
+    spätere lesen ihn (`cache_read_input_tokens`), je 1 Token pro 4 Zeichen.
+
+    Enthält außerdem einen lokalen Message-Batches-Endpunkt: eingereichte
+    Batches landen in `batches` und sind nach `polls_until_ended` Abfragen
+    per `retrieve` beendet.
+    """
+
+    def __init__(self) -> None:
+        self.calls: list[dict] = []
+        self.respond = lambda request: "wir kennen die Anforderungen Ihrer Branche."
+        self.latency = lambda request: 0.0
+        self.headers = lambda request: {}
+        self.active = 0
+        self.max_active = 0
+        self.batches: dict[str, list[dict]] = {}
+        self.polls: dict[str, int] = {}
+        self.polls_until_ended = 2
+        self.prompt_cache: set[tuple[str, ...]] = set()
+        self.messages = SimpleNamespace(
+            create=self._create,
+            with_raw_response=SimpleNamespace(create=self._create_raw),
+            batches=SimpleNamespace(
+                create=self._create_batch,
+                retrieve=self._retrieve_batch,
+                results=self._batch_results,
+            ),
+        )
+
+    async def close(self) -> None:
+        self.closed = True
+
+    @staticmethod
+    def connection_error() -> Exception:
+        """API-Fehler ohne HTTP-Antwort (Netzwerk)."""
+        import anthropic
+
+        return anthropic.APIConnectionError(request=None)
+
+    @staticmethod
+    def rate_limit_error(headers: dict | None = None) -> Exception:
+        """HTTP 429 mit optionalen Rate-Limit-Headern."""
+        import anthropic
+
+        response = SimpleNamespace(status_code=429, headers=headers or {}, request=None)
+        return anthropic.RateLimitError("rate_limit_error", response=response, body=None)
+
+    async def _create(self, **request) -> SimpleNamespace:
+        self.calls.append(request)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.latency(request))
+        finally:
+            self.active -= 1
+        result = self.respond(request)
+        if isinstance(result, BaseException):
+            raise result
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text=result)],
+            usage=self._usage(request),
+        )
+
+    def _usage(self, request: dict) -> SimpleNamespace:
+        usage = SimpleNamespace(
+            input_tokens=100, output_tokens=30,
+            cache_read_input_tokens=0, cache_creation_input_tokens=0,
+        )
+        prefix: tuple[str, ...] = ()
+        pending = 0
+        for block in request.get("system") or []:
+            prefix += (block["text"],)
+            pending += len(block["text"]) // 4
+            if "cache_control" not in block:
+                continue
+            if prefix in self.prompt_cache:
+                usage.cache_read_input_tokens += pending
+            else:
+                self.prompt_cache.add(prefix)
+                usage.cache_creation_input_tokens += pending
+            pending = 0
+        usage.input_tokens += pending
+        return usage
+
+    async def _create_raw(self, **request) -> SimpleNamespace:
+        message = await self._create(**request)
+
+        async def parse() -> SimpleNamespace:
+            return message
+
+        return SimpleNamespace(headers=self.headers(request), parse=parse)
+
+    async def _create_batch(self, requests: list[dict]) -> SimpleNamespace:
+        batch_id = f"msgbatch_{len(self.batches) + 1:04d}"
+        self.batches[batch_id] = requests
+        self.polls[batch_id] = 0
+        return SimpleNamespace(id=batch_id, processing_status="in_progress")
+
+    async def _retrieve_batch(self, batch_id: str) -> SimpleNamespace:
+        self.polls[batch_id] += 1
+        ended = self.polls[batch_id] >= self.polls_until_ended
+        return SimpleNamespace(
+            id=batch_id, processing_status="ended" if ended else "in_progress"
+        )
+
+    async def _batch_results(self, batch_id: str):
+        entries = []
+        for request in self.batches[batch_id]:
+            result = self.respond(request["params"])
+            if isinstance(result, BaseException):
+                outcome = SimpleNamespace(type="errored", error=str(result))
+            else:
+                message = SimpleNamespace(content=[SimpleNamespace(type="text", text=result)])
+                outcome = SimpleNamespace(type="succeeded", message=message)
+            entries.append(SimpleNamespace(custom_id=request["custom_id"], result=outcome))
+
+        async def iterate():
+            for entry in entries:
+                yield entry
+
+        return iterate()
+
+
+@pytest.fixture
+def fake_anthropic(monkeypatch: pytest.MonkeyPatch) -> FakeAnthropic:
+    """Ersetzt den Claude-Client durch einen `FakeAnthropic`."""
+    import anthropic
+
+    fake = FakeAnthropic()
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setattr(anthropic, "AsyncAnthropic", lambda **kwargs: fake)
+    return fake
@@ -0,0 +1,125 @@
+"""Tests für generator/ai_batch.py (gegen den Fake-Batches-Endpunkt)."""
+
+import asyncio
+import re
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from generator.ai_batch import BatchJournal, BatchPending, generate_all
+from generator.ai_personalizer import fallback_single
+from generator.response_cache import ResponseCache
+from generator.segmenter import Assignment
+
+CONFIG = {
+    "ai_batch_max_requests": 2,
+    "ai_batch_poll_seconds": 0,
+    "ai_batch_poll_max_seconds": 0,
+}
+
+
+def make_assignments(count: int) -> list[Assignment]:
+    """Assignments mit unterschiedlichen Leads (= unterschiedlichen Prompts)."""
+    return [
+        Assignment(
+            lead=pd.Series({
+                "first_name": f"Lead{i}",
+                "email": f"lead{i}@test.de",
+                "title": "Geschäftsführer",
+                "company_name": f"Firma {i} GmbH",
+            }),
+            company_id="seehafer_elemente",
+            segment_id="hausverwaltung",
+            match_score=1.0,
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def journal(tmp_path: Path) -> BatchJournal:
+    """Leeres Batch-Journal."""
+    return BatchJournal(tmp_path / "ai_batches.sqlite3")
+
+
+class TestGenerateAll:
+    """Tests für die Generierung über Message Batches."""
+
+    def test_maps_results_by_custom_id(
+        self, fake_anthropic, journal: BatchJournal, segmentation_rules: dict
+    ) -> None:
+        """Ergebnisse kommen in Eingabereihenfolge zurück, aufgeteilt in Batches."""
+        fake_anthropic.respond = lambda params: re.search(
+            r"- Firma: (.*)", params["messages"][0]["content"]
+        ).group(1)
+        assignments = make_assignments(5)
+
+        result = asyncio.run(generate_all(assignments, segmentation_rules, CONFIG, journal))
+
+        assert len(fake_anthropic.batches) == 3
+        assert result == [f"Firma {i} GmbH" for i in range(5)]
+        for batch in fake_anthropic.batches.values():
+            for request in batch:
+                assert len(request["custom_id"]) <= 64
+
+    def test_duplicate_prompts_submitted_once(
+        self, fake_anthropic, journal: BatchJournal, segmentation_rules: dict
+    ) -> None:
+        """Identische Prompts landen nur einmal im Batch."""
+        assignments = make_assignments(1) * 3
+
+        result = asyncio.run(generate_all(assignments, segmentation_rules, CONFIG, journal))
+
+        assert sum(len(b) for b in fake_anthropic.batches.values()) == 1
+        assert len(result) == 3
+
+    def test_errored_requests_fall_back(
+        self, fake_anthropic, journal: BatchJournal, segmentation_rules: dict
+    ) -> None:
+        """Fehlgeschlagene Batch-Anfragen liefern den Fallback-Icebreaker."""
+        fake_anthropic.respond = lambda params: RuntimeError("overloaded")
+        assignments = make_assignments(2)
+
+        result = asyncio.run(generate_all(assignments, segmentation_rules, CONFIG, journal))
+
+        assert result == [fallback_single(a) for a in assignments]
+
+    def test_resume_after_timeout(
+        self, fake_anthropic, tmp_path: Path, segmentation_rules: dict
+    ) -> None:
+        """Nach Abbruch setzt ein neuer Lauf die laufenden Batches fort."""
+        assignments = make_assignments(3)
+        fake_anthropic.polls_until_ended = 3
+        config = {**CONFIG, "ai_batch_poll_seconds": 60, "ai_batch_max_wait_minutes": 1}
+
+        first = BatchJournal(tmp_path / "ai_batches.sqlite3")
+        with pytest.raises(BatchPending) as exc_info:
+            asyncio.run(generate_all(assignments, segmentation_rules, config, first))
+        first.close()
+        assert len(exc_info.value.batch_ids) == 2
+
+        resumed = BatchJournal(tmp_path / "ai_batches.sqlite3")
+        result = asyncio.run(generate_all(assignments, segmentation_rules, CONFIG, resumed))
+
+        assert len(fake_anthropic.batches) == 2
+        assert len(result) == 3
+
+        # Dritter Lauf: alles aus dem Journal, kein Abruf mehr
+        polls = dict(fake_anthropic.polls)
+        again = asyncio.run(generate_all(assignments, segmentation_rules, CONFIG, resumed))
+        assert again == result
+        assert fake_anthropic.polls == polls
+
+    def test_results_fill_response_cache(
+        self, fake_anthropic, journal: BatchJournal, segmentation_rules: dict, tmp_path: Path
+    ) -> None:
+        """Erfolgreiche Ergebnisse landen im Antwort-Cache."""
+        cache = ResponseCache(tmp_path / "icebreakers.sqlite3")
+        assignments = make_assignments(2)
+
+        asyncio.run(generate_all(assignments, segmentation_rules, CONFIG, journal, cache))
+        asyncio.run(generate_all(assignments, segmentation_rules, CONFIG, journal, cache))
+
+        assert len(fake_anthropic.batches) == 1
+        assert cache.stats()["hits"] == 2
@@ -0,0 +1,174 @@
+"""Tests für generator/ai_clusters.py."""
+
+import asyncio
+
+import pandas as pd
+
+from generator.ai_clusters import personalize, plan_clusters, signature, signature_fields
+from generator.ai_personalizer import IcebreakerGenerator, build_cluster_prompt
+from generator.segmenter import Assignment
+
+FIELDS = ["title", "industry", "city"]
+
+
+def make_lead(i: int, title: str = "Facility Manager", **fields) -> Assignment:
+    """Assignment mit eigenem Namen und gemeinsamen Signaturfeldern."""
+    lead = {
+        "first_name": f"Lead{i}",
+        "last_name": "Muster",
+        "email": f"lead{i}@firma{i}.de",
+        "company_name": f"Firma {i} GmbH",
+        "title": title,
+        "industry": "Real Estate",
+        "city": "Hamburg",
+        **fields,
+    }
+    return Assignment(
+        lead=pd.Series(lead),
+        company_id="seehafer_elemente",
+        segment_id="hausverwaltung",
+        match_score=1.0,
+    )
+
+
+class TestPlanClusters:
+    """Tests für die Cluster-Aufteilung."""
+
+    def test_signature_ignores_name_and_normalizes(self) -> None:
+        """Name und E-Mail zählen nicht, Groß-/Kleinschreibung und Leerzeichen auch nicht."""
+        a = make_lead(1)
+        b = make_lead(2, title="  facility   MANAGER ")
+
+        assert signature(a, FIELDS) == signature(b, FIELDS)
+        assert signature(a, FIELDS) != signature(make_lead(3, city="Kiel"), FIELDS)
+
+    def test_personal_fields_are_dropped(self) -> None:
+        """Personenbezogene Felder landen nie in der Signatur."""
+        assert signature_fields(["title", "email", "company_name", "city"]) == ["title", "city"]
+
+    def test_small_clusters_are_generated_individually(self) -> None:
+        """Signaturen unter min_size bekommen keinen Cluster."""
+        assignments = [make_lead(0), make_lead(1), make_lead(2, city="Kiel")]
+
+        slots, clusters = plan_clusters(assignments, FIELDS, min_size=2)
+
+        assert slots[2] is None
+        assert slots[0].cluster is slots[1].cluster
+        assert [(c.size, c.served) for c in clusters] == [(2, 2)]
+        assert clusters[0].representative is assignments[0]
+
+    def test_variants_round_robin_with_cap(self) -> None:
+        """Varianten reihum; über der Obergrenze wird einzeln generiert."""
+        assignments = [make_lead(i) for i in range(7)]
+
+        slots, (cluster,) = plan_clusters(
+            assignments, FIELDS, max_variants=2, max_per_variant=3
+        )
+
+        assert [s.variant if s else None for s in slots] == [0, 1, 0, 1, 0, 1, None]
+        assert (cluster.variants, cluster.served, cluster.individual) == (2, 6, 1)
+
+    def test_cap_limits_variants_to_cluster_size(self) -> None:
+        """Kleine Cluster bekommen nicht mehr Varianten als nötig."""
+        slots, (cluster,) = plan_clusters(
+            [make_lead(i) for i in range(3)], FIELDS, max_variants=5, max_per_variant=2
+        )
+
+        assert cluster.variants == 2
+        assert all(s is not None for s in slots)
+
+    def test_personalize_replaces_placeholders(self) -> None:
+        """Platzhalter werden durch Lead-Felder ersetzt, andere Klammern bleiben."""
+        lead = make_lead(4).lead
+
+        text = personalize("bei {company_name} und {first_name} {unbekannt}", lead)
+
+        assert text == "bei Firma 4 GmbH und Lead4 {unbekannt}"
+
+
+class TestClusterGeneration:
+    """Tests für Cluster-Icebreaker im Generator (mit Fake-Client)."""
+
+    CONFIG = {
+        "ai_max_retries": 1,
+        "ai_rate_limit_delay_seconds": 0,
+        "ai_cluster_signature": FIELDS,
+        "ai_cluster_variants": 2,
+    }
+
+    def test_cluster_prompt_is_name_free(self, segmentation_rules: dict) -> None:
+        """Der Cluster-Prompt enthält Signaturfelder, aber keine personenbezogenen Daten."""
+        prompt = build_cluster_prompt(make_lead(1), segmentation_rules, FIELDS, variant=1)
+
+        assert "Facility Manager" in prompt.lead
+        assert "Variante: 2" in prompt.lead
+        assert "Seehafer Elemente" in prompt.company
+        for value in ("Lead1", "Muster", "lead1@", "Firma 1 GmbH"):
+            assert value not in prompt.text()
+
+    def test_one_call_per_variant(self, fake_anthropic, segmentation_rules: dict) -> None:
+        """Ein Call pro Variante, lokal personalisiert; Einzelleads normal generiert."""
+        def respond(request: dict) -> str:
+            content = request["messages"][0]["content"]
+            if "Variante: " not in content:
+                return "einzeln."
+            return f"V{content.rsplit('Variante: ', 1)[1]} bei {{company_name}}."
+
+        fake_anthropic.respond = respond
+        assignments = [make_lead(i) for i in range(4)] + [make_lead(9, city="Kiel")]
+
+        async def run() -> tuple[list[str], IcebreakerGenerator]:
+            generator = IcebreakerGenerator(segmentation_rules, self.CONFIG)
+            return await generator.generate_many(assignments), generator
+
+        texts, generator = asyncio.run(run())
+
+        assert texts == [
+            "V1 bei Firma 0 GmbH.", "V2 bei Firma 1 GmbH.",
+            "V1 bei Firma 2 GmbH.", "V2 bei Firma 3 GmbH.", "einzeln.",
+        ]
+        assert len(fake_anthropic.calls) == 3
+        assert generator.stats()["cluster_leads"] == 4
+
+    def test_case_variants_share_one_prompt(
+        self, fake_anthropic, segmentation_rules: dict
+    ) -> None:
+        """Schreibvarianten derselben Signatur teilen Prompt, Cache-Key und Call."""
+        fake_anthropic.respond = lambda r: "gemeinsam bei {company_name}."
+        titles = ["Facility Manager", "facility manager", "FACILITY MANAGER", "Facility  Manager"]
+        assignments = [make_lead(i, title=title) for i, title in enumerate(titles)]
+        config = {**self.CONFIG, "ai_cluster_variants": 1}
+
+        async def run() -> tuple[list[str], IcebreakerGenerator]:
+            generator = IcebreakerGenerator(segmentation_rules, config)
+            return await generator.generate_many(assignments), generator
+
+        texts, generator = asyncio.run(run())
+
+        assert texts == [f"gemeinsam bei Firma {i} GmbH." for i in range(4)]
+        assert len(fake_anthropic.calls) == 1
+        assert "Facility Manager" in fake_anthropic.calls[0]["messages"][0]["content"]
+        assert generator.stats()["cluster_leads"] == 4
+
+    def test_invalid_cluster_text_falls_back_to_individual(
+        self, fake_anthropic, segmentation_rules: dict
+    ) -> None:
+        """Verstößt der personalisierte Text gegen die Regeln, wird einzeln generiert."""
+        def respond(request: dict) -> str:
+            content = request["messages"][0]["content"]
+            if "Variante: " in content:
+                return "kennen Sie {company_name}?"
+            return "einzeln."
+
+        fake_anthropic.respond = respond
+        config = {**self.CONFIG, "ai_cluster_variants": 1}
+
+        async def run() -> tuple[list[str], IcebreakerGenerator]:
+            generator = IcebreakerGenerator(segmentation_rules, config)
+            return await generator.generate_many([make_lead(0), make_lead(1)]), generator
+
+        texts, generator = asyncio.run(run())
+
+        assert texts == ["einzeln.", "einzeln."]
+        assert generator.clusters[0].rejected == 2
+        assert generator.stats()["cluster_leads"] == 0
@@ -1,14 +1,29 @@
 """Tests für generator/ai_personalizer.py."""
 
+import asyncio
+import json
+import re
+import sqlite3
+import time
+from pathlib import Path
+
 import pandas as pd
 import pytest
 
 from generator.ai_personalizer import (
     build_prompt,
+    build_lead_request,
+    build_pack_request,
+    build_prompt_parts,
+    build_request,
+    parse_pack,
     fallback_batch,
     fallback_single,
+    generate_batch,
+    IcebreakerGenerator,
     FALLBACK_ICEBREAKERS,
 )
+from generator.response_cache import ResponseCache
 from generator.segmenter import Assignment
 
 
@@ -63,6 +78,99 @@ class TestBuildPrompt:
         assert "Deutsch" in prompt
         assert "maximal 2 Sätze" in prompt
 
+    def test_prompt_parts_separate_static_company_and_lead(
+        self, sample_assignment: Assignment, segmentation_rules: dict
+    ) -> None:
+        """Anweisungen sind für alle Leads gleich, der Firmen-Prefix pro Firma."""
+        other = Assignment(
+            lead=pd.Series({"first_name": "Anna", "company_name": "XYZ GmbH"}),
+            company_id="brink_tischlerei",
+            segment_id="hausverwaltung",
+            match_score=1.0,
+        )
+
+        parts = build_prompt_parts(sample_assignment, segmentation_rules)
+        other_parts = build_prompt_parts(other, segmentation_rules)
+
+        assert parts.instructions == other_parts.instructions
+        assert "Seehafer Elemente" in parts.company
+        assert "Karl Brink Tischlereibetrieb" in other_parts.company
+        assert "Müller" in parts.lead and "Müller" not in parts.company + parts.instructions
+        assert parts.text() == build_prompt(sample_assignment, segmentation_rules)
+
+    @pytest.mark.parametrize("caching", [True, False])
+    def test_request_uses_cached_system_blocks(
+        self, sample_assignment: Assignment, segmentation_rules: dict, caching: bool
+    ) -> None:
+        """Anweisungen und Firmen-Prefix gehen als System-Blöcke mit cache_control raus."""
+        parts = build_prompt_parts(sample_assignment, segmentation_rules)
+
+        request = build_request(parts, {"ai_prompt_caching": caching})
+
+        assert [block["text"] for block in request["system"]] == [parts.instructions, parts.company]
+        assert all(("cache_control" in block) == caching for block in request["system"])
+        assert request["messages"] == [{"role": "user", "content": parts.lead}]
+
+
+class TestPackRequests:
+    """Tests für Paketanfragen (mehrere Leads, JSON-Antwort)."""
+
+    def test_pack_request_lists_numbered_leads(
+        self, sample_assignment: Assignment, segmentation_rules: dict
+    ) -> None:
+        """Gleiche System-Blöcke wie eine Einzelanfrage, Leads nummeriert in einer Nachricht."""
+        prompts = [build_prompt_parts(a, segmentation_rules) for a in make_assignments(3)]
+        config = {"ai_max_tokens": 150}
+
+        request = build_pack_request(prompts, config)
+
+        assert request["system"] == build_request(prompts[0], config)["system"]
+        assert request["max_tokens"] == 450
+        content = request["messages"][0]["content"]
+        assert "JSON" in content
+        assert content.index("ID 1\n") < content.index("Lead0") < content.index("ID 2\n")
+
+    def test_lead_request_lists_companies_once_per_lead(
+        self, sample_assignment: Assignment, segmentation_rules: dict
+    ) -> None:
+        """Lead-Daten einmal, jede Firma mit Kernleistung nummeriert."""
+        other = Assignment(
+            lead=sample_assignment.lead,
+            company_id="brink_tischlerei",
+            segment_id="hausverwaltung",
+            match_score=1.0,
+        )
+        prompts = [build_prompt_parts(a, segmentation_rules) for a in (sample_assignment, other)]
+
+        request = build_lead_request(prompts, {"ai_max_tokens": 150})
+
+        content = request["messages"][0]["content"]
+        assert [block["text"] for block in request["system"]] == [prompts[0].instructions]
+        assert request["max_tokens"] == 300
+        assert content.count("Müller") == 1
+        assert content.index("ID 1\n") < content.index("Seehafer Elemente")
+        assert content.index("ID 2\n") < content.index("Karl Brink Tischlereibetrieb")
+
+    def test_parse_pack_keeps_valid_entries(self) -> None:
+        """Zu lange, fragende, doppelte und unbekannte Einträge werden verworfen."""
+        entries = [
+            {"id": "1", "icebreaker": " gut. "},
+            {"id": "2", "icebreaker": "x" * 201},
+            {"id": "3", "icebreaker": "kennen Sie das?"},
+            {"id": "4", "icebreaker": "erst."},
+            {"id": "4", "icebreaker": "doppelt."},
+            {"id": "9", "icebreaker": "unbekannt."},
+            {"id": 5, "icebreaker": "Zahl als ID."},
+        ]
+        text = "Hier die Icebreaker:\n" + json.dumps(entries) + "\nViel Erfolg!"
+
+        assert parse_pack(text, 5) == {"1": "gut.", "5": "Zahl als ID."}
+
+    @pytest.mark.parametrize("text", ["", "kein JSON", "[{", '{"id": "1"}'])
+    def test_parse_pack_tolerates_garbage(self, text: str) -> None:
+        """Unlesbare Antworten ergeben keine Einträge statt einer Exception."""
+        assert parse_pack(text, 2) == {}
+
 
 class TestFallbackIcebreaker:
     """Tests für die Fallback-Icebreaker."""
@@ -121,3 +229,448 @@ class TestFallbackIcebreaker:
         expected_template = FALLBACK_ICEBREAKERS["hausverwaltung"]
         expected = expected_template.format(title="Manager", company_name="Test GmbH")
         assert result == expected
+
+
+class TestGenerateBatch:
+    """Tests für die Icebreaker-Generierung per API (mit Fake-Client)."""
+
+    CONFIG = {"ai_max_retries": 2, "ai_rate_limit_delay_seconds": 0}
+
+    def test_identical_prompts_request_once(
+        self, fake_anthropic, sample_assignment: Assignment, segmentation_rules: dict
+    ) -> None:
+        """Gleiche Prompts im selben Batch erzeugen nur einen API-Call."""
+        batch = [sample_assignment] * 3
+
+        result = asyncio.run(generate_batch(batch, segmentation_rules, self.CONFIG))
+
+        assert len(fake_anthropic.calls) == 1
+        assert len(set(result)) == 1
+
+    def test_cached_responses_skip_api(
+        self,
+        fake_anthropic,
+        sample_assignment: Assignment,
+        segmentation_rules: dict,
+        tmp_path: Path,
+    ) -> None:
+        """Ein zweiter Lauf mit demselben Cache ruft die API nicht erneut auf."""
+        cache = ResponseCache(tmp_path / "icebreakers.sqlite3")
+        first = asyncio.run(
+            generate_batch([sample_assignment], segmentation_rules, self.CONFIG, cache)
+        )
+        cache.close()
+
+        reopened = ResponseCache(tmp_path / "icebreakers.sqlite3")
+        second = asyncio.run(
+            generate_batch([sample_assignment], segmentation_rules, self.CONFIG, reopened)
+        )
+
+        assert second == first
+        assert len(fake_anthropic.calls) == 1
+        assert reopened.stats()["hits"] == 1
+
+    def test_failures_fall_back_and_are_not_cached(
+        self,
+        fake_anthropic,
+        sample_assignment: Assignment,
+        segmentation_rules: dict,
+        tmp_path: Path,
+    ) -> None:
+        """Fehlgeschlagene Anfragen liefern den Fallback und landen nicht im Cache."""
+        fake_anthropic.respond = lambda r: fake_anthropic.connection_error()
+        cache = ResponseCache(tmp_path / "icebreakers.sqlite3")
+
+        result = asyncio.run(
+            generate_batch([sample_assignment], segmentation_rules, self.CONFIG, cache)
+        )
+
+        assert result == [fallback_single(sample_assignment)]
+        assert len(fake_anthropic.calls) == 2
+        assert cache.stats()["misses"] == 1
+        with sqlite3.connect(tmp_path / "icebreakers.sqlite3") as conn:
+            assert conn.execute("SELECT COUNT(*) FROM responses").fetchone() == (0,)
+
+
+def make_assignments(count: int) -> list[Assignment]:
+    """Assignments mit unterschiedlichen Leads (= unterschiedlichen Prompts)."""
+    return [
+        Assignment(
+            lead=pd.Series({"first_name": f"Lead{i}", "company_name": f"Firma {i} GmbH"}),
+            company_id="seehafer_elemente",
+            segment_id="hausverwaltung",
+            match_score=1.0,
+        )
+        for i in range(count)
+    ]
+
+
+class TestIcebreakerGenerator:
+    """Tests für den langlebigen Generator (eine Event-Loop, ein Client)."""
+
+    CONFIG = {"ai_concurrency": 4, "ai_max_retries": 1, "ai_rate_limit_delay_seconds": 0}
+
+    def _collect(self, generator: IcebreakerGenerator, assignments, max_pending: int) -> list:
+        async def run() -> list:
+            chunks = []
+            async for ready in generator.stream(assignments, max_pending):
+                chunks.append(ready)
+            await generator.aclose()
+            return chunks
+
+        return asyncio.run(run())
+
+    @staticmethod
+    async def _drain(generator: IcebreakerGenerator, assignments) -> list:
+        """Holt alle Ergebnisse aus `stream` ab."""
+        chunks = []
+        try:
+            async for ready in generator.stream(assignments):
+                chunks.append(ready)
+        finally:
+            await generator.aclose()
+        return chunks
+
+    def test_stream_yields_in_completion_order(
+        self, fake_anthropic, segmentation_rules: dict
+    ) -> None:
+        """Ein langsamer Icebreaker hält die übrigen nicht auf."""
+        fake_anthropic.latency = lambda r: 0.2 if "Lead0 " in r["messages"][0]["content"] else 0.0
+        fake_anthropic.respond = lambda r: r["messages"][0]["content"].split("- Name: ")[1][:6]
+        assignments = make_assignments(6)
+
+        chunks = self._collect(
+            IcebreakerGenerator(segmentation_rules, self.CONFIG), assignments, 10
+        )
+        flat = [item for chunk in chunks for item in chunk]
+
+        assert flat[-1][0] == 0
+        assert sorted(flat) == [(i, f"Lead{i}") for i in range(6)]
+        assert fake_anthropic.closed
+
+    def test_stream_bounds_pending_work(
+        self, fake_anthropic, segmentation_rules: dict
+    ) -> None:
+        """Nie mehr als ai_concurrency gleichzeitige Calls, alle Assignments genau einmal."""
+        fake_anthropic.latency = lambda r: 0.001
+        assignments = make_assignments(40)
+
+        chunks = self._collect(
+            IcebreakerGenerator(segmentation_rules, self.CONFIG), assignments, 8
+        )
+
+        assert sorted(i for chunk in chunks for i, _ in chunk) == list(range(40))
+        assert fake_anthropic.max_active <= 4
+        assert all(len(chunk) <= 8 for chunk in chunks)
+
+    def test_stream_survives_unreadable_cache(
+        self, fake_anthropic, segmentation_rules: dict, tmp_path: Path
+    ) -> None:
+        """Schlägt der Cache-Vorabruf fehl, wird ohne Cache angefragt statt zu hängen."""
+        class BusyCache(ResponseCache):
+            def get_many(self, keys):
+                raise sqlite3.OperationalError("database is locked")
+
+        fake_anthropic.respond = lambda r: r["messages"][0]["content"].split("- Name: ")[1][:6]
+        generator = IcebreakerGenerator(
+            segmentation_rules, self.CONFIG, cache=BusyCache(tmp_path / "cache.sqlite3")
+        )
+
+        async def run() -> list:
+            return await asyncio.wait_for(self._drain(generator, make_assignments(3)), 5)
+
+        flat = [item for chunk in asyncio.run(run()) for item in chunk]
+        assert sorted(flat) == [(i, f"Lead{i}") for i in range(3)]
+
+    def test_stream_raises_feeder_errors(
+        self, fake_anthropic, segmentation_rules: dict
+    ) -> None:
+        """Ein Fehler beim Einplanen wird weitergereicht, statt ewig zu warten."""
+        generator = IcebreakerGenerator(segmentation_rules, self.CONFIG)
+
+        def broken_order(assignments):
+            raise RuntimeError("Reihenfolge kaputt")
+
+        generator._order = broken_order
+
+        async def run() -> list:
+            return await asyncio.wait_for(self._drain(generator, make_assignments(3)), 5)
+
+        with pytest.raises(RuntimeError, match="Reihenfolge kaputt"):
+            asyncio.run(run())
+
+    def test_shares_cache_across_batches(
+        self, fake_anthropic, segmentation_rules: dict, tmp_path: Path
+    ) -> None:
+        """Derselbe Generator fragt einen Prompt über Batch-Grenzen nur einmal an."""
+        assignments = make_assignments(3)
+
+        async def run() -> None:
+            generator = IcebreakerGenerator(segmentation_rules, self.CONFIG)
+            await generator.generate_many(assignments[:2])
+            await generator.generate_many(assignments[1:])
+            assert generator.requests == 3
+            assert generator.input_tokens == 300
+
+        asyncio.run(run())
+        assert len(fake_anthropic.calls) == 3
+
+    def test_requests_grouped_by_company(
+        self, fake_anthropic, segmentation_rules: dict
+    ) -> None:
+        """Gemischte Firmen werden gruppiert angefragt, Ergebnisse bleiben am Index."""
+        assignments = make_assignments(6)
+        for assignment in assignments[1::2]:
+            assignment.company_id = "brink_tischlerei"
+        fake_anthropic.respond = lambda r: r["messages"][0]["content"].split("- Name: ")[1][:6]
+        config = {**self.CONFIG, "ai_concurrency": 1}
+
+        async def run() -> tuple[list[str], dict]:
+            generator = IcebreakerGenerator(segmentation_rules, config)
+            texts = await generator.generate_many(assignments)
+            return texts, generator.stats()
+
+        texts, stats = asyncio.run(run())
+
+        prefixes = [call["system"][1]["text"] for call in fake_anthropic.calls]
+        assert prefixes == sorted(prefixes, key=prefixes.index)
+        assert len(set(prefixes)) == 2
+        assert texts == [f"Lead{i}" for i in range(6)]
+        assert stats["requests"] == 6
+        assert stats["cache_read_tokens"] > stats["cache_write_tokens"] > 0
+        assert 0 < stats["cache_hit_rate"] < 1
+        assert stats["latency_p95"] >= stats["latency_p50"] >= 0
+
+    def test_packs_leads_and_rerequests_invalid_entries(
+        self, fake_anthropic, segmentation_rules: dict
+    ) -> None:
+        """Ein Call pro Paket; ungültige Einträge werden einzeln nachgefordert."""
+        def respond(request: dict) -> str:
+            content = request["messages"][0]["content"]
+            names = re.findall(r"- Name: (Lead\d+)", content)
+            if not content.startswith("Schreibe"):
+                return f"einzeln {names[0]}."
+            return json.dumps([
+                {"id": str(n), "icebreaker": f"{name}?" if name == "Lead1" else f"{name}."}
+                for n, name in enumerate(names, 1)
+            ])
+
+        fake_anthropic.respond = respond
+        config = {**self.CONFIG, "ai_pack_size": 3, "ai_pack_linger_seconds": 0.01}
+
+        async def run() -> tuple[list[str], IcebreakerGenerator]:
+            generator = IcebreakerGenerator(segmentation_rules, config)
+            return await generator.generate_many(make_assignments(6)), generator
+
+        texts, generator = asyncio.run(run())
+
+        assert texts == ["Lead0.", "einzeln Lead1.", "Lead2.", "Lead3.", "Lead4.", "Lead5."]
+        assert generator.packs == 2
+        assert generator.pack_retries == 1
+        assert len(fake_anthropic.calls) == 3
+
+    def test_failed_pack_falls_back_per_lead(
+        self, fake_anthropic, segmentation_rules: dict
+    ) -> None:
+        """Scheitert ein Paket, landet jeder Lead einzeln beim Fallback; Paketgröße sinkt."""
+        fake_anthropic.respond = lambda r: fake_anthropic.connection_error()
+        assignments = make_assignments(4)
+        config = {**self.CONFIG, "ai_pack_size": 4}
+
+        async def run() -> tuple[list[str], IcebreakerGenerator]:
+            generator = IcebreakerGenerator(segmentation_rules, config)
+            return await generator.generate_many(assignments), generator
+
+        texts, generator = asyncio.run(run())
+
+        assert texts == fallback_batch(assignments)
+        assert generator.pack_size == 2
+        assert len(fake_anthropic.calls) == 1 + 4
+
+    def test_rate_limited_pack_is_retried_whole(
+        self, fake_anthropic, segmentation_rules: dict
+    ) -> None:
+        """Ein 429 schickt das Paket gesammelt erneut, ohne Aufteilen und ohne Verkleinern."""
+        def respond(request: dict) -> str:
+            if len(fake_anthropic.calls) == 1:
+                return fake_anthropic.rate_limit_error({"retry-after": "0"})
+            names = re.findall(r"- Name: (Lead\d+)", request["messages"][0]["content"])
+            return json.dumps([
+                {"id": str(n), "icebreaker": f"{name}."} for n, name in enumerate(names, 1)
+            ])
+
+        fake_anthropic.respond = respond
+        config = {**self.CONFIG, "ai_max_retries": 2, "ai_pack_size": 4}
+
+        async def run() -> tuple[list[str], IcebreakerGenerator]:
+            generator = IcebreakerGenerator(segmentation_rules, config)
+            return await generator.generate_many(make_assignments(4)), generator
+
+        texts, generator = asyncio.run(run())
+
+        assert texts == [f"Lead{i}." for i in range(4)]
+        assert len(fake_anthropic.calls) == 2
+        prompts = [call["messages"][0]["content"] for call in fake_anthropic.calls]
+        assert all(prompt.startswith("Schreibe") for prompt in prompts)
+        assert generator.pack_size == 4
+        assert generator.rate.rate_limited == 1
+
+    def test_group_by_lead_covers_all_companies_in_one_call(
+        self, fake_anthropic, segmentation_rules: dict
+    ) -> None:
+        """Ein Call pro Lead; Leads mit nur einer Firma gehen als Einzelanfrage."""
+        def respond(request: dict) -> str:
+            content = request["messages"][0]["content"]
+            if not content.startswith("Schreibe"):
+                return "einzeln."
+            firms = re.findall(r"Absender-Firma: (.*)", content)
+            name = re.search(r"- Name: (Lead\d+)", content).group(1)
+            return json.dumps([
+                {"id": str(n), "icebreaker": f"{name} {firm}."} for n, firm in enumerate(firms, 1)
+            ])
+
+        fake_anthropic.respond = respond
+        assignments = []
+        for company_id in ("seehafer_elemente", "brink_tischlerei"):
+            for assignment in make_assignments(3):
+                assignment.company_id = company_id
+                assignments.append(assignment)
+        assignments.pop()  # Lead2 nur bei seehafer_elemente
+        config = {**self.CONFIG, "ai_group_by_lead": True, "ai_pack_linger_seconds": 0.01}
+
+        async def run() -> list[str]:
+            generator = IcebreakerGenerator(segmentation_rules, config)
+            return await generator.generate_many(assignments)
+
+        texts = asyncio.run(run())
+
+        assert texts == [
+            "Lead0 Seehafer Elemente.", "Lead1 Seehafer Elemente.", "einzeln.",
+            "Lead0 Karl Brink Tischlereibetrieb.", "Lead1 Karl Brink Tischlereibetrieb.",
+        ]
+        assert len(fake_anthropic.calls) == 3
+
+    def test_pack_size_adapts_to_failure_rate(self, segmentation_rules: dict) -> None:
+        """Halbieren bei hoher Fehlerquote, sonst +1 bis zum konfigurierten Maximum."""
+        generator = IcebreakerGenerator(
+            segmentation_rules, {"ai_pack_size": 8}, client=object()
+        )
+
+        generator._adapt_pack_size(0.5)
+        generator._adapt_pack_size(0.5)
+        assert generator.pack_size == 2
+        generator._adapt_pack_size(0.0)
+        assert generator.pack_size == 3
+        for _ in range(10):
+            generator._adapt_pack_size(0.05)
+        assert generator.pack_size == 8
+
+    def test_circuit_breaker_short_circuits_to_fallback(
+        self, fake_anthropic, segmentation_rules: dict
+    ) -> None:
+        """Bei dauerhaftem API-Ausfall gehen die übrigen Leads ohne Call in den Fallback."""
+        fake_anthropic.respond = lambda r: fake_anthropic.connection_error()
+        assignments = make_assignments(30)
+        config = {
+            **self.CONFIG,
+            "ai_concurrency": 1,
+            "ai_max_retries": 3,
+            "ai_breaker_window": 5,
+            "ai_breaker_min_requests": 5,
+            "ai_breaker_open_seconds": 60,
+        }
+
+        async def run() -> tuple[list[str], IcebreakerGenerator]:
+            generator = IcebreakerGenerator(segmentation_rules, config)
+            return await generator.generate_many(assignments), generator
+
+        texts, generator = asyncio.run(run())
+
+        assert texts == fallback_batch(assignments)
+        assert len(fake_anthropic.calls) == 5
+        stats = generator.breaker.stats()
+        assert stats["state"] == "open"
+        assert stats["opened"] == 1
+        assert stats["rejected"] >= 25
+
+    def test_rate_limits_feed_controller(
+        self, fake_anthropic, sample_assignment: Assignment, segmentation_rules: dict
+    ) -> None:
+        """429 und Rate-Limit-Header landen im gemeinsamen RateController."""
+        responses = iter([fake_anthropic.rate_limit_error({"retry-after": "0"}), "Icebreaker"])
+        fake_anthropic.respond = lambda r: next(responses)
+        fake_anthropic.headers = lambda r: {"anthropic-ratelimit-requests-limit": "4000"}
+        config = {**self.CONFIG, "ai_max_retries": 2}
+
+        async def run() -> tuple[str, IcebreakerGenerator]:
+            generator = IcebreakerGenerator(segmentation_rules, config)
+            return await generator.generate(sample_assignment), generator
+
+        text, generator = asyncio.run(run())
+
+        assert text == "Icebreaker"
+        assert generator.rate.rate_limited == 1
+        assert generator.rate.rpm_limit == 4000
+
+    def test_backoff_releases_slot(
+        self, fake_anthropic, segmentation_rules: dict
+    ) -> None:
+        """Gescriptete 429: verzögerte Wiederholungen schaffen mehr Requests/s als Warten im Slot."""
+        count, concurrency, latency, backoff = 24, 4, 0.005, 0.05
+        assignments = make_assignments(count)
+        config = {
+            "ai_concurrency": concurrency,
+            "ai_max_retries": 3,
+            "ai_rate_limit_delay_seconds": backoff,
+            "ai_retry_jitter": 0.0,
+            "ai_rpm_limit": 100_000,
+            "ai_tpm_limit": 100_000_000,
+        }
+
+        def script(attempts: dict):
+            def respond(request: dict):
+                prompt = request["messages"][0]["content"]
+                attempts[prompt] = attempts.get(prompt, 0) + 1
+                # Jede zweite Anfrage bekommt beim ersten Versuch ein 429
+                if attempts[prompt] == 1 and len(attempts) % 2:
+                    return fake_anthropic.rate_limit_error()
+                return "Icebreaker"
+            return respond
+
+        fake_anthropic.latency = lambda r: latency
+
+        # Bisheriges Verhalten: Backoff-Sleep innerhalb des belegten Slots
+        async def holding_slot() -> None:
+            import anthropic
+
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one(assignment: Assignment) -> None:
+                async with semaphore:
+                    for attempt in range(3):
+                        try:
+                            await fake_anthropic.messages.create(
+                                messages=[{"role": "user", "content": build_prompt(assignment, segmentation_rules)}]
+                            )
+                            return
+                        except anthropic.RateLimitError:
+                            await asyncio.sleep(backoff * (2 ** attempt))
+
+            await asyncio.gather(*(one(a) for a in assignments))
+
+        async def deferred() -> list[str]:
+            generator = IcebreakerGenerator(segmentation_rules, config)
+            return await generator.generate_many(assignments)
+
+        fake_anthropic.respond = script({})
+        started = time.perf_counter()
+        asyncio.run(holding_slot())
+        old_rate = count / (time.perf_counter() - started)
+
+        fake_anthropic.respond = script({})
+        started = time.perf_counter()
+        results = asyncio.run(deferred())
+        new_rate = count / (time.perf_counter() - started)
+
+        assert results == ["Icebreaker"] * count
+        assert new_rate > 1.5 * old_rate
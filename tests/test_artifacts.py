@@ -0,0 +1,160 @@
+"""Tests für generator/artifacts.py."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from generator import artifacts
+from generator.artifacts import (
+    COMPILED_DIRNAME,
+    cached_artifact,
+    load_links,
+    load_rules,
+    load_yaml_cached,
+)
+from generator.segmenter import CompiledRules
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+class TestCachedArtifact:
+    """Tests für Gültigkeit und Wiederverwendung der Artefakte."""
+
+    def test_warm_start_skips_build(self, tmp_path: Path) -> None:
+        """Unveränderte Quelle wird nicht erneut verarbeitet."""
+        source = tmp_path / "config.yaml"
+        source.write_text("a: 1\n", encoding="utf-8")
+        builds = []
+
+        def build(contents: list[bytes]) -> bytes:
+            builds.append(1)
+            return contents[0]
+
+        assert cached_artifact([source], "raw", build) == b"a: 1\n"
+        assert cached_artifact([source], "raw", build) == b"a: 1\n"
+        assert len(builds) == 1
+        assert (tmp_path / COMPILED_DIRNAME / "config.yaml.raw.pkl").exists()
+
+    def test_changed_content_rebuilds(self, tmp_path: Path) -> None:
+        """Geänderter Inhalt erzeugt ein neues Artefakt."""
+        source = tmp_path / "config.yaml"
+        source.write_text("a: 1\n", encoding="utf-8")
+        assert load_yaml_cached(source) == {"a": 1}
+
+        source.write_text("a: 22\n", encoding="utf-8")
+        assert load_yaml_cached(source) == {"a": 22}
+
+    def test_touched_file_reuses_artifact(self, tmp_path: Path) -> None:
+        """Neue mtime bei gleichem Inhalt baut nicht neu."""
+        source = tmp_path / "config.yaml"
+        source.write_text("a: 1\n", encoding="utf-8")
+        builds = []
+
+        def build(contents: list[bytes]) -> int:
+            builds.append(1)
+            return len(builds)
+
+        cached_artifact([source], "count", build)
+        stat = source.stat()
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        assert cached_artifact([source], "count", build) == 1
+        assert len(builds) == 1
+
+    def test_corrupt_artifact_is_rebuilt(self, tmp_path: Path) -> None:
+        """Ein defektes Artefakt wird ignoriert und überschrieben."""
+        source = tmp_path / "config.yaml"
+        source.write_text("a: 1\n", encoding="utf-8")
+        artifact = tmp_path / COMPILED_DIRNAME / "config.yaml.yaml.pkl"
+        artifact.parent.mkdir()
+        artifact.write_bytes(b"kaputt")
+
+        assert load_yaml_cached(source) == {"a": 1}
+
+    def test_code_change_rebuilds(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Geänderte Modul-Quelltexte (andere Version) verwerfen alte Artefakte."""
+        source = tmp_path / "config.yaml"
+        source.write_text("a: 1\n", encoding="utf-8")
+        builds = []
+
+        def build(contents: list[bytes]) -> int:
+            builds.append(1)
+            return len(builds)
+
+        assert cached_artifact([source], "count", build) == 1
+        monkeypatch.setattr(artifacts, "artifact_version", lambda: "1-geaendert")
+        assert cached_artifact([source], "count", build) == 2
+
+    def test_version_includes_code_fingerprint(self) -> None:
+        """Die Version enthält einen Hash über die gepickelten Module."""
+        assert artifacts.artifact_version().startswith(f"{artifacts.ARTIFACT_VERSION}-")
+        for name in artifacts.CODE_MODULES:
+            assert (PROJECT_ROOT / "generator" / name).exists()
+
+    def test_unknown_class_in_artifact_is_rebuilt(self, tmp_path: Path) -> None:
+        """Ein Pickle mit nicht mehr existierender Klasse wird neu gebaut."""
+        source = tmp_path / "config.yaml"
+        source.write_text("a: 1\n", encoding="utf-8")
+        artifact = tmp_path / COMPILED_DIRNAME / "config.yaml.yaml.pkl"
+        artifact.parent.mkdir()
+        artifact.write_bytes(b"cgenerator.segmenter\nGibtEsNicht\n.")
+
+        assert load_yaml_cached(source) == {"a": 1}
+
+    def test_missing_file_raises(self, tmp_path: Path) -> None:
+        """Fehlende Datei ergibt FileNotFoundError."""
+        with pytest.raises(FileNotFoundError, match="nicht gefunden"):
+            load_yaml_cached(tmp_path / "fehlt.yaml")
+
+    def test_unwritable_directory_still_loads(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Kann nicht geschrieben werden, wird ohne Cache weitergearbeitet."""
+        source = tmp_path / "config.yaml"
+        source.write_text("a: 1\n", encoding="utf-8")
+
+        def fail(*args, **kwargs):
+            raise PermissionError("schreibgeschützt")
+
+        monkeypatch.setattr(artifacts.pickle, "dump", fail)
+        assert load_yaml_cached(source) == {"a": 1}
+
+
+class TestRulesAndLinks:
+    """Tests für die vorkompilierten Regeln und Links."""
+
+    def test_load_rules_includes_compiled_matchers(self, tmp_path: Path) -> None:
+        """Regeln werden samt kompilierten Matchern geladen."""
+        rules_path = tmp_path / "rules.yaml"
+        rules_path.write_bytes((PROJECT_ROOT / "segments" / "rules.yaml").read_bytes())
+
+        rules, compiled = load_rules(rules_path)
+        warm_rules, warm_compiled = load_rules(rules_path)
+
+        assert isinstance(compiled, CompiledRules)
+        assert warm_rules == rules
+        assert warm_compiled.industry.names == compiled.industry.names
+
+    def test_load_links_resolves_combinations(self, tmp_path: Path) -> None:
+        """Links sind pro Firma/Segment vorab aufgelöst."""
+        links_path = tmp_path / "links.yaml"
+        links_path.write_text(
+            "firma:\n  default: https://x/default.pdf\n  gewerbe: https://x/gewerbe.pdf\n",
+            encoding="utf-8",
+        )
+        rules_path = tmp_path / "rules.yaml"
+        rules_path.write_text(
+            "segmentierung:\n  firma:\n    templates: [gewerbe, privat]\n"
+            "    default_template: privat\n",
+            encoding="utf-8",
+        )
+
+        links, resolved = load_links(links_path, rules_path)
+        assert links["firma"]["default"] == "https://x/default.pdf"
+        assert resolved == {
+            ("firma", "gewerbe"): "https://x/gewerbe.pdf",
+            ("firma", "privat"): "https://x/default.pdf",
+        }
@@ -12,6 +12,7 @@ from generator.csv_exporter import (
     split_by_campaign,
     validate_output,
 )
+from generator.suppression import BloomFilter, SuppressionIndex
 
 
 class TestBuildOutputRow:
@@ -149,6 +150,42 @@ class TestExport:
         assert exported_df.iloc[0]["email"] == "max@test.de"
         assert list(exported_df.columns) == INSTANTLY_COLUMNS
 
+    def test_updates_suppression_index(self, tmp_path: Path) -> None:
+        """Exportierte Adressen landen im Sperr-Index (global und pro Kampagne)."""
+        df = pd.DataFrame([{
+            "email": "max@test.de",
+            "personalization": "A" * 150,
+            "subject_line": "Betreff",
+            "campaign_id": "gruppenwerk_seehafer",
+        }])
+        index = SuppressionIndex(tmp_path / "suppression", bloom_capacity=1000)
+
+        export(df, tmp_path, suppression=index)
+        assert index.contains(["max@test.de"]).tolist() == [True]
+        assert index.contains(["max@test.de"], "gruppenwerk_seehafer").tolist() == [True]
+
+    def test_saves_bloom_filter_once(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Mehrere Kampagnen schreiben den Bloom-Filter nur einmal."""
+        df = pd.DataFrame([
+            {
+                "email": f"lead{i}@test.de",
+                "personalization": "A" * 150,
+                "subject_line": "Betreff",
+                "campaign_id": f"gruppenwerk_firma{i}",
+            }
+            for i in range(3)
+        ])
+        index = SuppressionIndex(tmp_path / "suppression", bloom_capacity=1000)
+        saves = []
+        monkeypatch.setattr(BloomFilter, "save", lambda self, path, generation: saves.append(1))
+
+        files = export(df, tmp_path, suppression=index)
+
+        assert len(files) == 3
+        assert len(saves) == 1
+
     def test_empty_dataframe_no_files(self, tmp_path: Path) -> None:
         """Leerer DataFrame erzeugt keine Dateien."""
         df = pd.DataFrame()
@@ -6,9 +6,12 @@ import pandas as pd
 import pytest
 
 from generator.csv_reader import (
+    CATEGORICAL_COLUMNS,
+    STRING_DTYPE,
     clean_data,
     deduplicate,
     read_and_validate,
+    read_in_chunks,
     validate_emails,
 )
 
@@ -59,6 +62,110 @@ class TestReadAndValidate:
         assert (df["email"] == "").sum() == 0
 
 
+class TestCsvEngines:
+    """Tests für Arrow- und pandas-Parser mit Spaltenprojektion."""
+
+    @pytest.fixture
+    def wide_csv_path(self, tmp_path: Path) -> Path:
+        """Apollo-ähnliche CSV mit Zusatzspalten, NA-Werten und Quotes."""
+        csv_path = tmp_path / "wide.csv"
+        csv_path.write_text(
+            "extra_1,first_name,last_name,email,title,company_name,industry,"
+            "city,extra_2\n"
+            "x,Max,Müller,max@test.de,\"Leiter, Technik\",ABC GmbH,Real Estate,"
+            "Hamburg,y\n"
+            "x,Anna,NA,anna@test.de,\"Facility\nManagerin\",B GmbH,,N/A,y\n"
+            "x,Tom,Test,kaputt,Manager,C GmbH,Construction,Kiel,y\n",
+            encoding="utf-8",
+        )
+        return csv_path
+
+    def test_engines_return_identical_frames(self, wide_csv_path: Path) -> None:
+        """Arrow- und pandas-Parser liefern denselben DataFrame."""
+        pytest.importorskip("pyarrow")
+        arrow_df = read_and_validate(wide_csv_path, engine="pyarrow")
+        pandas_df = read_and_validate(wide_csv_path, engine="pandas")
+        pd.testing.assert_frame_equal(arrow_df, pandas_df, check_like=True)
+        assert arrow_df.iloc[1]["title"] == "Facility\nManagerin"
+        assert arrow_df.iloc[1]["last_name"] == ""
+
+    @pytest.mark.parametrize("engine", ["pyarrow", "pandas"])
+    def test_reads_only_projected_columns(self, wide_csv_path: Path, engine: str) -> None:
+        """Nicht benötigte Spalten werden nicht eingelesen."""
+        df = read_and_validate(wide_csv_path, engine=engine, memory_map=False)
+        assert "extra_1" not in df.columns
+        assert "extra_2" not in df.columns
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 1000])
+    def test_chunked_engines_return_identical_frames(
+        self, wide_csv_path: Path, chunk_size: int
+    ) -> None:
+        """Blockweise liefern Arrow- und pandas-Parser dieselben Blöcke (inkl. Index)."""
+        pytest.importorskip("pyarrow")
+        arrow_chunks = list(read_in_chunks(wide_csv_path, chunk_size, engine="pyarrow"))
+        pandas_chunks = list(read_in_chunks(wide_csv_path, chunk_size, engine="pandas"))
+        assert len(arrow_chunks) == len(pandas_chunks)
+        for arrow_df, pandas_df in zip(arrow_chunks, pandas_chunks):
+            pd.testing.assert_frame_equal(arrow_df, pandas_df)
+
+    def test_raises_on_unknown_engine(self, sample_csv_path: Path) -> None:
+        """Wirft ValueError bei unbekannter Engine."""
+        with pytest.raises(ValueError, match="CSV-Engine"):
+            read_and_validate(sample_csv_path, engine="gibts_nicht")
+
+
+class TestReadInChunks:
+    """Tests für das blockweise Einlesen."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 1000])
+    def test_matches_full_read(self, sample_csv_path: Path, chunk_size: int) -> None:
+        """Blockweises Einlesen liefert dieselben Leads wie das Gesamt-Einlesen."""
+        expected = deduplicate(read_and_validate(sample_csv_path))
+        chunks = list(read_in_chunks(sample_csv_path, chunk_size))
+        result = pd.concat(chunks, ignore_index=True)
+        assert result["email"].tolist() == expected["email"].tolist()
+        assert all(len(chunk) <= chunk_size for chunk in chunks)
+
+    def test_deduplicates_across_chunks(self, tmp_path: Path) -> None:
+        """Duplikate in verschiedenen Blöcken werden erkannt."""
+        csv_path = tmp_path / "dupes.csv"
+        csv_path.write_text(
+            "first_name,last_name,email,title,company_name,industry\n"
+            "Max,Müller,max@test.de,Manager,Test GmbH,Real Estate\n"
+            "Anna,Schmidt,anna@test.de,Manager,Test GmbH,Real Estate\n"
+            "Maximilian,Müller,max@test.de,Manager,Test GmbH,Real Estate\n"
+        )
+
+        result = pd.concat(read_in_chunks(csv_path, 1), ignore_index=True)
+        assert result["email"].tolist() == ["max@test.de", "anna@test.de"]
+        assert result.iloc[0]["first_name"] == "Max"
+
+    def test_keeps_duplicates_when_disabled(self, tmp_path: Path) -> None:
+        """Ohne Deduplizierung bleiben doppelte E-Mails erhalten."""
+        csv_path = tmp_path / "dupes.csv"
+        csv_path.write_text(
+            "first_name,last_name,email,title,company_name,industry\n"
+            "Max,Müller,max@test.de,Manager,Test GmbH,Real Estate\n"
+            "Max,Müller,max@test.de,Manager,Test GmbH,Real Estate\n"
+        )
+
+        chunks = list(read_in_chunks(csv_path, 1, drop_duplicates=False))
+        assert sum(len(chunk) for chunk in chunks) == 2
+
+    def test_raises_on_missing_columns(self, tmp_path: Path) -> None:
+        """Wirft ValueError wenn Pflichtspalten fehlen."""
+        csv_path = tmp_path / "incomplete.csv"
+        csv_path.write_text("first_name,email\nMax,max@test.de\n")
+
+        with pytest.raises(ValueError, match="Pflichtspalten fehlen"):
+            list(read_in_chunks(csv_path, 10))
+
+    def test_raises_on_invalid_chunk_size(self, sample_csv_path: Path) -> None:
+        """Wirft ValueError bei chunk_size < 1."""
+        with pytest.raises(ValueError, match="chunk_size"):
+            list(read_in_chunks(sample_csv_path, 0))
+
+
 class TestCleanData:
     """Tests für die Datenbereinigung."""
 
@@ -83,6 +190,25 @@ class TestCleanData:
         cleaned = clean_data(df)
         assert len(cleaned) == 1
 
+    def test_uses_compact_dtypes(self, sample_csv_path: Path) -> None:
+        """Wenig variable Spalten sind kategorisch, der Rest Arrow-/pandas-Strings."""
+        df = read_and_validate(sample_csv_path)
+        for col in CATEGORICAL_COLUMNS:
+            assert isinstance(df[col].dtype, pd.CategoricalDtype), col
+        assert df["email"].dtype == STRING_DTYPE
+
+    def test_strips_categories_and_merges_duplicates(self) -> None:
+        """Whitespace wird pro Kategorie entfernt, gleiche Werte zusammengeführt."""
+        df = pd.DataFrame({
+            "first_name": ["Max", "Anna", "Tom"],
+            "email": ["max@test.de", "anna@test.de", "tom@test.de"],
+            "company_name": ["A", "B", "C"],
+            "city": ["Hamburg ", " Hamburg", "Kiel"],
+        })
+        cleaned = clean_data(df)
+        assert cleaned["city"].tolist() == ["Hamburg", "Hamburg", "Kiel"]
+        assert sorted(cleaned["city"].cat.categories) == ["Hamburg", "Kiel"]
+
 
 class TestValidateEmails:
     """Tests für die E-Mail-Validierung."""
@@ -122,3 +248,13 @@ class TestDeduplicate:
         })
         result = deduplicate(df)
         assert len(result) == 2
+
+    def test_respects_seen_emails(self) -> None:
+        """Bereits gesehene E-Mails werden entfernt und der Zustand ergänzt."""
+        seen = {"max@test.de"}
+        df = pd.DataFrame({
+            "email": ["max@test.de", "anna@test.de", "anna@test.de"],
+        })
+        result = deduplicate(df, seen=seen)
+        assert result["email"].tolist() == ["anna@test.de"]
+        assert seen == {"max@test.de", "anna@test.de"}
@@ -0,0 +1,72 @@
+"""Tests für generator/email_check.py."""
+
+import pandas as pd
+import pytest
+
+from generator import email_check
+from generator.email_check import is_valid_email, valid_email_mask
+
+
+SAMPLE_EMAILS = [
+    "max@test.de",
+    "Anna.Schmidt@Example.COM",
+    "postmaster@test.de",
+    "max+leads@abc-hausverwaltung.de",
+    "jürgen@test.de",
+    "max@münchen.de",
+    "max@xn--mnchen-3ya.de",
+    "not-an-email",
+    "",
+    "max@@test.de",
+    "max @test.de",
+    "max@test",
+    "max@localhost",
+    "max@-bad.de",
+    ".max@test.de",
+    "max..mueller@test.de",
+    "\"max\"@test.de",
+    "Max <max@test.de>",
+    "a" * 64 + "@test.de",
+    "a" * 65 + "@test.de",
+    "a" * 64 + "@" + "b" * 60 + "." + "c" * 60 + "." + "d" * 60 + ".de",
+    "max@test.de",
+]
+
+
+class TestValidEmailMask:
+    """Tests für die Validierungs-Engine."""
+
+    def test_matches_reference_validation(self) -> None:
+        """Maske entspricht exakt der Einzelprüfung per validate_email."""
+        emails = pd.Series(SAMPLE_EMAILS)
+        expected = [is_valid_email(e) for e in SAMPLE_EMAILS]
+        assert valid_email_mask(emails, workers=1).tolist() == expected
+
+    def test_keeps_index(self) -> None:
+        """Maske hat denselben Index wie die Eingabe."""
+        emails = pd.Series(["max@test.de", "kaputt"], index=[10, 20])
+        mask = valid_email_mask(emails, workers=1)
+        assert mask.index.tolist() == [10, 20]
+        assert mask.tolist() == [True, False]
+
+    def test_empty_series(self) -> None:
+        """Leere Eingabe ergibt leere Bool-Maske."""
+        mask = valid_email_mask(pd.Series([], dtype=str))
+        assert mask.empty
+        assert mask.dtype == bool
+
+    def test_parallel_path_matches(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Prozess-Pool liefert dasselbe Ergebnis wie die serielle Prüfung."""
+        monkeypatch.setattr(email_check, "PARALLEL_THRESHOLD", 1)
+        emails = pd.Series(["jürgen@test.de", "jörg@test", "max@test.de"])
+        expected = [is_valid_email(e) for e in emails]
+        assert valid_email_mask(emails, workers=2).tolist() == expected
+
+    def test_domain_checked_once(self) -> None:
+        """Jede Domain wird nur einmal vollständig geprüft."""
+        email_check._check_domain.cache_clear()
+        emails = pd.Series([f"lead{i}@cache-test.de" for i in range(50)])
+        assert valid_email_mask(emails, workers=1).all()
+        info = email_check._check_domain.cache_info()
+        assert info.misses == 1
+        assert info.hits == 49
@@ -0,0 +1,69 @@
+"""Tests für generator/keyword_matcher.py."""
+
+import random
+
+from generator.keyword_matcher import KeywordMatcher
+
+
+class TestKeywordMatcher:
+    """Tests für den Aho-Corasick-Matcher."""
+
+    def test_matches_substring_semantics(self) -> None:
+        """Treffer entsprechen `keyword.lower() in text.lower()`."""
+        rng = random.Random(8)
+        alphabet = "abcÄäßx "
+        lists = {
+            f"liste{i}": [
+                "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4)))
+                for _ in range(rng.randint(1, 5))
+            ]
+            for i in range(20)
+        }
+        matcher = KeywordMatcher(lists)
+
+        for _ in range(500):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+            expected = {
+                name
+                for name, keywords in lists.items()
+                if any(kw.lower() in text.lower() for kw in keywords)
+            }
+            assert matcher.matches(text) == expected
+
+    def test_overlapping_keywords_across_lists(self) -> None:
+        """Überlappende Keywords aus verschiedenen Listen werden alle gefunden."""
+        matcher = KeywordMatcher({
+            "a": ["Geschäftsführer"],
+            "b": ["führer"],
+            "c": ["schäft"],
+            "d": ["Vorstand"],
+        })
+        assert matcher.matches("geschäftsführerin") == {"a", "b", "c"}
+
+    def test_case_insensitive(self) -> None:
+        """Groß-/Kleinschreibung spielt keine Rolle."""
+        matcher = KeywordMatcher({"bau": ["Hochbau"]})
+        assert matcher.matches("HOCHBAU GmbH") == {"bau"}
+
+    def test_empty_keyword_always_matches(self) -> None:
+        """Ein leeres Keyword ist (wie bei `in`) in jedem Text enthalten."""
+        matcher = KeywordMatcher({"leer": [""], "bau": ["bau"]})
+        assert matcher.matches("") == {"leer"}
+
+    def test_empty_list_never_matches(self) -> None:
+        """Eine leere Liste trifft nie."""
+        matcher = KeywordMatcher({"leer": []})
+        assert matcher.match_mask("irgendwas") == 0
+
+    def test_single_list_matches_like_combined(self) -> None:
+        """Der Einzel-Automat einer Liste trifft dieselben Texte wie der gemeinsame."""
+        matcher = KeywordMatcher({"a": ["bau", "haus"], "b": ["verwalt"]})
+        single = matcher.single("a")
+
+        for text in ("Hausverwaltung", "Tiefbau", "Verwaltung", ""):
+            assert bool(single.match_mask(text)) == ("a" in matcher.matches(text))
+
+    def test_bit_matches_mask(self) -> None:
+        """bit() liefert das Bit der Liste in der Maske."""
+        matcher = KeywordMatcher({"a": ["x"], "b": ["y"]})
+        assert matcher.match_mask("y") == matcher.bit("b")
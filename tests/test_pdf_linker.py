@@ -2,7 +2,7 @@
 
 import pytest
 
-from generator.pdf_linker import resolve
+from generator.pdf_linker import lookup, resolve, resolve_all
 
 
 class TestResolve:
@@ -32,3 +32,23 @@ class TestResolve:
                     f"Falscher Link für {company_id}/{segment_id}: "
                     f"erwartet '{expected_link}', bekommen '{link}'"
                 )
+
+
+class TestResolveAll:
+    """Tests für die vorab aufgelöste Link-Tabelle."""
+
+    def test_matches_resolve_for_all_rule_combinations(
+        self, pdf_links: dict, segmentation_rules: dict
+    ) -> None:
+        """Jede Firma/Segment-Kombination der Regeln entspricht `resolve`."""
+        resolved = resolve_all(pdf_links, segmentation_rules)
+        for company_id, company_rules in segmentation_rules["segmentierung"].items():
+            for segment_id in company_rules["templates"]:
+                assert resolved[(company_id, segment_id)] == resolve(
+                    company_id, segment_id, pdf_links
+                )
+
+    def test_lookup_falls_back_to_resolve(self, pdf_links: dict) -> None:
+        """Unbekannte Kombinationen werden direkt aufgelöst."""
+        link = lookup("seehafer_elemente", "gibts_nicht", pdf_links, {})
+        assert link == "https://link.gruppenwerk.de/seehafer-leistungen"
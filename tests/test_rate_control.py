@@ -0,0 +1,257 @@
+"""Tests für generator/rate_control.py."""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from generator.rate_control import CircuitBreaker, RateController, RetryScheduler, TokenBucket
+
+
+class FakeClock:
+    """Manuell vorgestellte Uhr."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTokenBucket:
+    """Tests für den Token-Bucket."""
+
+    def test_reserves_until_empty_then_waits(self) -> None:
+        """Nach der Kapazität (eine Minute) muss gewartet werden."""
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock)
+
+        assert bucket.reserve(60) == 0.0
+        assert bucket.reserve(1) == pytest.approx(1.0)
+        assert bucket.reserve(1) == pytest.approx(2.0)
+
+    def test_refills_over_time(self) -> None:
+        """Tokens laufen mit der Rate pro Minute nach."""
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock)
+        bucket.reserve(60)
+
+        clock.now += 10
+        assert bucket.reserve(10) == 0.0
+
+    def test_drain_to_server_remaining(self) -> None:
+        """Der Server-Reststand begrenzt den lokalen Stand."""
+        bucket = TokenBucket(100, FakeClock())
+        bucket.drain_to(5)
+
+        assert bucket.reserve(5) == 0.0
+        assert bucket.reserve(1) > 0
+
+
+class TestRateController:
+    """Tests für die adaptive Ratensteuerung."""
+
+    def test_headers_set_limits(self) -> None:
+        """Rate-Limit-Header werden übernommen (mit Sicherheitsabschlag)."""
+        controller = RateController(rpm=50, tpm=30_000, clock=FakeClock())
+        controller.observe_headers({
+            "Anthropic-RateLimit-Requests-Limit": "4000",
+            "anthropic-ratelimit-requests-remaining": "3999",
+            "anthropic-ratelimit-tokens-limit": "400000",
+            "anthropic-ratelimit-tokens-remaining": "12",
+        })
+
+        assert controller.rpm_limit == 4000
+        assert controller.requests.per_minute == pytest.approx(3800)
+        assert controller.tpm_limit == 400_000
+        assert controller.tokens.reserve(12) == 0.0
+        assert controller.tokens.reserve(1) > 0
+
+    def test_rate_limit_halves_concurrency_and_pauses(self) -> None:
+        """429 halbiert das Limit (einmal pro Cooldown) und setzt eine gemeinsame Pause."""
+        clock = FakeClock()
+        controller = RateController(max_concurrency=16, clock=clock)
+
+        wait = controller.on_rate_limited({"retry-after": "7"})
+        controller.on_rate_limited({})
+
+        assert wait == 7.0
+        assert controller.limit == 8
+        assert controller.pause_until == clock.now + 7
+
+    def test_rate_limit_without_retry_after_does_not_pause(self) -> None:
+        """Ohne retry-after wird nur das Limit gesenkt, nicht pausiert."""
+        controller = RateController(max_concurrency=16, clock=FakeClock())
+
+        assert controller.on_rate_limited({}) == 0.0
+        assert controller.pause_until == 0.0
+        assert controller.limit == 8
+
+    def test_success_increases_additively(self) -> None:
+        """Erfolge erhöhen das Limit um etwa 1 pro Fenster."""
+        controller = RateController(max_concurrency=16, concurrency=4, clock=FakeClock())
+        for _ in range(4):
+            controller.on_success(1.0)
+
+        assert 4.9 < controller.limit < 5.1
+
+    def test_high_latency_decreases(self) -> None:
+        """Deutlich steigende Latenz senkt das Limit statt es zu erhöhen."""
+        controller = RateController(max_concurrency=16, concurrency=10, clock=FakeClock())
+        controller.on_success(1.0)
+        for _ in range(10):
+            controller.on_success(10.0)
+
+        assert controller.limit < 10
+
+    def test_slot_respects_limit(self) -> None:
+        """Nie mehr gleichzeitige Slots als das aktuelle Limit."""
+        controller = RateController(max_concurrency=3)
+        active = peak = 0
+
+        async def work() -> None:
+            nonlocal active, peak
+            async with controller.slot():
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.001)
+                active -= 1
+
+        async def run() -> None:
+            await asyncio.gather(*(work() for _ in range(20)))
+
+        asyncio.run(run())
+        assert peak == 3
+
+    def test_learned_limits_persist(self, tmp_path: Path) -> None:
+        """Gelernte Limits und Concurrency gelten im nächsten Lauf."""
+        path = tmp_path / "rate_limits.json"
+        controller = RateController.from_config({"ai_concurrency": 20}, path)
+        controller.observe_headers({"anthropic-ratelimit-requests-limit": "1000"})
+        controller.on_rate_limited({})
+        controller.save(path)
+        assert [p.name for p in tmp_path.iterdir()] == ["rate_limits.json"]
+
+        reloaded = RateController.from_config({"ai_concurrency": 20}, path)
+
+        assert reloaded.rpm_limit == 1000
+        assert reloaded.limit == 10
+
+    def test_invalid_state_is_ignored(self, tmp_path: Path) -> None:
+        """Kaputte Zustandsdatei → Startwerte aus der Konfiguration."""
+        path = tmp_path / "rate_limits.json"
+        path.write_text("{kaputt", encoding="utf-8")
+
+        controller = RateController.from_config({"ai_rpm_limit": 77}, path)
+
+        assert controller.rpm_limit == 77
+
+
+class TestRetryScheduler:
+    """Tests für die Warteschlange verzögerter Wiederholungen."""
+
+    def test_backoff_doubles_with_jitter_and_minimum(self) -> None:
+        """Exponentieller Backoff, durch Jitter gekürzt, nie unter retry-after."""
+        scheduler = RetryScheduler(base_delay=1.0, max_delay=10.0, jitter=0.5, rng=lambda: 1.0)
+
+        assert scheduler.backoff(0) == 0.5
+        assert scheduler.backoff(2) == 2.0
+        assert scheduler.backoff(10) == 5.0
+        assert scheduler.backoff(0, minimum=3.0) == 3.0
+
+    def test_wakes_in_due_order(self) -> None:
+        """Einträge werden in Fälligkeitsreihenfolge geweckt, auch wenn später eingereiht."""
+        scheduler = RetryScheduler()
+        order: list[str] = []
+
+        async def retry(name: str, delay: float) -> None:
+            await scheduler.wait(delay)
+            order.append(name)
+
+        async def run() -> None:
+            late = asyncio.create_task(retry("spät", 0.05))
+            await asyncio.sleep(0.01)
+            early = asyncio.create_task(retry("früh", 0.001))
+            await asyncio.gather(late, early)
+
+        asyncio.run(run())
+        assert order == ["früh", "spät"]
+        assert len(scheduler) == 0
+        assert scheduler.scheduled == 2
+
+
+class TestCircuitBreaker:
+    """Tests für den lauf-weiten Circuit Breaker."""
+
+    def _breaker(self, clock: FakeClock) -> CircuitBreaker:
+        return CircuitBreaker(window=10, min_requests=4, error_rate=0.5, open_seconds=30, clock=clock)
+
+    def test_opens_at_error_rate_in_window(self) -> None:
+        """Öffnet erst mit genug Ergebnissen und Fehlerquote über der Schwelle."""
+        breaker = self._breaker(FakeClock())
+
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow()
+        assert breaker.stats() == {"state": "open", "opened": 1, "probes": 0, "rejected": 1}
+
+    def test_window_slides(self) -> None:
+        """Alte Fehler fallen aus dem Fenster."""
+        breaker = self._breaker(FakeClock())
+
+        for _ in range(4):
+            breaker.record_failure()
+            for _ in range(4):
+                breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_probe_closes_on_success(self) -> None:
+        """Nach open_seconds genau eine Probe; Erfolg schließt den Breaker."""
+        clock = FakeClock()
+        breaker = self._breaker(clock)
+        for _ in range(4):
+            breaker.record_failure()
+
+        clock.now += 30
+        assert breaker.allow()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert not breaker.allow()
+        breaker.record_success()
+
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow()
+        assert breaker.transitions == {"open": 1, "half_open": 1, "closed": 1}
+
+    def test_failed_probe_reopens(self) -> None:
+        """Scheitert die Probe, bleibt er weitere open_seconds offen."""
+        clock = FakeClock()
+        breaker = self._breaker(clock)
+        for _ in range(4):
+            breaker.record_failure()
+
+        clock.now += 30
+        assert breaker.allow()
+        breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.OPEN
+        clock.now += 29
+        assert not breaker.allow()
+        clock.now += 1
+        assert breaker.allow()
+        assert breaker.probes == 2
+
+    def test_stuck_probe_is_replaced(self) -> None:
+        """Kommt die Probe nie zurück, darf nach open_seconds eine neue raus."""
+        clock = FakeClock()
+        breaker = self._breaker(clock)
+        for _ in range(4):
+            breaker.record_failure()
+
+        clock.now += 30
+        assert breaker.allow()
+        clock.now += 30
+        assert breaker.allow()
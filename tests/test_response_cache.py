@@ -0,0 +1,72 @@
+"""Tests für generator/response_cache.py."""
+
+import sqlite3
+import time
+from pathlib import Path
+
+from generator.response_cache import ResponseCache, response_key
+
+
+class TestResponseKey:
+    """Tests für den Cache-Schlüssel."""
+
+    def test_depends_on_all_parameters(self) -> None:
+        """Prompt, Modell, Temperatur und max_tokens gehen in den Schlüssel ein."""
+        base = response_key("Prompt", "modell", 0.7, 150)
+        assert base == response_key("Prompt", "modell", 0.7, 150)
+        assert base != response_key("Prompt!", "modell", 0.7, 150)
+        assert base != response_key("Prompt", "anderes", 0.7, 150)
+        assert base != response_key("Prompt", "modell", 0.5, 150)
+        assert base != response_key("Prompt", "modell", 0.7, 100)
+
+
+class TestResponseCache:
+    """Tests für den persistenten Antwort-Cache."""
+
+    def test_put_and_get(self, tmp_path: Path) -> None:
+        """Gespeicherte Antworten werden gefunden, Statistik wird gezählt."""
+        cache = ResponseCache(tmp_path / "cache.sqlite3")
+        cache.put("a", "Icebreaker A")
+
+        assert cache.get_many(["a", "b", "a"]) == {"a": "Icebreaker A"}
+        assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+    def test_persists_between_runs(self, tmp_path: Path) -> None:
+        """Einträge bleiben nach dem Schließen erhalten."""
+        cache = ResponseCache(tmp_path / "cache.sqlite3")
+        cache.put("a", "Icebreaker A")
+        cache.close()
+
+        assert ResponseCache(tmp_path / "cache.sqlite3").get("a") == "Icebreaker A"
+
+    def test_expired_entries_are_misses_and_evicted(self, tmp_path: Path) -> None:
+        """Abgelaufene Einträge zählen nicht und werden beim Aufräumen gelöscht."""
+        cache = ResponseCache(tmp_path / "cache.sqlite3", ttl_seconds=60)
+        cache.put("alt", "Icebreaker")
+        with sqlite3.connect(tmp_path / "cache.sqlite3") as conn:
+            conn.execute("UPDATE responses SET created_at = ?", (time.time() - 120,))
+
+        assert cache.get("alt") is None
+        assert cache.evict() == 1
+
+    def test_size_limit_evicts_least_recently_used(self, tmp_path: Path) -> None:
+        """Über max_entries fliegen die am längsten ungenutzten Einträge."""
+        cache = ResponseCache(tmp_path / "cache.sqlite3", max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.put(key, key.upper())
+            time.sleep(0.01)
+        cache.get("a")
+
+        assert cache.evict() == 1
+        assert cache.get_many(["a", "b", "c"]) == {"a": "A", "c": "C"}
+
+    def test_shared_between_connections(self, tmp_path: Path) -> None:
+        """Zwei gleichzeitig geöffnete Caches sehen die Einträge des anderen."""
+        first = ResponseCache(tmp_path / "cache.sqlite3")
+        second = ResponseCache(tmp_path / "cache.sqlite3")
+
+        first.put("a", "A")
+        second.put("b", "B")
+
+        assert first.get_many(["a", "b"]) == {"a": "A", "b": "B"}
+        assert second.get_many(["a", "b"]) == {"a": "A", "b": "B"}
@@ -0,0 +1,117 @@
+"""Tests für generator/segment_cache.py."""
+
+import pickle
+from pathlib import Path
+
+import pytest
+
+from generator import segment_cache
+from generator.segment_cache import CACHE_VERSION, SegmentCache
+
+SIGNATURE = ("Real Estate", "CEO", "11-50", "", True)
+RESULT = ((1.0, "hausverwaltung"), (0.2, "default"))
+
+
+class TestSegmentCache:
+    """Tests für den LRU-Signatur-Cache."""
+
+    def test_counts_hits_and_misses(self) -> None:
+        """Treffer und Fehlschläge werden gezählt."""
+        cache = SegmentCache()
+        cache.bind({"segmentierung": {}})
+
+        assert cache.get(SIGNATURE) is None
+        cache.put(SIGNATURE, RESULT)
+        assert cache.get(SIGNATURE) == RESULT
+
+        assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "size": 1}
+
+    def test_evicts_least_recently_used(self) -> None:
+        """Bei voller Kapazität fliegt die am längsten ungenutzte Signatur."""
+        cache = SegmentCache(maxsize=2)
+        cache.bind({})
+        a, b, c = (("a", "", "", "", False), ("b", "", "", "", False), ("c", "", "", "", False))
+        cache.put(a, RESULT)
+        cache.put(b, RESULT)
+        cache.get(a)
+        cache.put(c, RESULT)
+
+        assert cache.get(b) is None
+        assert cache.get(a) == RESULT
+        assert len(cache) == 2
+
+    def test_persists_between_runs(self, tmp_path: Path) -> None:
+        """Gespeicherte Einträge sind im nächsten Lauf verfügbar."""
+        rules = {"segmentierung": {"x": {"branchen": ["Real Estate"]}}}
+        cache = SegmentCache(path=tmp_path / "segments.pkl")
+        cache.bind(rules)
+        cache.put(SIGNATURE, RESULT)
+        cache.save()
+
+        reloaded = SegmentCache(path=tmp_path / "segments.pkl")
+        reloaded.bind(rules)
+        assert reloaded.get(SIGNATURE) == RESULT
+
+    def test_rules_change_invalidates(self, tmp_path: Path) -> None:
+        """Geänderte Regeln verwerfen den Cache."""
+        cache = SegmentCache(path=tmp_path / "segments.pkl")
+        cache.bind({"segmentierung": {"x": {"branchen": ["Real Estate"]}}})
+        cache.put(SIGNATURE, RESULT)
+        cache.save()
+
+        reloaded = SegmentCache(path=tmp_path / "segments.pkl")
+        reloaded.bind({"segmentierung": {"x": {"branchen": ["Construction"]}}})
+        assert reloaded.get(SIGNATURE) is None
+        assert len(reloaded) == 0
+
+    def test_reordered_rules_invalidate(self, tmp_path: Path) -> None:
+        """Umsortierte Segmente ändern die Priorität und verwerfen den Cache."""
+        x = {"branchen": ["Real Estate"]}
+        y = {"branchen": ["Construction"]}
+        cache = SegmentCache(path=tmp_path / "segments.pkl")
+        cache.bind({"segmentierung": {"x": x, "y": y}})
+        cache.put(SIGNATURE, RESULT)
+        cache.save()
+
+        reloaded = SegmentCache(path=tmp_path / "segments.pkl")
+        reloaded.bind({"segmentierung": {"y": y, "x": x}})
+        assert reloaded.get(SIGNATURE) is None
+        assert len(reloaded) == 0
+
+    def test_code_change_invalidates(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Geänderter Segmentierungscode verwirft den Cache auch bei gleichen Regeln."""
+        rules = {"segmentierung": {"x": {"branchen": ["Real Estate"]}}}
+        cache = SegmentCache(path=tmp_path / "segments.pkl")
+        cache.bind(rules)
+        cache.put(SIGNATURE, RESULT)
+        cache.save()
+
+        monkeypatch.setattr(segment_cache, "artifact_version", lambda: "1-geaendert")
+        reloaded = SegmentCache(path=tmp_path / "segments.pkl")
+        reloaded.bind(rules)
+        assert reloaded.get(SIGNATURE) is None
+
+    def test_corrupt_file_starts_empty(self, tmp_path: Path) -> None:
+        """Eine unlesbare Cache-Datei führt zu einem leeren Cache."""
+        path = tmp_path / "segments.pkl"
+        path.write_bytes(b"kaputt")
+        cache = SegmentCache(path=path)
+        assert len(cache) == 0
+
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            pickle.dumps(["keine", "dict"]),
+            pickle.dumps({"version": CACHE_VERSION, "entries": []}),
+            b"cgenerator.segmenter\nGibtEsNicht\n.",
+        ],
+    )
+    def test_foreign_layout_starts_empty(self, tmp_path: Path, payload: bytes) -> None:
+        """Lesbare Pickles mit fremdem Aufbau führen zu einem leeren Cache."""
+        path = tmp_path / "segments.pkl"
+        path.write_bytes(payload)
+        cache = SegmentCache(path=path)
+        cache.bind({})
+        assert len(cache) == 0
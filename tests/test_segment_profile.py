@@ -0,0 +1,64 @@
+"""Tests für generator/segment_profile.py."""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from generator.segment_profile import SegmentationProfile
+
+
+class TestSegmentationProfile:
+    """Tests für Zähler, Report und Tabelle."""
+
+    def test_record_weights_hits_by_leads(self) -> None:
+        """Treffer werden mit der Lead-Anzahl pro Signatur gewichtet."""
+        profile = SegmentationProfile()
+        profile.weights = np.array([3, 1, 2])
+        hits = np.array([True, False, True])
+
+        profile.record("werner_bau", "", "branchen", profile.start(), hits)
+        profile.record(
+            "werner_bau", "", "branchen", profile.start(), hits,
+            evaluated=np.array([True, True, False]),
+        )
+
+        stats = profile.conditions[("werner_bau", "", "branchen")]
+        assert (stats.evaluated, stats.hits) == (6 + 4, 5 + 3)
+
+    def test_scan_seconds_added_to_condition(self) -> None:
+        """Einzeln gemessene Suchzeit wird der Bedingung zugeschlagen."""
+        profile = SegmentationProfile()
+        profile.weights = np.array([1])
+        profile.record(
+            "werner_bau", "", "branchen", profile.start(), np.array([True]), scan_seconds=2.0
+        )
+        assert profile.conditions[("werner_bau", "", "branchen")].seconds >= 2.0
+        assert "Suchzeit" in profile.format_table()
+
+    def test_score_distribution(self) -> None:
+        """Scores werden pro Firma auf eine Nachkommastelle gezählt."""
+        profile = SegmentationProfile()
+        profile.add_scores("werner_bau", np.array([0.5, 0.7, 0.5 + 0.2, 1.0]))
+        assert profile.scores["werner_bau"] == {"0.5": 1, "0.7": 2, "1.0": 1}
+
+    def test_json_report(self, tmp_path: Path) -> None:
+        """Der Report ist gültiges JSON mit Bedingungen und Score-Verteilung."""
+        profile = SegmentationProfile()
+        profile.weights = np.array([1])
+        profile.record("werner_bau", "denkmalschutz", "keywords_enthalten",
+                       profile.start(), np.array([True]))
+
+        path = profile.write_json(tmp_path / "profile.json")
+        report = json.loads(path.read_text(encoding="utf-8"))
+
+        assert report["conditions"][0]["condition"] == "keywords_enthalten"
+        assert report["conditions"][0]["hit_rate"] == 1.0
+        assert "score_distribution" in report
+
+    def test_table_lists_conditions(self) -> None:
+        """Die Tabelle enthält eine Zeile pro Bedingung."""
+        profile = SegmentationProfile()
+        profile.weights = np.array([1])
+        profile.record("werner_bau", "", "jobtitel_keywords", profile.start(), np.array([False]))
+        assert "jobtitel_keywords" in profile.format_table()
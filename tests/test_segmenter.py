@@ -1,12 +1,21 @@
 """Tests für generator/segmenter.py."""
 
+import random
+from pathlib import Path
+
 import pandas as pd
 import pytest
 
+from generator import segmenter
+from generator.csv_reader import read_and_validate
+from generator.segment_cache import SegmentCache
+from generator.segment_profile import SegmentationProfile
 from generator.segmenter import (
     Assignment,
+    AssignmentTable,
     assign_all,
     determine_segment,
+    lead_signatures,
     match_company,
     _parse_company_size,
 )
@@ -153,6 +162,16 @@ class TestAssignAll:
         companies = {a.company_id for a in assignments}
         assert companies == {"seehafer_elemente"}
 
+    def test_accepts_compact_frame(
+        self, sample_csv_path: Path, segmentation_rules: dict
+    ) -> None:
+        """Kategorische und Arrow-Spalten aus dem Reader werden direkt verarbeitet."""
+        df = read_and_validate(sample_csv_path)
+        assignments = assign_all(df, segmentation_rules)
+        assert assignments
+        lead = assignments[0].lead.to_dict()
+        assert all(isinstance(value, str) for value in lead.values())
+
     def test_invalid_company_filter_raises(self, segmentation_rules: dict) -> None:
         """Unbekannter Company-Filter wirft ValueError."""
         df = pd.DataFrame([{
@@ -170,6 +189,235 @@ class TestAssignAll:
             assign_all(df, segmentation_rules, company_filter="gibts_nicht")
 
 
+def _reference_assign_all(df: pd.DataFrame, rules: dict) -> list[tuple]:
+    """Zeilenweise Referenz-Zuordnung über match_company/determine_segment."""
+    result = []
+    for row, (_, lead) in enumerate(df.iterrows()):
+        for company_id, company_rules in rules["segmentierung"].items():
+            matched, score = match_company(lead, company_rules)
+            if matched:
+                segment_id = determine_segment(
+                    lead, company_id, company_rules, rules["template_auswahl"]
+                )
+                result.append((row, company_id, segment_id, score))
+    return result
+
+
+def _random_leads(count: int, seed: int = 7) -> pd.DataFrame:
+    """Zufällige Leads aus Regel-Vokabular mit Varianten in Schreibweise."""
+    rng = random.Random(seed)
+    industries = [
+        "Real Estate", "property management", " Construction ", "Government",
+        "Education", "Commercial Real Estate", "Food & Beverage", "",
+    ]
+    titles = [
+        "Facility Manager", "BAULEITER", "Projektleiter Hochbau", "CEO",
+        "Leiter technisches Gebäudemanagement", "Denkmalpfleger", "", "Koch",
+    ]
+    keywords = ["", "Denkmalschutz", "heritage buildings", "Schulen", "Büro"]
+    sizes = ["", "1-10", "2", "5", "11-50", "51-200", "201-500", "1,000-5,000", "n/a"]
+    companies = ["ABC GmbH", "", "  "]
+    return pd.DataFrame([
+        {
+            "email": f"lead{i}@test.de",
+            "industry": rng.choice(industries),
+            "title": rng.choice(titles),
+            "keywords": rng.choice(keywords),
+            "company_size": rng.choice(sizes),
+            "company_name": rng.choice(companies),
+        }
+        for i in range(count)
+    ])
+
+
+class TestAssignAllParity:
+    """Spaltenweise Zuordnung entspricht exakt der zeilenweisen Referenz."""
+
+    def test_matches_reference_on_random_leads(self, segmentation_rules: dict) -> None:
+        """Gleiche Zuordnungen, Scores und Segmente in gleicher Reihenfolge."""
+        df = _random_leads(500)
+        assignments = assign_all(df, segmentation_rules)
+        result = [
+            (a.row, a.company_id, a.segment_id, a.match_score) for a in assignments
+        ]
+        assert result == _reference_assign_all(df, segmentation_rules)
+
+    def test_matches_reference_on_sample_csv(
+        self, sample_csv_path: Path, segmentation_rules: dict
+    ) -> None:
+        """Gleiches Ergebnis auf der Beispiel-CSV (kompakte Dtypes)."""
+        df = read_and_validate(sample_csv_path)
+        result = [
+            (a.row, a.company_id, a.segment_id, a.match_score)
+            for a in assign_all(df, segmentation_rules)
+        ]
+        assert result == _reference_assign_all(df, segmentation_rules)
+
+    def test_handles_missing_optional_columns(self, segmentation_rules: dict) -> None:
+        """Fehlende Spalten werden wie leere Werte behandelt."""
+        df = pd.DataFrame([{"email": "max@test.de", "industry": "Real Estate", "title": "CEO"}])
+        result = [
+            (a.row, a.company_id, a.segment_id, a.match_score)
+            for a in assign_all(df, segmentation_rules)
+        ]
+        assert result == _reference_assign_all(df, segmentation_rules)
+
+    def test_matches_reference_with_warm_cache(
+        self, segmentation_rules: dict, tmp_path: Path
+    ) -> None:
+        """Ergebnisse aus dem Signatur-Cache sind identisch (auch nach Neuladen)."""
+        df = _random_leads(500)
+        expected = _reference_assign_all(df, segmentation_rules)
+
+        cache = SegmentCache(path=tmp_path / "segments.pkl")
+        assign_all(df, segmentation_rules, cache=cache)
+        cache.save()
+
+        warm = SegmentCache(path=tmp_path / "segments.pkl")
+        assignments = assign_all(df, segmentation_rules, cache=warm)
+        result = [
+            (a.row, a.company_id, a.segment_id, a.match_score) for a in assignments
+        ]
+        assert result == expected
+        assert warm.misses == 0
+        assert warm.hits > 0
+
+
+class TestAssignAllProfile:
+    """Tests für den Profiling-Modus von assign_all."""
+
+    def test_profile_does_not_change_result(self, segmentation_rules: dict) -> None:
+        """Mit Profil entstehen dieselben Zuordnungen."""
+        df = _random_leads(300)
+        profile = SegmentationProfile()
+        result = [
+            (a.row, a.company_id, a.segment_id, a.match_score)
+            for a in assign_all(df, segmentation_rules, profile=profile)
+        ]
+        assert result == _reference_assign_all(df, segmentation_rules)
+
+    def test_counts_match_row_wise_evaluation(self, segmentation_rules: dict) -> None:
+        """Firmenkriterien prüfen jeden Lead; Score-Verteilung deckt alle Leads ab."""
+        df = _random_leads(300)
+        profile = SegmentationProfile()
+        assign_all(df, segmentation_rules, profile=profile)
+
+        assert profile.leads == 300
+        for company_id, company_rules in segmentation_rules["segmentierung"].items():
+            stats = profile.conditions[(company_id, "", "branchen")]
+            expected_hits = sum(
+                any(t.lower() in lead["industry"].strip().lower()
+                    for t in company_rules["branchen"])
+                for _, lead in df.iterrows()
+            )
+            assert (stats.evaluated, stats.hits) == (300, expected_hits)
+            assert sum(profile.scores[company_id].values()) == 300
+
+    def test_profile_bypasses_cache_reads(self, segmentation_rules: dict) -> None:
+        """Mit Profil werden auch gecachte Signaturen ausgewertet."""
+        df = _random_leads(100)
+        cache = SegmentCache()
+        assign_all(df, segmentation_rules, cache=cache)
+        hits_before = cache.hits
+
+        profile = SegmentationProfile()
+        assign_all(df, segmentation_rules, cache=cache, profile=profile)
+
+        assert cache.hits == hits_before
+        assert profile.conditions[("*", "", "keyword_scan")].evaluated == 100
+
+    def test_keyword_scan_time_charged_to_condition(
+        self, segmentation_rules: dict, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Die Suchzeit einer Keyword-Liste landet bei der Bedingung, die sie nutzt."""
+        company_id = next(iter(segmentation_rules["segmentierung"]))
+        slow_list = f"jobtitel_keywords:{company_id}"
+        monkeypatch.setattr(
+            segmenter._TextColumn, "scan_seconds",
+            lambda self, name: 10.0 if name == slow_list else 0.0,
+        )
+        profile = SegmentationProfile()
+        assign_all(_random_leads(50), segmentation_rules, profile=profile)
+
+        slowest = profile.sorted_conditions()[0]
+        assert (slowest.company_id, slowest.condition) == (company_id, "jobtitel_keywords")
+        assert profile.conditions[(company_id, "", "branchen")].seconds < 10.0
+
+
+class TestAssignmentTable:
+    """Tests für die spaltenweise Zuordnungstabelle."""
+
+    @pytest.fixture
+    def table(self) -> AssignmentTable:
+        leads = pd.DataFrame({
+            "email": ["max@test.de", "anna@test.de"],
+            "first_name": ["Max", "Anna"],
+        })
+        return AssignmentTable.from_ids(
+            leads,
+            [0, 0, 1],
+            ["seehafer_elemente", "gruppenwerk_bau", "seehafer_elemente"],
+            ["hausverwaltung", "bauunternehmen", "gewerbe"],
+            [1.0, 0.7, 0.5],
+        )
+
+    def test_row_view_reads_lead(self, table: AssignmentTable) -> None:
+        """Zeilenansicht liefert Lead-Daten, Firma, Segment und Score."""
+        row = table[2]
+        assert row.lead.to_dict() == {"email": "anna@test.de", "first_name": "Anna"}
+        assert row.lead.get("city", "Hamburg") == "Hamburg"
+        assert (row.company_id, row.segment_id, row.match_score) == (
+            "seehafer_elemente", "gewerbe", 0.5,
+        )
+
+    def test_slice_and_filter_share_leads(self, table: AssignmentTable) -> None:
+        """Slices und Masken ergeben neue Tabellen auf denselben Leads."""
+        sliced = table[1:]
+        assert [a.lead["email"] for a in sliced] == ["max@test.de", "anna@test.de"]
+        assert sliced.leads is table.leads
+
+        filtered = table.filter(table.company_ids == "seehafer_elemente")
+        assert filtered.rows.tolist() == [0, 1]
+
+    def test_concat_offsets_rows(self, table: AssignmentTable) -> None:
+        """Beim Zusammenhängen zeigen die Zeilen weiter auf die richtigen Leads."""
+        combined = AssignmentTable.concat([table, table[2:]])
+        assert len(combined) == 4
+        assert combined[3].lead["email"] == "anna@test.de"
+        assert combined[3].row == 3
+        assert combined.segment_ids.tolist()[-1] == "gewerbe"
+
+    def test_compact_storage(self, table: AssignmentTable) -> None:
+        """Pro Zuordnung werden nur wenige Bytes gespeichert."""
+        assert table.nbytes / len(table) <= 16
+
+
+class TestLeadSignatures:
+    """Tests für die Reduktion auf Segmentierungs-Signaturen."""
+
+    def test_collapses_repeated_combinations(self) -> None:
+        """Leads mit gleichen Segmentierungsfeldern teilen eine Signatur."""
+        df = pd.DataFrame({
+            "email": ["a@test.de", "b@test.de", "c@test.de"],
+            "industry": ["Real Estate", "Real Estate", "Construction"],
+            "title": ["CEO", "CEO", "CEO"],
+            "company_size": ["11-50", "11-50", "11-50"],
+            "keywords": ["", "", ""],
+            "company_name": ["ABC GmbH", "XYZ AG", "ABC GmbH"],
+        })
+        codes, signatures = lead_signatures(df)
+
+        assert len(signatures) == 2
+        assert codes[0] == codes[1] != codes[2]
+        assert signatures[codes[0]] == ("Real Estate", "CEO", "11-50", "", True)
+
+    def test_empty_frame(self) -> None:
+        """Leerer DataFrame ergibt keine Signaturen."""
+        codes, signatures = lead_signatures(pd.DataFrame({"email": []}))
+        assert len(codes) == 0
+        assert signatures == []
+
+
 class TestParseCompanySize:
     """Tests für das Parsen der Unternehmensgröße."""
 
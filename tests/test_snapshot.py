@@ -0,0 +1,120 @@
+"""Tests für generator/snapshot.py."""
+
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from generator.csv_reader import read_and_validate
+from generator.segmenter import AssignmentTable, assign_all
+from generator.snapshot import SnapshotStore
+
+PROJECT_ROOT = Path(__file__).parent.parent
+RULES_PATH = PROJECT_ROOT / "segments" / "rules.yaml"
+
+
+class TestSnapshotStore:
+    """Tests für Schreiben, Laden und Aufräumen von Snapshots."""
+
+    def test_roundtrip_preserves_leads_and_assignments(
+        self, tmp_path: Path, sample_csv_path: Path, segmentation_rules: dict
+    ) -> None:
+        """Geladener Snapshot entspricht Leads und Zuordnungen des Originals."""
+        store = SnapshotStore(tmp_path)
+        leads_df = read_and_validate(sample_csv_path)
+        assignments = assign_all(leads_df, segmentation_rules)
+        key = store.key(sample_csv_path, RULES_PATH)
+
+        with store.writer(key) as writer:
+            writer.add(leads_df, assignments)
+
+        blocks = list(store.load(key))
+        assert len(blocks) == 1
+        loaded_df, loaded_assignments = blocks[0]
+        pd.testing.assert_frame_equal(loaded_df, leads_df)
+        assert [
+            (a.lead["email"], a.company_id, a.segment_id, a.match_score)
+            for a in loaded_assignments
+        ] == [
+            (a.lead["email"], a.company_id, a.segment_id, a.match_score)
+            for a in assignments
+        ]
+
+    def test_missing_snapshot_returns_none(self, tmp_path: Path) -> None:
+        """Unbekannter Schlüssel liefert None."""
+        assert SnapshotStore(tmp_path).load("gibts_nicht") is None
+
+    def test_key_depends_on_inputs(self, tmp_path: Path, sample_csv_path: Path) -> None:
+        """Schlüssel ändert sich mit Regeln und Optionen."""
+        store = SnapshotStore(tmp_path)
+        other_rules = tmp_path / "rules.yaml"
+        other_rules.write_text("segmentierung: {}\n")
+
+        key = store.key(sample_csv_path, RULES_PATH, True)
+        assert key == store.key(sample_csv_path, RULES_PATH, True)
+        assert key != store.key(sample_csv_path, other_rules, True)
+        assert key != store.key(sample_csv_path, RULES_PATH, False)
+
+    def test_aborted_write_is_discarded(self, tmp_path: Path) -> None:
+        """Abgebrochener Snapshot wird nicht gespeichert."""
+        store = SnapshotStore(tmp_path)
+        with pytest.raises(RuntimeError):
+            with store.writer("abc") as writer:
+                leads_df = pd.DataFrame({"email": ["max@test.de"]})
+                writer.add(leads_df, AssignmentTable.from_ids(leads_df, [], [], [], []))
+                raise RuntimeError("Abbruch")
+
+        assert store.load("abc") is None
+        assert list(tmp_path.iterdir()) == []
+
+    def test_concurrent_writers_do_not_clobber(self, tmp_path: Path) -> None:
+        """Zwei Writer auf denselben Schlüssel: der erste Abschluss gewinnt."""
+        store = SnapshotStore(tmp_path)
+        first_df = pd.DataFrame({"email": ["erst@test.de"]})
+        second_df = pd.DataFrame({"email": ["zweit@test.de"]})
+
+        with store.writer("abc") as first:
+            with store.writer("abc") as second:
+                first.add(first_df, AssignmentTable.from_ids(first_df, [], [], [], []))
+                second.add(second_df, AssignmentTable.from_ids(second_df, [], [], [], []))
+            # second ist fertig, first schreibt weiter in sein eigenes Verzeichnis
+            first.add(first_df, AssignmentTable.from_ids(first_df, [], [], [], []))
+
+        blocks = list(store.load("abc"))
+        assert [df["email"].tolist() for df, _ in blocks] == [["zweit@test.de"]]
+        assert [p.name for p in tmp_path.iterdir()] == ["abc"]
+
+    def test_collect_garbage_removes_stale_staging_dirs(self, tmp_path: Path) -> None:
+        """Verwaiste Staging-Verzeichnisse werden nach Alter entfernt, frische nicht."""
+        store = SnapshotStore(tmp_path)
+        stale = tmp_path / ".abc.x1.tmp"
+        fresh = tmp_path / ".abc.x2.tmp"
+        stale.mkdir()
+        fresh.mkdir()
+        old = time.time() - 2 * 86400
+        os.utime(stale, (old, old))
+
+        store.collect_garbage(max_age_days=14, max_bytes=10**9)
+
+        assert sorted(p.name for p in tmp_path.iterdir()) == [".abc.x2.tmp"]
+
+    def test_collect_garbage_by_age_and_size(self, tmp_path: Path) -> None:
+        """Alte Snapshots und Überschreitungen der Gesamtgröße werden entfernt."""
+        store = SnapshotStore(tmp_path)
+        for key in ("alt", "mittel", "neu"):
+            with store.writer(key) as writer:
+                leads_df = pd.DataFrame({"email": ["max@test.de"] * 100})
+                writer.add(leads_df, AssignmentTable.from_ids(leads_df, [], [], [], []))
+
+        now = time.time()
+        os.utime(tmp_path / "alt", (now - 30 * 86400, now - 30 * 86400))
+        os.utime(tmp_path / "mittel", (now - 60, now - 60))
+
+        size = sum(f.stat().st_size for f in (tmp_path / "neu").iterdir())
+        removed = store.collect_garbage(max_age_days=14, max_bytes=size)
+        assert removed == 2
+        assert [p.name for p in tmp_path.iterdir()] == ["neu"]
@@ -0,0 +1,68 @@
+"""Regressionstest: leichte CLI-Befehle importieren keine schweren Abhängigkeiten."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+HEAVY_MODULES = {"anthropic", "httpx", "pandas", "jinja2", "email_validator"}
+
+
+def _imported_modules(*args: str) -> set[str]:
+    """Alle importierten Module eines CLI-Aufrufs laut `python -X importtime`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "main.py", *args],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+    )
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            modules.add(line.rsplit("|", 1)[1].strip())
+    return modules
+
+
+class TestStartupImports:
+    """Tests für die Importe beim CLI-Start."""
+
+    @pytest.mark.parametrize("args", [
+        ("--help",),
+        ("segment", "--help"),
+        ("preview", "--help"),
+        ("generate", "--help"),
+    ])
+    def test_help_skips_heavy_imports(self, args: tuple[str, ...]) -> None:
+        """--help lädt weder pandas noch anthropic/httpx."""
+        assert not _imported_modules(*args) & HEAVY_MODULES
+
+    def test_stats_skips_heavy_imports(self, tmp_path: Path) -> None:
+        """stats zählt Exporte ohne pandas und ohne API-Client."""
+        (tmp_path / "export.csv").write_text(
+            'email,body\nmax@test.de,"Zeile 1\nZeile 2"\nanna@test.de,Text\n',
+            encoding="utf-8",
+        )
+        modules = _imported_modules("stats", "--output", str(tmp_path))
+        assert not modules & HEAVY_MODULES
+
+    def test_stats_counts_rows(self, tmp_path: Path) -> None:
+        """Mehrzeilige Felder zählen als ein Lead."""
+        (tmp_path / "export.csv").write_text(
+            'email,body\nmax@test.de,"Zeile 1\nZeile 2"\nanna@test.de,Text\n',
+            encoding="utf-8",
+        )
+        result = subprocess.run(
+            [sys.executable, "main.py", "stats", "--output", str(tmp_path)],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        )
+        assert "export.csv: 2 Leads" in result.stdout
+
+    def test_fallback_path_skips_anthropic(self) -> None:
+        """Fallback-Icebreaker brauchen das anthropic-SDK nicht."""
+        result = subprocess.run(
+            [sys.executable, "-c",
+             "import sys, generator.ai_personalizer; print('anthropic' in sys.modules)"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        )
+        assert result.stdout.strip() == "False"
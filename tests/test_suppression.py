@@ -0,0 +1,142 @@
+"""Tests für generator/suppression.py."""
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from generator.segmenter import AssignmentTable
+from generator.suppression import BLOOM_FILENAME, BloomFilter, SuppressionIndex
+
+
+class TestBloomFilter:
+    """Tests für den Bloom-Filter."""
+
+    def test_no_false_negatives(self) -> None:
+        """Hinzugefügte Schlüssel werden immer gefunden."""
+        bloom = BloomFilter(capacity=1000)
+        keys = [f"lead{i}@test.de" for i in range(1000)]
+        bloom.add_many(keys)
+        assert bloom.contains_many(keys).all()
+
+    def test_false_positive_rate(self) -> None:
+        """Fehlerrate liegt in der Größenordnung der Konfiguration."""
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        bloom.add_many(f"lead{i}@test.de" for i in range(1000))
+        others = [f"andere{i}@test.de" for i in range(10_000)]
+        assert bloom.contains_many(others).mean() < 0.03
+
+    def test_save_and_load(self, tmp_path: Path) -> None:
+        """Gespeicherter Filter liefert dieselben Ergebnisse."""
+        bloom = BloomFilter(capacity=100)
+        bloom.add_many(["max@test.de"])
+        bloom.save(tmp_path / "bloom", generation=7)
+
+        loaded, generation = BloomFilter.load(tmp_path / "bloom")
+        assert generation == 7
+        assert loaded.contains_many(["max@test.de", "anna@test.de"]).tolist() == [True, False]
+
+    def test_load_rejects_truncated_file(self, tmp_path: Path) -> None:
+        """Eine abgeschnittene Datei (Absturz beim Schreiben) wird abgelehnt."""
+        path = tmp_path / "bloom"
+        BloomFilter(capacity=100).save(path, generation=7)
+        path.write_bytes(path.read_bytes()[:-10])
+
+        with pytest.raises(ValueError):
+            BloomFilter.load(path)
+
+
+class TestSuppressionIndex:
+    """Tests für den Sperr-Index."""
+
+    def test_contains_exported_emails(self, tmp_path: Path) -> None:
+        """Eingetragene Adressen werden erkannt (case-insensitive)."""
+        index = SuppressionIndex(tmp_path, bloom_capacity=1000)
+        index.add(["Max@Test.de"])
+        assert index.contains(["max@test.de", "anna@test.de"]).tolist() == [True, False]
+
+    def test_campaign_scope(self, tmp_path: Path) -> None:
+        """Einträge pro Kampagne gelten nur für diese Kampagne, aber auch global."""
+        index = SuppressionIndex(tmp_path, bloom_capacity=1000)
+        index.add(["max@test.de"], campaign_id="gruppenwerk_maler_hantke")
+
+        assert index.contains(["max@test.de"], "gruppenwerk_maler_hantke").tolist() == [True]
+        assert index.contains(["max@test.de"], "gruppenwerk_werner_bau").tolist() == [False]
+        assert index.contains(["max@test.de"]).tolist() == [True]
+
+    def test_persists_across_runs(self, tmp_path: Path) -> None:
+        """Index überlebt einen neuen Lauf."""
+        index = SuppressionIndex(tmp_path, bloom_capacity=1000)
+        index.add(["max@test.de"])
+        index.close()
+
+        reopened = SuppressionIndex(tmp_path, bloom_capacity=1000)
+        assert reopened.contains(["max@test.de"]).tolist() == [True]
+
+    def test_rebuilds_stale_bloom_filter(self, tmp_path: Path) -> None:
+        """Fehlender Bloom-Filter wird aus der Datenbank neu aufgebaut."""
+        index = SuppressionIndex(tmp_path, bloom_capacity=1000)
+        index.add(["max@test.de"])
+        index.close()
+        (tmp_path / BLOOM_FILENAME).unlink()
+
+        reopened = SuppressionIndex(tmp_path, bloom_capacity=1000)
+        assert reopened.contains(["max@test.de"]).tolist() == [True]
+        assert (tmp_path / BLOOM_FILENAME).exists()
+
+    def test_rebuilds_truncated_bloom_filter(self, tmp_path: Path) -> None:
+        """Abgeschnittener Bloom-Filter mit gültiger Generation wird neu aufgebaut."""
+        index = SuppressionIndex(tmp_path, bloom_capacity=1000)
+        index.add(["max@test.de"])
+        index.close()
+        path = tmp_path / BLOOM_FILENAME
+        path.write_bytes(path.read_bytes()[:40])
+
+        reopened = SuppressionIndex(tmp_path, bloom_capacity=1000)
+        assert reopened.contains(["max@test.de"]).tolist() == [True]
+
+    def test_overlapping_runs_keep_all_entries(self, tmp_path: Path) -> None:
+        """Zwei parallele Läufe überschreiben nicht gegenseitig ihre Bloom-Einträge."""
+        first = SuppressionIndex(tmp_path, bloom_capacity=1000)
+        second = SuppressionIndex(tmp_path, bloom_capacity=1000)
+        first.add(["max@test.de"])
+        second.add(["anna@test.de"])
+        first.close()
+        second.close()
+
+        reopened = SuppressionIndex(tmp_path, bloom_capacity=1000)
+        assert reopened.contains(["max@test.de", "anna@test.de"]).tolist() == [True, True]
+
+    def test_filter_leads(self, tmp_path: Path) -> None:
+        """Bereits exportierte Leads werden entfernt."""
+        index = SuppressionIndex(tmp_path, bloom_capacity=1000)
+        index.add(["max@test.de"])
+        df = pd.DataFrame({"email": ["max@test.de", "anna@test.de"]})
+
+        result = index.filter_leads(df)
+        assert result["email"].tolist() == ["anna@test.de"]
+
+    def test_filter_assignments_per_campaign(self, tmp_path: Path) -> None:
+        """Zuordnungen werden nur für die Kampagne gefiltert, in die exportiert wurde."""
+        index = SuppressionIndex(tmp_path, bloom_capacity=1000)
+        index.add(["max@test.de"], "gw_seehafer_elemente")
+        df = pd.DataFrame({"email": ["max@test.de", "anna@test.de"]})
+        assignments = AssignmentTable.from_ids(
+            df,
+            [0, 0, 1],
+            ["seehafer_elemente", "gruppenwerk_bau", "seehafer_elemente"],
+            ["hausverwaltung"] * 3,
+            [1.0, 0.7, 1.0],
+        )
+
+        result = index.filter_assignments(assignments, "gw")
+        assert [(a.lead["email"], a.company_id) for a in result] == [
+            ("max@test.de", "gruppenwerk_bau"),
+            ("anna@test.de", "seehafer_elemente"),
+        ]
+
+    def test_add_counts_new_entries(self, tmp_path: Path) -> None:
+        """Doppelte Einträge werden nicht erneut gezählt."""
+        index = SuppressionIndex(tmp_path, bloom_capacity=1000)
+        assert index.add(["max@test.de", "anna@test.de"]) == 2
+        assert index.add(["max@test.de"]) == 0
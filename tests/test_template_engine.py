@@ -5,22 +5,24 @@ from pathlib import Path
 import pytest
 
 from generator.template_engine import (
+    RenderJob,
     RenderedEmail,
+    StaticTemplate,
+    compile_static,
     create_environment,
+    precompile,
     render,
+    render_many,
     _split_subject_and_body,
 )
 
 
-PROJECT_ROOT = Path(__file__).parent.parent
-
-
 class TestCreateEnvironment:
     """Tests für die Jinja2-Umgebung."""
 
-    def test_creates_environment(self) -> None:
+    def test_creates_environment(self, project_templates: Path) -> None:
         """Erstellt erfolgreich eine Jinja2-Umgebung."""
-        env = create_environment(PROJECT_ROOT / "templates")
+        env = create_environment(project_templates)
         assert env is not None
 
     def test_raises_on_missing_directory(self) -> None:
@@ -28,13 +30,29 @@ class TestCreateEnvironment:
         with pytest.raises(FileNotFoundError):
             create_environment("/nicht/existent")
 
+    def test_precompile_writes_bytecode_cache(self, tmp_path: Path) -> None:
+        """Alle Templates landen im Bytecode-Cache und werden beim Warmstart genutzt."""
+        (tmp_path / "firma").mkdir()
+        (tmp_path / "firma" / "gewerbe.txt").write_text(
+            "Betreff: Hallo {{ company_name }}\n\nText", encoding="utf-8"
+        )
+
+        assert precompile(create_environment(tmp_path)) == 1
+        assert list((tmp_path / "__compiled__" / "jinja").iterdir())
+
+        warm = create_environment(tmp_path)
+        assert precompile(warm) == 1
+        assert warm.get_template("firma/gewerbe.txt").render(company_name="ABC").startswith(
+            "Betreff: Hallo ABC"
+        )
+
 
 class TestRender:
     """Tests für das Template-Rendering."""
 
-    def test_renders_seehafer_hausverwaltung(self) -> None:
+    def test_renders_seehafer_hausverwaltung(self, project_templates: Path) -> None:
         """Rendert Seehafer Hausverwaltung Template korrekt."""
-        env = create_environment(PROJECT_ROOT / "templates")
+        env = create_environment(project_templates)
         lead = {
             "first_name": "Max",
             "last_name": "Müller",
@@ -58,9 +76,9 @@ class TestRender:
         assert "https://link.gruppenwerk.de/seehafer-hausverwaltung" in result.body
         assert result.icebreaker != ""
 
-    def test_renders_all_templates(self) -> None:
+    def test_renders_all_templates(self, project_templates: Path) -> None:
         """Alle 15 Templates können gerendert werden."""
-        env = create_environment(PROJECT_ROOT / "templates")
+        env = create_environment(project_templates)
         lead = {
             "first_name": "Test",
             "last_name": "Person",
@@ -99,9 +117,9 @@ class TestRender:
             assert result.subject_line, f"Keine Betreffzeile: {company_id}/{segment_id}"
             assert len(result.body) > 100, f"Body zu kurz: {company_id}/{segment_id}"
 
-    def test_raises_on_missing_template(self) -> None:
+    def test_raises_on_missing_template(self, project_templates: Path) -> None:
         """Wirft Fehler bei fehlendem Template."""
-        env = create_environment(PROJECT_ROOT / "templates")
+        env = create_environment(project_templates)
         from jinja2 import TemplateNotFound
 
         with pytest.raises(TemplateNotFound):
@@ -116,6 +134,125 @@ class TestRender:
             )
 
 
+class TestRenderMany:
+    """Tests für das Massen-Rendering."""
+
+    LEADS = [
+        {"first_name": "Max", "last_name": "Müller", "company_name": "ABC GmbH", "email": "a@x.de"},
+        {"first_name": "", "last_name": "", "company_name": "", "email": "b@x.de"},
+        {"first_name": "Ève", "company_name": "Zeile\nUmbruch AG", "email": "c@x.de"},
+        {"first_name": "  Anna ", "company_name": "  {{ nicht }} ", "email": "d@x.de"},
+        {"first_name": "\n", "company_name": "\nVorne", "email": "e@x.de"},
+    ]
+
+    def _jobs(self, templates_dir: Path) -> list[RenderJob]:
+        jobs = []
+        for path in sorted(templates_dir.glob("*/*.txt")):
+            for lead in self.LEADS:
+                jobs.append(RenderJob(
+                    company_id=path.parent.name,
+                    segment_id=path.stem,
+                    lead=lead,
+                    icebreaker="wie wichtig sind Ihnen kurze Wege?",
+                    pdf_link="https://link.gruppenwerk.de/test",
+                ))
+        return jobs
+
+    def _assert_parity(self, templates_dir: Path) -> None:
+        env = create_environment(templates_dir)
+        jobs = self._jobs(templates_dir)
+        expected = [
+            render(j.company_id, j.segment_id, j.lead, j.icebreaker, j.pdf_link, "Axel", env)
+            for j in jobs
+        ]
+        assert list(render_many(jobs, "Axel", env)) == expected
+        assert list(render_many(jobs, "Axel", env, static=False)) == expected
+
+    def test_identical_to_render_for_all_templates(self, project_templates: Path) -> None:
+        """Ergebnis ist für alle Projekt-Templates identisch zu `render`."""
+        self._assert_parity(project_templates)
+
+    def test_identical_for_special_templates(self, tmp_path: Path) -> None:
+        """Auch Templates mit Blöcken, statischem oder fehlendem Betreff sind identisch."""
+        templates = {
+            "statisch": "Betreff: Kurze Frage\n\nHallo {{ first_name }},\n\n{{ icebreaker }}",
+            "bloecke": "{% if first_name %}Betreff: Hi {{ first_name }}{% else %}Betreff: Hallo{% endif %}\n\nText",
+            "ohne_betreff": "Hallo {{ first_name }},\n\nText",
+            "vorspann": "\n  \nbetreff:   {{ company_name }}  \n\n\n  Body {{ sender_name }}  \n\n",
+            "nur_betreff": "Betreff: {{ company_name }}",
+        }
+        (tmp_path / "firma").mkdir()
+        for name, source in templates.items():
+            (tmp_path / "firma" / f"{name}.txt").write_text(source, encoding="utf-8")
+
+        self._assert_parity(tmp_path)
+
+    def test_static_subject_rendered_once(self, tmp_path: Path) -> None:
+        """Ein Betreff ohne Variablen wird nur einmal gerendert."""
+        (tmp_path / "firma").mkdir()
+        (tmp_path / "firma" / "gewerbe.txt").write_text(
+            "Betreff: Kurze Frage\n\nHallo {{ first_name }}", encoding="utf-8"
+        )
+        env = create_environment(tmp_path)
+        jobs = [
+            RenderJob("firma", "gewerbe", {"first_name": name}, "", "")
+            for name in ("Max", "Anna")
+        ]
+
+        results = list(render_many(jobs, "Axel", env))
+
+        assert [r.subject_line for r in results] == ["Kurze Frage", "Kurze Frage"]
+        assert [r.body for r in results] == ["Hallo Max", "Hallo Anna"]
+
+    def test_missing_template_yields_none(self, project_templates: Path) -> None:
+        """Fehlendes Template liefert None, die übrigen Jobs werden gerendert."""
+        env = create_environment(project_templates)
+        jobs = [
+            RenderJob("gibts_nicht", "auch_nicht", {"email": "a@x.de"}, "", ""),
+            RenderJob("seehafer_elemente", "hausverwaltung", self.LEADS[0], "", ""),
+        ]
+
+        results = list(render_many(jobs, "Axel", env))
+
+        assert results[0] is None
+        assert isinstance(results[1], RenderedEmail)
+
+
+class TestCompileStatic:
+    """Tests für die Vorkompilierung einfacher Templates."""
+
+    def test_all_project_templates_are_static(self, project_templates: Path) -> None:
+        """Alle Projekt-Templates bestehen nur aus Text und Variablen."""
+        env = create_environment(project_templates)
+        for name in env.list_templates(filter_func=lambda n: n.endswith(".txt")):
+            source = env.loader.get_source(env, name)[0]
+            assert isinstance(compile_static(env, source), StaticTemplate), name
+
+    def test_renders_like_jinja(self, project_templates: Path) -> None:
+        """Ergebnis entspricht Jinja2 — auch bei fehlenden und Nicht-String-Werten."""
+        env = create_environment(project_templates)
+        source = "Hallo {{ first_name }}{{first_name}},\r\n{{ fehlt }}|{{ zahl }}|{{ leer }}\n\n"
+        context = {"first_name": "Max", "zahl": 3.5, "leer": None}
+
+        compiled = compile_static(env, source)
+
+        assert compiled.render(context) == env.from_string(source).render(context)
+        assert compiled.render() == env.from_string(source).render()
+
+    @pytest.mark.parametrize("source", [
+        "{% if first_name %}Hallo{% endif %}",
+        "{{ first_name | upper }}",
+        "{{ lead.first_name }}",
+        "{{ 'Text' }}",
+        "{{ range }}",
+        "{{ first_name ~ last_name }}",
+    ])
+    def test_falls_back_for_jinja_features(self, source: str, project_templates: Path) -> None:
+        """Blöcke, Filter, Attribute, Konstanten und Globals bleiben bei Jinja2."""
+        env = create_environment(project_templates)
+        assert compile_static(env, source) is None
+
+
 class TestSplitSubjectAndBody:
     """Tests für die Betreff/Body-Trennung."""
 